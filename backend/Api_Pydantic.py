@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-from typing import List, Optional, Literal, Dict
+from typing import Annotated, List, Optional, Literal, Dict, Union
 from uuid import UUID
 from datetime import datetime
 
-from pydantic import BaseModel, Field, ConfigDict, model_validator
+from dateutil.rrule import MINUTELY, SECONDLY, rrulestr
+from pydantic import AfterValidator, BaseModel, Field, ConfigDict, model_validator
 
 # -------
 # Auth / Users
@@ -84,6 +85,18 @@ class CalendarSubscriptionRead(BaseModel):
 # Events, Recurrence, Reminders & Event Sharing a Copy
 # -------
 
+def check_rrule(value: str) -> str:
+    try:
+        rules = rrulestr(value, forceset=True)
+    except (ValueError, TypeError) as exc:
+        raise ValueError(f"invalid rrule: {exc}")
+    # sub-hourly series expand to far too many occurrences to be calendar events
+    if any(r._freq in (SECONDLY, MINUTELY) for r in (*rules._rrule, *rules._exrule)):
+        raise ValueError("rrule FREQ must be HOURLY or longer")
+    return value
+
+RRule = Annotated[str, Field(max_length=2000), AfterValidator(check_rrule)]
+
 class Reminder(BaseModel):
     model_config = ConfigDict(extra="ignore")
     minutes_before_start: int = Field(..., ge=0, le=10080)
@@ -100,7 +113,7 @@ class EventBase(BaseModel):
     timezone: Optional[str] = Field(None, description="IANA tz like 'America/New_York'")
     all_day: bool = False
     visibility: Literal["public", "private", "busy"] = "private"
-    rrule: Optional[str] = None
+    rrule: Optional[RRule] = None
     reminders: List[Reminder] = Field(default_factory=list)
 
     @model_validator(mode="after")
@@ -122,7 +135,7 @@ class EventUpdate(BaseModel):
     timezone: Optional[str] = None
     all_day: Optional[bool] = None
     visibility: Optional[Literal["public", "private", "busy"]] = None
-    rrule: Optional[str] = None
+    rrule: Optional[RRule] = None
     reminders: Optional[List[Reminder]] = None
 
     @model_validator(mode="after")
@@ -147,6 +160,147 @@ class EventShareRead(BaseModel):
     user_id: UUID
     permission: Optional[str] = None
 
+AttendeeStatus = Literal["invited", "accepted", "declined"]
+
+class InvitationCreate(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    user_ids: List[UUID] = Field(..., min_length=1, max_length=500)
+
+class InvitationRead(BaseModel):
+    user_id: UUID
+    status: AttendeeStatus
+    token: str
+
+class AttendeeRead(BaseModel):
+    user_id: UUID
+    status: AttendeeStatus
+
+class EventSelection(BaseModel):
+    """Events for a bulk operation: explicit ids, or a filter within one calendar."""
+    model_config = ConfigDict(extra="forbid")
+    event_ids: Optional[List[UUID]] = Field(None, min_length=1, max_length=5000)
+    calendar_id: Optional[UUID] = None
+    start_from: Optional[datetime] = None
+    start_to: Optional[datetime] = None
+    q: Optional[str] = None
+
+    @model_validator(mode="after")
+    def validate_selection(self) -> "EventSelection":
+        if (self.event_ids is None) == (self.calendar_id is None):
+            raise ValueError("give either event_ids or calendar_id")
+        if self.event_ids is not None and (self.start_from or self.start_to or self.q):
+            raise ValueError("start_from, start_to and q filter a calendar_id selection")
+        if self.start_from and self.start_to and self.start_to <= self.start_from:
+            raise ValueError("start_to must be after start_from")
+        return self
+
+class EventTransfer(EventSelection):
+    target_calendar_id: UUID
+
+# ---------------------------
+# Free/busy
+# ---------------------------
+
+class FreeBusyQuery(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    user_ids: List[UUID] = Field(..., min_length=1, max_length=500)
+    start_at: datetime
+    end_at: datetime
+
+    @model_validator(mode="after")
+    def validate_window(self) -> "FreeBusyQuery":
+        if self.end_at <= self.start_at:
+            raise ValueError("end_at must be after start_at")
+        if (self.end_at - self.start_at).days > 62:
+            raise ValueError("window may span at most 62 days")
+        return self
+
+class BusyInterval(BaseModel):
+    start_at: datetime
+    end_at: datetime
+
+class FreeSlotQuery(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    user_ids: List[UUID] = Field(..., min_length=1, max_length=500)
+    duration_minutes: int = Field(..., ge=5, le=24 * 60)
+    start_at: datetime
+    end_at: datetime
+
+    @model_validator(mode="after")
+    def validate_window(self) -> "FreeSlotQuery":
+        if self.end_at <= self.start_at:
+            raise ValueError("end_at must be after start_at")
+        if (self.end_at - self.start_at).days > 62:
+            raise ValueError("window may span at most 62 days")
+        return self
+
+class ConflictQuery(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    start_at: datetime
+    end_at: datetime
+    timezone: Optional[str] = Field(None, max_length=100)
+    rrule: Optional[RRule] = None
+    exclude_event_id: Optional[UUID] = Field(None, description="The event being edited, if any")
+
+    @model_validator(mode="after")
+    def validate_times(self) -> "ConflictQuery":
+        if self.end_at <= self.start_at:
+            raise ValueError("end_at must be after start_at")
+        return self
+
+class ConflictRead(BaseModel):
+    event_id: UUID
+    calendar_id: UUID
+    title: str
+    start_at: datetime
+    end_at: datetime
+
+# ---------------------------
+# Batch (several reads in one round trip)
+# ---------------------------
+
+class BatchOp(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    id: Optional[str] = Field(None, max_length=100, description="Echoed back to match results to requests")
+    if_none_match: Optional[str] = Field(None, description="ETag from an earlier result; 304 if unchanged")
+
+class BatchGetUser(BatchOp):
+    op: Literal["get_user"]
+    user_id: UUID
+
+class BatchGetCalendar(BatchOp):
+    op: Literal["get_calendar"]
+    calendar_id: UUID
+
+class BatchListEvents(BatchOp):
+    op: Literal["list_events"]
+    calendar_id: UUID
+    q: Optional[str] = None
+    start_from: Optional[datetime] = None
+    start_to: Optional[datetime] = None
+    expand: bool = False
+    limit: Optional[int] = Field(None, ge=1, le=1000)
+    cursor: Optional[str] = None
+
+class BatchGetEvent(BatchOp):
+    op: Literal["get_event"]
+    event_id: UUID
+
+class BatchAgenda(BatchOp):
+    op: Literal["agenda"]
+    start_from: datetime
+    start_to: datetime
+    expand: bool = False
+
+BatchItem = Annotated[
+    Union[BatchGetUser, BatchGetCalendar, BatchListEvents, BatchGetEvent, BatchAgenda],
+    Field(discriminator="op"),
+]
+
+class BatchRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    requests: List[BatchItem] = Field(..., min_length=1, max_length=50)
+
 # ---------------------------
 # Errors / Notifications
 # ---------------------------
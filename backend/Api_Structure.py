@@ -2,15 +2,24 @@ from __future__ import annotations
 
 from typing import Optional, List, Literal, Dict, Tuple, Set
 from uuid import UUID, uuid4
-from datetime import datetime
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import asyncio
+import base64
+import json
+from urllib.parse import urlencode
 from .models import PushSubscription
 
-from fastapi import FastAPI, Depends, HTTPException, Query, status
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
 
 # NEW: SQLAlchemy imports for queries + session typing
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, insert, update, delete, and_, or_, tuple_, func, case, literal, literal_column, null
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import ValidationError
 
 from .Api_Pydantic import (
     # users/auth
@@ -22,13 +31,45 @@ from .Api_Pydantic import (
     # events
     Reminder, EventCreate, EventUpdate, EventRead,
     EventShareCreate, EventShareRead,
+    InvitationCreate, InvitationRead, AttendeeRead,
+    EventSelection, EventTransfer,
+    # free/busy
+    FreeBusyQuery, BusyInterval, FreeSlotQuery, ConflictQuery, ConflictRead,
+    # batch
+    BatchRequest, BatchGetUser, BatchGetCalendar, BatchListEvents, BatchGetEvent, BatchAgenda,
     # misc
     APIError, BrowserPushSubscription,
 )
 
 # NEW: DB engine/session and ORM models
-from .db import lifespan, get_session
-from .models import User, Calendar, CalendarShare, CalendarSubscription, Event, EventShare
+from .db import lifespan, get_session, SessionLocal, pool_status, engine
+from .replicas import get_read_session, read_your_writes_middleware, replica_status, replicas
+from .models import User, Calendar, CalendarShare, CalendarSubscription, Event, EventShare, SEARCH_CONFIG
+from .access import resolve_calendar, resolve_event, memoize_access, free_busy_audience
+from .access import refresh_visible, shared_event_ids, visible_calendars, visible_cache_status
+from .recurrence import aware, occurrences, window_clause
+from .freebusy import refresh_busy_days, free_busy, next_free_slot, event_span
+from .conflicts import find_conflicts
+from . import ical
+from .serializers import (
+    EVENT_COLUMNS, REDACTED, dumps, json_response, event_dict, event_dicts, calendar_dict, user_dict, redacted,
+)
+from .changes import (
+    record_events, record_event_users, record_event_sharees, record_calendar, record_calendar_audience,
+    make_sync_token, read_sync_token, current_cursor, changes_since,
+)
+from .etags import make_etag, matches, not_modified, validator_headers
+from .instrumentation import install as install_db_instrumentation, db_timing_middleware
+from .lifecycle import InflightMiddleware, readiness
+from .auth import DEMO_LOGIN, create_access_token, verify_access_token, cached_user, cache_user, invalidate_user
+from .auth import create_invite_token, verify_invite_token
+from . import idempotency
+from .upsert import upsert
+from . import realtime
+from . import sealing
+from .reminders import add_reminders, replace_reminders, reschedule, event_reminders, reminder_dicts
+from .reminders import scheduler as reminder_scheduler
+from .webpush import check_subscription
 
 
 
@@ -36,6 +77,16 @@ from .models import User, Calendar, CalendarShare, CalendarSubscription, Event,
 app = FastAPI(title="Calendar API", version="0.1.0", lifespan=lifespan)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
+# per-request query count/time -> Server-Timing header + structured log line
+install_db_instrumentation(engine.sync_engine)
+for _replica in replicas:
+    install_db_instrumentation(_replica.engine.sync_engine)
+app.middleware("http")(db_timing_middleware)
+# reads on replicas, with a WAL-position cookie after writes (replicas.py)
+app.middleware("http")(read_your_writes_middleware)
+# outermost: counts in-flight requests so shutdown can drain them (lifecycle.py)
+app.add_middleware(InflightMiddleware)
+
 # ------
 #in the works
 # IN-MEMORY STORES (demo only) — this will not be perminent. the data stored will be gone once the server restarts.
@@ -45,6 +96,19 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 def _now():
     return datetime.now().astimezone()
 
+
+# keyset cursors for event listings: opaque base64 of "<start_at iso>|<id>"
+def _encode_cursor(start_at: datetime, event_id: UUID) -> str:
+    return base64.urlsafe_b64encode(f"{start_at.isoformat()}|{event_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        start_at, event_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(start_at), UUID(event_id)
+    except ValueError:
+        raise HTTPException(400, "Invalid cursor")
+
 """
 # --- DB-backed helpers (replace the old in-memory demo bits) ---
 from uuid import UUID  
@@ -107,21 +171,48 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserRead:
 
 async def get_current_user(token: str = Depends(oauth2_scheme),
                            session: AsyncSession = Depends(get_session)) -> UserRead:
+    return await _authenticate(token, session)
+
+
+async def _authenticate(token: Optional[str], session: AsyncSession) -> UserRead:
     if not token:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing token")
-    user = await ensure_demo_user(session)
-    return UserRead(
+    # signature + expiry are checked locally; the DB is only hit on a cache miss
+    user_id = verify_access_token(token)
+    if not user_id:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
+    cached = cached_user(user_id)
+    if cached:
+        return cached
+    user = (await session.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+    if not user or not user.is_active:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
+    current = UserRead(
         id=user.id, email=user.email, full_name=user.full_name, avatar_url=user.avatar_url,
         is_active=user.is_active, role=user.role, created_at=user.created_at, updated_at=user.updated_at
     )
+    cache_user(current)
+    return current
+
+
+async def get_admin_user(current_user: UserRead = Depends(get_current_user)) -> UserRead:
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin only")
+    return current_user
 
 # --------------------------------------------------------------------
 # Auth (login/logout)
 # --------------------------------------------------------------------
 @app.post("/login")
-async def login(payload: LoginRequest):
+async def login(payload: LoginRequest, session: AsyncSession = Depends(get_session)):
+    # passwords are not stored yet: only in demo mode, where any non-empty
+    # password is accepted for an existing active user
+    if not DEMO_LOGIN:
+        raise HTTPException(status_code=403, detail="Password login is disabled")
     if payload.email and payload.password:
-        return {"access_token": "demo-token", "token_type": "bearer"}
+        user = (await session.execute(select(User).where(User.email == payload.email))).scalar_one_or_none()
+        if user and user.is_active:
+            return {"access_token": create_access_token(user.id), "token_type": "bearer"}
     raise HTTPException(status_code=401, detail="Invalid credentials")
 
 @app.post("/logout", status_code=204)
@@ -140,21 +231,19 @@ async def create_user(payload: UserCreate, session: AsyncSession = Depends(get_s
     session.add(user)
     await session.commit()
     await session.refresh(user)
-    return UserRead(
-        id=user.id, email=user.email, full_name=user.full_name, avatar_url=user.avatar_url,
-        is_active=user.is_active, role=user.role, created_at=user.created_at, updated_at=user.updated_at
-    )
+    return json_response(user_dict(user), status_code=201)
 
 
-@app.get("/users/{id}")
-async def get_user(id: UUID, session: AsyncSession = Depends(get_session), current_user: UserRead = Depends(get_current_user)):
+@app.get("/users/{id}", response_model=UserRead)
+async def get_user(id: UUID, request: Request, session: AsyncSession = Depends(get_read_session),
+                   current_user: UserRead = Depends(get_current_user)):
     user = (await session.execute(select(User).where(User.id == id))).scalar_one_or_none()
     if not user:
         raise HTTPException(404, "User not found")
-    return {
-        "id": user.id, "email": user.email, "full_name": user.full_name, "avatar_url": user.avatar_url,
-        "is_active": user.is_active, "role": user.role, "created_at": user.created_at, "updated_at": user.updated_at
-    }
+    etag = make_etag("user", user.id, user.updated_at, user.is_active, user.role)
+    if matches(request, etag):
+        return not_modified(etag)
+    return json_response(user_dict(user), headers=validator_headers(etag))
 
 
 @app.put("/users/{id}")
@@ -167,24 +256,23 @@ async def update_user(id: UUID, payload: UserUpdate, session: AsyncSession = Dep
     for k, v in data.items():
         setattr(user, k, v)
     await session.commit()
+    invalidate_user(id)
     await session.refresh(user)
-    return {
-        "id": user.id, "email": user.email, "full_name": user.full_name, "avatar_url": user.avatar_url,
-        "is_active": user.is_active, "role": user.role, "created_at": user.created_at, "updated_at": user.updated_at
-    }
+    return json_response(user_dict(user))
 
 
 @app.put("/admin/users/{id}/deactivate")
 async def admin_deactivate_user(
     id: UUID,
     session: AsyncSession = Depends(get_session),
-    current_user: UserRead = Depends(get_current_user),
+    current_user: UserRead = Depends(get_admin_user),
 ):
     user = (await session.execute(select(User).where(User.id == id))).scalar_one_or_none()
     if not user:
         raise HTTPException(404, "User not found")
     user.is_active = False
     await session.commit()
+    invalidate_user(id)
     return {"id": str(id), "is_active": False}
 
 @app.put("/admin/users/{id}/role")
@@ -192,51 +280,42 @@ async def admin_set_role(
     id: UUID,
     role: Literal["user", "admin"],
     session: AsyncSession = Depends(get_session),
-    current_user: UserRead = Depends(get_current_user),
+    current_user: UserRead = Depends(get_admin_user),
 ):
     user = (await session.execute(select(User).where(User.id == id))).scalar_one_or_none()
     if not user:
         raise HTTPException(404, "User not found")
     user.role = role
     await session.commit()
+    invalidate_user(id)
     return {"id": str(id), "role": role}
 # --------------------------------------------------------------------
 # Calendars Features (create, visibility, share, follow/hide)
 # --------------------------------------------------------------------
-@app.post("/calendars", status_code=201)
+@app.post("/calendars", status_code=201, response_model=CalendarRead)
 async def create_calendar(payload: CalendarCreate, session: AsyncSession = Depends(get_session),
                           current_user: UserRead = Depends(get_current_user)):
     cal = Calendar(owner_user_id=current_user.id, name=payload.name, visibility=payload.visibility)
     session.add(cal)
+    await session.flush()
+    await refresh_visible(session, cal.id, [current_user.id])
+    await record_calendar(session, cal.id, [current_user.id])
     await session.commit()
     await session.refresh(cal)
-    return {
-        "id": cal.id, "owner_user_id": cal.owner_user_id, "name": cal.name, "visibility": cal.visibility,
-        "created_at": cal.created_at, "updated_at": cal.updated_at
-    }
+    return json_response(calendar_dict(cal), status_code=201)
 
-@app.get("/calendars/{calendar_id}")
-async def get_calendar(calendar_id: UUID, session: AsyncSession = Depends(get_session),
+@app.get("/calendars/{calendar_id}", response_model=CalendarRead)
+async def get_calendar(calendar_id: UUID, request: Request, session: AsyncSession = Depends(get_read_session),
                        current_user: UserRead = Depends(get_current_user)):
-    cal = (await session.execute(select(Calendar).where(Calendar.id == calendar_id))).scalar_one_or_none()
+    cal, perm = await resolve_calendar(session, calendar_id, current_user.id)
     if not cal:
         raise HTTPException(404, "Calendar not found")
-    is_owner = cal.owner_user_id == current_user.id
-    is_public = cal.visibility == "public"
-    is_shared = (
-        await session.execute(
-            select(CalendarShare).where(
-                CalendarShare.calendar_id == calendar_id,
-                CalendarShare.user_id == current_user.id
-            )
-        )
-    ).scalar_one_or_none() is not None
-    if not (is_owner or is_public or is_shared):
+    if perm is None:
         raise HTTPException(403, "Not allowed to view this calendar")
-    return {
-        "id": cal.id, "owner_user_id": cal.owner_user_id, "name": cal.name, "visibility": cal.visibility,
-        "created_at": cal.created_at, "updated_at": cal.updated_at
-    }
+    etag = make_etag("calendar", cal.id, cal.updated_at)
+    if matches(request, etag):
+        return not_modified(etag)
+    return json_response(calendar_dict(cal), headers=validator_headers(etag))
 
     
 
@@ -247,21 +326,23 @@ async def update_calendar(
     session: AsyncSession = Depends(get_session),
     current_user: UserRead = Depends(get_current_user),
 ):
-    cal = (await session.execute(select(Calendar).where(Calendar.id == calendar_id))).scalar_one_or_none()
+    cal, perm = await resolve_calendar(session, calendar_id, current_user.id)
     if not cal:
         raise HTTPException(404, "Calendar not found")
-    if cal.owner_user_id != current_user.id:
+    if perm != "owner":
         raise HTTPException(403, "Only owner can update calendar")
 
     data = payload.model_dump(exclude_unset=True)
+    visibility_changed = "visibility" in data and data["visibility"] != cal.visibility
     for k, v in data.items():
         setattr(cal, k, v)
+    if visibility_changed:
+        # public <-> private changes who sees it (subscribers of a public calendar)
+        await refresh_visible(session, calendar_id)
+        await record_calendar_audience(session, calendar_id)
     await session.commit()
     await session.refresh(cal)
-    return {
-        "id": cal.id, "owner_user_id": cal.owner_user_id, "name": cal.name, "visibility": cal.visibility,
-        "created_at": cal.created_at, "updated_at": cal.updated_at
-    }
+    return json_response(calendar_dict(cal))
 
 @app.delete("/calendars/{calendar_id}", status_code=204)
 async def delete_calendar(
@@ -269,13 +350,23 @@ async def delete_calendar(
     session: AsyncSession = Depends(get_session),
     current_user: UserRead = Depends(get_current_user),
 ):
-    cal = (await session.execute(select(Calendar).where(Calendar.id == calendar_id))).scalar_one_or_none()
+    cal, perm = await resolve_calendar(session, calendar_id, current_user.id)
     if not cal:
         raise HTTPException(404, "Calendar not found")
-    if cal.owner_user_id != current_user.id:
+    if perm != "owner":
         raise HTTPException(403, "Only owner can delete calendar")
 
+    # the cascade removes the events, so their owners' free/busy days need rebuilding
+    spans = (await session.execute(
+        select(Event.owner_user_id, func.min(Event.start_at), func.max(Event.end_at))
+        .where(Event.calendar_id == calendar_id, Event.rrule.is_(None))
+        .group_by(Event.owner_user_id)
+    )).all()
+    await record_calendar_audience(session, calendar_id)
     await session.delete(cal)
+    await session.flush()
+    for owner_id, first_start, last_end in spans:
+        await refresh_busy_days(session, owner_id, first_start, last_end)
     await session.commit()
     return None
 
@@ -287,20 +378,16 @@ async def share_calendar(
     session: AsyncSession = Depends(get_session),
     current_user: UserRead = Depends(get_current_user),
 ):
-    cal = (await session.execute(select(Calendar).where(Calendar.id == calendar_id))).scalar_one_or_none()
+    cal, perm = await resolve_calendar(session, calendar_id, current_user.id)
     if not cal:
         raise HTTPException(404, "Calendar not found")
-    if cal.owner_user_id != current_user.id:
+    if perm != "owner":
         raise HTTPException(403, "Only owner can share calendar")
 
-    exists = (await session.execute(
-        select(CalendarShare).where(
-            CalendarShare.calendar_id == calendar_id,
-            CalendarShare.user_id == payload.user_id
-        )
-    )).scalar_one_or_none()
-    if not exists:
-        session.add(CalendarShare(calendar_id=calendar_id, user_id=payload.user_id))
+    if await upsert(session, CalendarShare, {"calendar_id": calendar_id, "user_id": payload.user_id},
+                    conflict=["calendar_id", "user_id"]):
+        await refresh_visible(session, calendar_id, [payload.user_id])
+        await record_calendar(session, calendar_id, [payload.user_id])
         await session.commit()
     return {"calendar_id": str(calendar_id), "user_id": str(payload.user_id), "permission": "view"}
 
@@ -312,10 +399,10 @@ async def unshare_calendar(
     session: AsyncSession = Depends(get_session),
     current_user: UserRead = Depends(get_current_user),
 ):
-    cal = (await session.execute(select(Calendar).where(Calendar.id == calendar_id))).scalar_one_or_none()
+    cal, perm = await resolve_calendar(session, calendar_id, current_user.id)
     if not cal:
         raise HTTPException(404, "Calendar not found")
-    if cal.owner_user_id != current_user.id:
+    if perm != "owner":
         raise HTTPException(403, "Only owner can unshare calendar")
 
     row = (await session.execute(
@@ -326,6 +413,8 @@ async def unshare_calendar(
     )).scalar_one_or_none()
     if row:
         await session.delete(row)
+        await refresh_visible(session, calendar_id, [user_id])
+        await record_calendar(session, calendar_id, [user_id])
         await session.commit()
     return None
 
@@ -336,18 +425,17 @@ async def subscribe_calendar(
     session: AsyncSession = Depends(get_session),
     current_user: UserRead = Depends(get_current_user),
 ):
-    cal = (await session.execute(select(Calendar).where(Calendar.id == calendar_id))).scalar_one_or_none()
+    cal, perm = await resolve_calendar(session, calendar_id, current_user.id)
     if not cal:
         raise HTTPException(404, "Calendar not found")
+    if perm is None:
+        raise HTTPException(403, "Not allowed to view this calendar")
 
-    existing = (await session.execute(
-        select(CalendarSubscription).where(
-            CalendarSubscription.subscriber_user_id == current_user.id,
-            CalendarSubscription.calendar_id == calendar_id
-        )
-    )).scalar_one_or_none()
-    if not existing:
-        session.add(CalendarSubscription(subscriber_user_id=current_user.id, calendar_id=calendar_id, is_hidden=False))
+    if await upsert(session, CalendarSubscription,
+                    {"subscriber_user_id": current_user.id, "calendar_id": calendar_id, "is_hidden": False},
+                    conflict=["subscriber_user_id", "calendar_id"]):
+        await refresh_visible(session, calendar_id, [current_user.id])
+        await record_calendar(session, calendar_id, [current_user.id])
         await session.commit()
     return {"calendar_id": str(calendar_id), "subscriber_user_id": str(current_user.id), "is_hidden": False}
 
@@ -368,6 +456,8 @@ async def update_subscription(
     if not sub:
         raise HTTPException(404, "Subscription not found")
     sub.is_hidden = payload.is_hidden
+    await refresh_visible(session, calendar_id, [current_user.id])
+    await record_calendar(session, calendar_id, [current_user.id])
     await session.commit()
     return {"calendar_id": str(calendar_id), "subscriber_user_id": str(current_user.id), "is_hidden": payload.is_hidden}
 
@@ -387,6 +477,8 @@ async def unsubscribe_calendar(
     )).scalar_one_or_none()
     if sub:
         await session.delete(sub)
+        await refresh_visible(session, calendar_id, [current_user.id])
+        await record_calendar(session, calendar_id, [current_user.id])
         await session.commit()
     return None
 
@@ -395,149 +487,441 @@ async def unsubscribe_calendar(
 # Events (CRUD, share, copy, reminders/rrule)
 # ------------
 
-@app.get("/calendars/{calendar_id}/events")
+async def _stream_events(stmt):
+    # own session: the request-scoped one is closed before a streamed body is sent
+    async with SessionLocal() as stream_session:
+        result = await stream_session.stream(stmt.execution_options(yield_per=500))
+        async for row in result:
+            yield row
+
+
+def _expand_events(rows, viewer_id: UUID, start_from: datetime, start_to: datetime) -> List[Dict]:
+    # one item per occurrence, recurring ones tagged with recurrence_id
+    out = []
+    for ev in rows:
+        base = event_dict(ev, viewer_id)
+        for occ_start, occ_end in occurrences(ev, start_from, start_to):
+            item = dict(base, start_at=occ_start, end_at=occ_end)
+            if ev.rrule:
+                item["recurrence_id"] = occ_start
+            out.append(item)
+    out.sort(key=lambda item: item["start_at"])
+    return out
+
+
+def _search_query(q: str):
+    # web-search syntax: words, "quoted phrases", OR, -excluded
+    return func.websearch_to_tsquery(literal_column(f"'{SEARCH_CONFIG}'::regconfig"), q)
+
+
+def _text_filter(q: str, viewer_id: UUID):
+    # GIN-indexed match on title/location/description; "busy" events hide
+    # their text from everyone but the owner, so only the owner can match it
+    return and_(
+        Event.search_vector.op("@@")(_search_query(q)),
+        or_(Event.visibility != "busy", Event.owner_user_id == viewer_id),
+    )
+
+
+def _check_window(start_from: Optional[datetime], start_to: Optional[datetime]) -> None:
+    # an inverted range is an error in Postgres, not an empty result
+    if start_from and start_to and aware(start_to) <= aware(start_from):
+        raise HTTPException(400, "start_to must be after start_from")
+
+
+@app.get("/calendars/{calendar_id}/events", response_model=List[EventRead])
 async def list_events(
     calendar_id: UUID,
+    request: Request,
     q: Optional[str] = Query(None),
     start_from: Optional[datetime] = None,
     start_to: Optional[datetime] = None,
-    session: AsyncSession = Depends(get_session),
+    expand: bool = Query(False, description="Return one row per recurrence occurrence in the window"),
+    limit: Optional[int] = Query(
+        None, ge=1, le=1000,
+        description='Page size; the next page cursor is sent in X-Next-Cursor (a last {"next_cursor": ...} line when streaming)',
+    ),
+    cursor: Optional[str] = Query(None),
+    stream: bool = Query(False, description="Stream rows as NDJSON instead of one JSON array"),
+    session: AsyncSession = Depends(get_read_session),
     current_user: UserRead = Depends(get_current_user),
 ):
-    cal = (await session.execute(select(Calendar).where(Calendar.id == calendar_id))).scalar_one_or_none()
-    if not cal:
-        raise HTTPException(404, "Calendar not found")
+    if expand and not (start_from and start_to):
+        raise HTTPException(400, "expand requires start_from and start_to")
+    _check_window(start_from, start_to)
+    if expand and (limit or cursor or stream):
+        raise HTTPException(400, "expand cannot be combined with limit, cursor or stream")
 
     # permission: owner, public, or shared
-    is_owner = cal.owner_user_id == current_user.id
-    is_public = cal.visibility == "public"
-    is_shared = (await session.execute(
-        select(CalendarShare).where(
-            CalendarShare.calendar_id == calendar_id,
-            CalendarShare.user_id == current_user.id
-        )
-    )).scalar_one_or_none() is not None
-    if not (is_owner or is_public or is_shared):
+    cal, perm = await resolve_calendar(session, calendar_id, current_user.id)
+    if not cal:
+        raise HTTPException(404, "Calendar not found")
+    if perm is None:
         raise HTTPException(403, "Not allowed to view this calendar")
 
-    stmt = select(Event).where(Event.calendar_id == calendar_id)
-    if start_from:
-        stmt = stmt.where(Event.start_at >= start_from)
-    if start_to:
-        stmt = stmt.where(Event.start_at <= start_to)
+    filters = [Event.calendar_id == calendar_id]
+    windowed = bool(start_from or start_to)
+    if windowed:
+        # overlap, not start-in-window: events that began earlier but run into the window count.
+        # Recurring series that started before the window end are candidates too; the
+        # recurrence engine decides below whether they actually occur inside it.
+        filters.append(window_clause(start_from, start_to))
     if q:
-        # simple icontains on title/description
-        ilike = f"%{q}%"
-        from sqlalchemy import or_
-        stmt = stmt.where(or_(Event.title.ilike(ilike), Event.description.ilike(ilike)))
-
-    rows = (await session.execute(stmt.order_by(Event.start_at.asc()))).scalars().all()
-    
-    def redact(ev: Event) -> Dict:
-        if ev.visibility == "busy" and ev.owner_user_id != current_user.id:
-            return {
-                "id": ev.id, "calendar_id": ev.calendar_id, "owner_user_id": ev.owner_user_id,
-                "title": "Busy", "description": None, "location": None,
-                "start_at": ev.start_at, "end_at": ev.end_at, "timezone": ev.timezone,
-                "all_day": ev.all_day, "visibility": ev.visibility, "rrule": ev.rrule,
-                "created_at": ev.created_at, "updated_at": ev.updated_at,
-            }
-        return {
-            "id": ev.id, "calendar_id": ev.calendar_id, "owner_user_id": ev.owner_user_id,
-            "title": ev.title, "description": ev.description, "location": ev.location,
-            "start_at": ev.start_at, "end_at": ev.end_at, "timezone": ev.timezone,
-            "all_day": ev.all_day, "visibility": ev.visibility, "rrule": ev.rrule,
-            "created_at": ev.created_at, "updated_at": ev.updated_at,
-        }
+        filters.append(_text_filter(q, current_user.id))
+    if cursor:
+        # (start_at, id) is a total order, so it doubles as the keyset for cursors
+        filters.append(tuple_(Event.start_at, Event.id) > _decode_cursor(cursor))
+
+    headers: Dict[str, str] = {}
+    if not stream:
+        # aggregate validator: any insert/update bumps max(updated_at), any delete drops the count
+        count, last_change = (await session.execute(
+            select(func.count(), func.max(Event.updated_at)).where(*filters)
+        )).one()
+        etag = make_etag("events", calendar_id, current_user.id, request.url.query, count, last_change)
+        if matches(request, etag):
+            return not_modified(etag)
+        headers.update(validator_headers(etag))
+
+    stmt = select(*EVENT_COLUMNS).where(*filters).order_by(Event.start_at.asc(), Event.id.asc())
+
+    def visible(ev: Event) -> bool:
+        return not windowed or not ev.rrule or bool(occurrences(ev, start_from, start_to))
+
+    if stream:
+        stmt = stmt.limit(limit + 1) if limit else stmt
+
+        async def ndjson():
+            # headers are gone by the time the page is known to be full, so the
+            # cursor comes last, as a line of its own
+            sent, last = 0, None
+            async for ev in sealing.open_stream(session, _stream_events(stmt)):
+                if limit and sent == limit:
+                    yield dumps({"next_cursor": _encode_cursor(last.start_at, last.id)}) + b"\n"
+                    break
+                sent, last = sent + 1, ev
+                if visible(ev):
+                    yield dumps(event_dict(ev, current_user.id)) + b"\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    if limit:
+        # rows filtered out by the recurrence check still advance the cursor
+        rows = (await session.execute(stmt.limit(limit + 1))).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            headers["X-Next-Cursor"] = _encode_cursor(rows[-1].start_at, rows[-1].id)
+    else:
+        rows = (await session.execute(stmt)).all()
+    rows = await sealing.open_events(session, rows)
+
+    if not expand:
+        return json_response(event_dicts(filter(visible, rows), current_user.id), headers=headers)
+    return json_response(_expand_events(rows, current_user.id, start_from, start_to), headers=headers)
+
+@app.get("/agenda", response_model=List[EventRead])
+async def get_agenda(
+    start_from: datetime,
+    start_to: datetime,
+    expand: bool = Query(False, description="Return one row per recurrence occurrence in the window"),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: UserRead = Depends(get_current_user),
+):
+    """Events from every calendar feeding the user's agenda plus individually shared events."""
+    _check_window(start_from, start_to)
+
+    # one set-based query; an event reachable through several sources is still one row
+    visible = await visible_calendars(session, current_user.id)
+    stmt = (
+        select(*EVENT_COLUMNS)
+        .where(
+            or_(
+                Event.calendar_id.in_(visible.agenda),
+                Event.id.in_(shared_event_ids(current_user.id)),
+            ),
+            window_clause(start_from, start_to),
+        )
+        .order_by(Event.start_at.asc(), Event.id.asc())
+    )
+    rows = await sealing.open_events(session, (await session.execute(stmt)).all())
+    if expand:
+        return json_response(_expand_events(rows, current_user.id, start_from, start_to))
+    return json_response(event_dicts(
+        (ev for ev in rows if not ev.rrule or occurrences(ev, start_from, start_to)), current_user.id
+    ))
+
+@app.get("/search", response_model=List[EventRead])
+async def search_events(
+    q: str = Query(..., min_length=1, max_length=200),
+    start_from: Optional[datetime] = None,
+    start_to: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0, le=1000),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: UserRead = Depends(get_current_user),
+):
+    """Ranked full-text search over every calendar in the user's agenda plus shared events."""
+    _check_window(start_from, start_to)
+    visible = await visible_calendars(session, current_user.id)
+    filters = [
+        or_(
+            Event.calendar_id.in_(visible.agenda),
+            Event.id.in_(shared_event_ids(current_user.id)),
+        ),
+        _text_filter(q, current_user.id),
+    ]
+    windowed = bool(start_from or start_to)
+    if windowed:
+        filters.append(window_clause(start_from, start_to))
+    rank = func.ts_rank_cd(Event.search_vector, _search_query(q))
+    stmt = (
+        select(*EVENT_COLUMNS)
+        .where(*filters)
+        .order_by(rank.desc(), Event.start_at.asc(), Event.id.asc())
+        .limit(limit)
+        .offset(offset)
+    )
+    rows = (await session.execute(stmt)).all()
+    if windowed:
+        rows = [ev for ev in rows if not ev.rrule or occurrences(ev, start_from, start_to)]
+    return json_response(event_dicts(await sealing.open_events(session, rows), current_user.id))
 
-    return [redact(ev) for ev in rows]
 
-@app.get("/events/{event_id}")
+@app.get("/events/{event_id}", response_model=EventRead)
 async def get_event(
     event_id: UUID,
-    session: AsyncSession = Depends(get_session),
+    request: Request,
+    session: AsyncSession = Depends(get_read_session),
     current_user: UserRead = Depends(get_current_user),
 ):
-    ev = (await session.execute(select(Event).where(Event.id == event_id))).scalar_one_or_none()
+    # owner, calendar visibility/share, or an individual event share
+    ev, perm = await resolve_event(session, event_id, current_user.id)
     if not ev:
         raise HTTPException(404, "Event not found")
-
-    # need to check calendar visibility/share if not owner
-    cal = (await session.execute(select(Calendar).where(Calendar.id == ev.calendar_id))).scalar_one_or_none()
-    is_owner = ev.owner_user_id == current_user.id
-    is_public = cal and cal.visibility == "public"
-    is_shared = (await session.execute(
-        select(CalendarShare).where(
-            CalendarShare.calendar_id == ev.calendar_id,
-            CalendarShare.user_id == current_user.id
-        )
-    )).scalar_one_or_none() is not None
-    if not (is_owner or is_public or is_shared):
+    if perm is None:
         raise HTTPException(403, "Not allowed to view this event")
 
-    if ev.visibility == "busy" and not is_owner:
-        return {
-            "id": ev.id, "calendar_id": ev.calendar_id, "owner_user_id": ev.owner_user_id,
-            "title": "Busy", "description": None, "location": None,
-            "start_at": ev.start_at, "end_at": ev.end_at, "timezone": ev.timezone,
-            "all_day": ev.all_day, "visibility": ev.visibility, "rrule": ev.rrule,
-            "created_at": ev.created_at, "updated_at": ev.updated_at,
-        }
-    return {
-        "id": ev.id, "calendar_id": ev.calendar_id, "owner_user_id": ev.owner_user_id,
-        "title": ev.title, "description": ev.description, "location": ev.location,
-        "start_at": ev.start_at, "end_at": ev.end_at, "timezone": ev.timezone,
-        "all_day": ev.all_day, "visibility": ev.visibility, "rrule": ev.rrule,
-        "created_at": ev.created_at, "updated_at": ev.updated_at,
-    }
+    # the body differs for viewers who get the busy-redacted version
+    redacted = ev.visibility == "busy" and ev.owner_user_id != current_user.id
+    etag = make_etag("event", ev.id, ev.updated_at, redacted)
+    if matches(request, etag):
+        return not_modified(etag)
+    body = event_dict((await sealing.open_events(session, [ev]))[0], current_user.id)
+    if ev.owner_user_id == current_user.id:
+        body["reminders"] = await event_reminders(session, ev.id)
+    return json_response(body, headers=validator_headers(etag))
+
+CHECK_CONFLICTS_HELP = "Reject with 409 and the overlapping events if the time is already taken"
+
+
+async def _reject_conflicts(session: AsyncSession, user_id: UUID, start_at: datetime, end_at: datetime,
+                            rrule: Optional[str], tz: Optional[str], exclude_event_id: Optional[UUID] = None) -> None:
+    conflicts = await find_conflicts(session, user_id, start_at, end_at, rrule, tz, exclude_event_id)
+    if conflicts:
+        raise HTTPException(409, {"message": "Event conflicts with existing events",
+                                  "conflicts": jsonable_encoder(conflicts)})
 
-@app.post("/calendars/{calendar_id}/events", status_code=201)
+
+@app.post("/calendars/{calendar_id}/events", status_code=201, response_model=EventRead)
 async def create_event(calendar_id: UUID, payload: EventCreate, session: AsyncSession = Depends(get_session),
-                       current_user: UserRead = Depends(get_current_user)):
-    cal = (await session.execute(select(Calendar).where(Calendar.id == calendar_id))).scalar_one_or_none()
+                       current_user: UserRead = Depends(get_current_user),
+                       idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+                       check_conflicts: bool = Query(False, description=CHECK_CONFLICTS_HELP)):
+    if idempotency_key:
+        replay = await idempotency.claim(
+            session, current_user.id, idempotency_key,
+            idempotency.fingerprint("create_event", calendar_id, payload.model_dump_json()),
+        )
+        if replay:
+            return replay
+    cal, perm = await resolve_calendar(session, calendar_id, current_user.id)
     if not cal:
         raise HTTPException(404, "Calendar not found")
+    if perm != "owner":
+        raise HTTPException(403, "Only owner can add events")
+    if check_conflicts:
+        await _reject_conflicts(session, current_user.id, payload.start_at, payload.end_at,
+                                payload.rrule, payload.timezone)
     ev = Event(
         calendar_id=calendar_id, owner_user_id=current_user.id,
         title=payload.title, description=payload.description, location=payload.location,
         start_at=payload.start_at, end_at=payload.end_at, timezone=payload.timezone,
         all_day=payload.all_day, visibility=payload.visibility, rrule=payload.rrule
     )
+    await sealing.seal_event(session, ev)
     session.add(ev)
-    await session.commit()
+    await session.flush()
+    if event_span(ev):
+        await refresh_busy_days(session, ev.owner_user_id, *event_span(ev))
+    await add_reminders(session, current_user.id, [(ev.id, ev, payload.reminders)])
+    await record_events(session, [(ev.id, ev.calendar_id)], op="created")
     await session.refresh(ev)
-    return {
-        "id": ev.id, "calendar_id": ev.calendar_id, "owner_user_id": ev.owner_user_id,
-        "title": ev.title, "description": ev.description, "location": ev.location,
-        "start_at": ev.start_at, "end_at": ev.end_at, "timezone": ev.timezone,
-        "all_day": ev.all_day, "visibility": ev.visibility, "rrule": ev.rrule,
-        "created_at": ev.created_at, "updated_at": ev.updated_at
-    }
+    opened = (await sealing.open_events(session, [ev]))[0]
+    response = json_response(
+        {**event_dict(opened, current_user.id), "reminders": reminder_dicts(payload.reminders)}, status_code=201
+    )
+    if idempotency_key:
+        await idempotency.remember(session, current_user.id, idempotency_key, response)
+    await session.commit()
+    return response
+
+IMPORT_CHUNK = 1000  # rows per multi-row INSERT
+MAX_IMPORT_EVENTS = 100_000
+MAX_IMPORT_ERRORS = 50
+
+
+async def _json_items(body: bytes):
+    try:
+        items = json.loads(body)
+    except ValueError:
+        raise HTTPException(400, "Body must be a JSON array of events")
+    if not isinstance(items, list):
+        raise HTTPException(400, "Body must be a JSON array of events")
+    for item in items:
+        yield item
+
+
+@app.post("/calendars/{calendar_id}/events/import", status_code=201)
+async def import_events(
+    calendar_id: UUID,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    current_user: UserRead = Depends(get_current_user),
+):
+    """Bulk-create events from a JSON array or a text/calendar (.ics) body.
+
+    Everything is validated with EventCreate first; one invalid event rejects
+    the whole batch. Rows go in as chunked multi-row INSERTs in one transaction.
+    """
+    cal, perm = await resolve_calendar(session, calendar_id, current_user.id)
+    if not cal:
+        raise HTTPException(404, "Calendar not found")
+    if perm != "owner":
+        raise HTTPException(403, "Only owner can add events")
+
+    if request.headers.get("content-type", "").startswith("text/calendar"):
+        source = ical.iter_ics_events(request.stream())
+    else:
+        source = _json_items(await request.body())
+
+    rows, errors, with_reminders = [], [], []
+    async for item in source:
+        if len(rows) + len(errors) >= MAX_IMPORT_EVENTS:
+            raise HTTPException(413, f"At most {MAX_IMPORT_EVENTS} events per import")
+        try:
+            payload = EventCreate.model_validate(item)
+        except ValidationError as exc:
+            errors.append({"index": len(rows) + len(errors), "errors": exc.errors(include_url=False, include_context=False)})
+            if len(errors) >= MAX_IMPORT_ERRORS:
+                break
+            continue
+        rows.append({
+            "calendar_id": calendar_id, "owner_user_id": current_user.id,
+            "title": payload.title, "description": payload.description, "location": payload.location,
+            "start_at": payload.start_at, "end_at": payload.end_at, "timezone": payload.timezone,
+            "all_day": payload.all_day, "visibility": payload.visibility, "rrule": payload.rrule,
+        })
+        if payload.reminders:
+            with_reminders.append((len(rows) - 1, payload))
+    if errors:
+        raise HTTPException(422, errors)
+
+    await sealing.seal_rows(session, current_user.id, rows)
+    ids: List[UUID] = []
+    for offset in range(0, len(rows), IMPORT_CHUNK):
+        result = await session.execute(insert(Event).returning(Event.id), rows[offset:offset + IMPORT_CHUNK])
+        ids.extend(result.scalars().all())
+    if with_reminders:
+        await add_reminders(session, current_user.id, [(ids[i], p, p.reminders) for i, p in with_reminders])
+
+    spans = [(r["start_at"], r["end_at"]) for r in rows if not r["rrule"]]
+    if spans:
+        await refresh_busy_days(session, current_user.id, min(s for s, _ in spans), max(e for _, e in spans))
+    await record_events(session, [(i, calendar_id) for i in ids], op="created")
+    await session.commit()
+    return {"calendar_id": str(calendar_id), "imported": len(ids), "event_ids": [str(i) for i in ids]}
+
+
+@app.get("/calendars/{calendar_id}/events/export")
+async def export_events(
+    calendar_id: UUID,
+    format: Literal["ics", "ndjson"] = "ics",
+    session: AsyncSession = Depends(get_session),
+    current_user: UserRead = Depends(get_current_user),
+):
+    """Stream a whole calendar as .ics or NDJSON (busy events redacted as usual)."""
+    cal, perm = await resolve_calendar(session, calendar_id, current_user.id)
+    if not cal:
+        raise HTTPException(404, "Calendar not found")
+    if perm is None:
+        raise HTTPException(403, "Not allowed to view this calendar")
 
-@app.put("/events/{event_id}")
+    stmt = select(*EVENT_COLUMNS).where(Event.calendar_id == calendar_id).order_by(Event.start_at.asc(), Event.id.asc())
+
+    async def body():
+        if format == "ics":
+            yield ical.CALENDAR_HEADER
+        async for ev in sealing.open_stream(session, _stream_events(stmt)):
+            item = event_dict(ev, current_user.id)
+            if format == "ics":
+                yield ical.event_to_vevent(item)
+            else:
+                yield dumps(item) + b"\n"
+        if format == "ics":
+            yield ical.CALENDAR_FOOTER
+
+    if format == "ics":
+        return StreamingResponse(
+            body(), media_type="text/calendar",
+            headers={"Content-Disposition": f'attachment; filename="{calendar_id}.ics"'},
+        )
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
+@app.put("/events/{event_id}", response_model=EventRead)
 async def update_event(
     event_id: UUID,
     payload: EventUpdate,
     session: AsyncSession = Depends(get_session),
     current_user: UserRead = Depends(get_current_user),
+    check_conflicts: bool = Query(False, description=CHECK_CONFLICTS_HELP),
 ):
-    ev = (await session.execute(select(Event).where(Event.id == event_id))).scalar_one_or_none()
+    ev, perm = await resolve_event(session, event_id, current_user.id)
     if not ev:
         raise HTTPException(404, "Event not found")
-    if ev.owner_user_id != current_user.id:
+    if perm != "owner":
         raise HTTPException(403, "Only owner can update event")
 
-    for k, v in payload.model_dump(exclude_unset=True).items():
+    old_span = event_span(ev)
+    changes = payload.model_dump(exclude_unset=True)
+    # EventUpdate can only compare the times it was given; check them against the stored ones
+    start_at, end_at = changes.get("start_at", ev.start_at), changes.get("end_at", ev.end_at)
+    if start_at is None or end_at is None:
+        raise HTTPException(400, "start_at and end_at cannot be removed")
+    if aware(end_at) <= aware(start_at):
+        raise HTTPException(400, "end_at must be after start_at")
+    changes.pop("reminders", None)
+    content = {k: changes.pop(k) for k in sealing.SEALED_FIELDS if k in changes}
+    for k, v in changes.items():
         setattr(ev, k, v)
+    await sealing.update_content(session, ev, content)
+    if check_conflicts and changes.keys() & {"start_at", "end_at", "timezone", "rrule"}:
+        await _reject_conflicts(session, ev.owner_user_id, ev.start_at, ev.end_at, ev.rrule, ev.timezone,
+                                exclude_event_id=ev.id)
+    for span in {old_span, event_span(ev)} - {None}:
+        await refresh_busy_days(session, ev.owner_user_id, *span)
+    if payload.reminders is not None:
+        await replace_reminders(session, ev, payload.reminders)
+        ev.updated_at = func.now()  # reminders are part of the owner's view of the event
+    elif changes.keys() & {"start_at", "timezone", "rrule"}:
+        await reschedule(session, ev)
+    await record_events(session, [(ev.id, ev.calendar_id)])
     await session.commit()
     await session.refresh(ev)
-    return {
-        "id": ev.id, "calendar_id": ev.calendar_id, "owner_user_id": ev.owner_user_id,
-        "title": ev.title, "description": ev.description, "location": ev.location,
-        "start_at": ev.start_at, "end_at": ev.end_at, "timezone": ev.timezone,
-        "all_day": ev.all_day, "visibility": ev.visibility, "rrule": ev.rrule,
-        "created_at": ev.created_at, "updated_at": ev.updated_at,
-    }
+    body = event_dict((await sealing.open_events(session, [ev]))[0], current_user.id)
+    if ev.owner_user_id == current_user.id:
+        body["reminders"] = await event_reminders(session, ev.id)
+    return json_response(body)
 
 @app.delete("/events/{event_id}", status_code=204)
 async def delete_event(
@@ -545,13 +929,19 @@ async def delete_event(
     session: AsyncSession = Depends(get_session),
     current_user: UserRead = Depends(get_current_user),
 ):
-    ev = (await session.execute(select(Event).where(Event.id == event_id))).scalar_one_or_none()
+    ev, perm = await resolve_event(session, event_id, current_user.id)
     if not ev:
         raise HTTPException(404, "Event not found")
-    if ev.owner_user_id != current_user.id:
+    if perm != "owner":
         raise HTTPException(403, "Only owner can delete event")
 
+    # tombstones: calendar viewers, plus individual sharees whose shares cascade away
+    await record_events(session, [(ev.id, ev.calendar_id)], op="deleted")
+    await record_event_sharees(session, [ev.id])
     await session.delete(ev)
+    if event_span(ev):
+        await session.flush()
+        await refresh_busy_days(session, ev.owner_user_id, *event_span(ev))
     await session.commit()
     return None
 
@@ -563,20 +953,17 @@ async def share_event(
     session: AsyncSession = Depends(get_session),
     current_user: UserRead = Depends(get_current_user),
 ):
-    ev = (await session.execute(select(Event).where(Event.id == event_id))).scalar_one_or_none()
+    ev, perm = await resolve_event(session, event_id, current_user.id)
     if not ev:
         raise HTTPException(404, "Event not found")
-    if ev.owner_user_id != current_user.id:
+    if perm != "owner":
         raise HTTPException(403, "Only owner can share event")
 
-    exists = (await session.execute(
-        select(EventShare).where(
-            EventShare.event_id == event_id,
-            EventShare.user_id == payload.user_id
-        )
-    )).scalar_one_or_none()
-    if not exists:
-        session.add(EventShare(event_id=event_id, user_id=payload.user_id))
+    # a direct share also settles any pending or declined invitation
+    if await upsert(session, EventShare, {"event_id": event_id, "user_id": payload.user_id, "status": "accepted"},
+                    conflict=["event_id", "user_id"], update=["status"],
+                    where=EventShare.status != "accepted") is not None:
+        await record_events(session, [(event_id, ev.calendar_id)], user_id=payload.user_id, op="shared")
         await session.commit()
     return {"event_id": str(event_id), "user_id": str(payload.user_id), "permission": "view"}
 
@@ -587,10 +974,10 @@ async def unshare_event(
     session: AsyncSession = Depends(get_session),
     current_user: UserRead = Depends(get_current_user),
 ):
-    ev = (await session.execute(select(Event).where(Event.id == event_id))).scalar_one_or_none()
+    ev, perm = await resolve_event(session, event_id, current_user.id)
     if not ev:
         raise HTTPException(404, "Event not found")
-    if ev.owner_user_id != current_user.id:
+    if perm != "owner":
         raise HTTPException(403, "Only owner can unshare event")
 
     row = (await session.execute(
@@ -598,24 +985,174 @@ async def unshare_event(
     )).scalar_one_or_none()
     if row:
         await session.delete(row)
+        await record_events(session, [(event_id, ev.calendar_id)], user_id=user_id, op="unshared")
         await session.commit()
     return None
 
 
+# -------------
+# Invitations / RSVP
+# An invitation is an EventShare row with status "invited"; the invite link
+# carries a signed (event, invitee) token, so following it needs no lookup
+# until the answer is written.
+# -----------------
+@app.post("/events/{event_id}/invitations", status_code=201, response_model=List[InvitationRead])
+async def invite_attendees(
+    event_id: UUID,
+    payload: InvitationCreate,
+    session: AsyncSession = Depends(get_session),
+    current_user: UserRead = Depends(get_current_user),
+):
+    ev, perm = await resolve_event(session, event_id, current_user.id)
+    if not ev:
+        raise HTTPException(404, "Event not found")
+    if perm != "owner":
+        raise HTTPException(403, "Only owner can invite attendees")
+
+    # one INSERT ... SELECT for the whole batch: unknown/inactive users drop out,
+    # current attendees are left alone, and anyone who declined is invited again
+    candidates = select(literal(event_id), User.id, literal("invited")).where(
+        User.id.in_(payload.user_ids), User.is_active.is_(True), User.id != ev.owner_user_id,
+    )
+    stmt = pg_insert(EventShare).from_select(["event_id", "user_id", "status"], candidates)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[EventShare.event_id, EventShare.user_id],
+        set_={"status": "invited", "responded_at": None},
+        where=EventShare.status == "declined",
+    ).returning(EventShare.user_id)
+    invited = (await session.execute(stmt)).scalars().all()
+    await realtime.publish(session, [
+        m for u in invited for m in realtime.event_messages("invited", ev.calendar_id, [event_id], u)
+    ])
+
+    attendees = (await session.execute(
+        select(EventShare.user_id, EventShare.status)
+        .where(EventShare.event_id == event_id, EventShare.user_id.in_(payload.user_ids))
+    )).all()
+    await session.commit()
+    return json_response([
+        {"user_id": a.user_id, "status": a.status, "token": create_invite_token(event_id, a.user_id)}
+        for a in attendees
+    ], status_code=201)
+
+
+@app.post("/events/{event_id}/invitations/revoke", response_model=List[AttendeeRead])
+async def revoke_invitations(
+    event_id: UUID,
+    payload: InvitationCreate,
+    session: AsyncSession = Depends(get_session),
+    current_user: UserRead = Depends(get_current_user),
+):
+    """Remove attendees in one DELETE; returns who was removed and their last status."""
+    ev, perm = await resolve_event(session, event_id, current_user.id)
+    if not ev:
+        raise HTTPException(404, "Event not found")
+    if perm != "owner":
+        raise HTTPException(403, "Only owner can revoke invitations")
+
+    removed = (await session.execute(
+        delete(EventShare)
+        .where(EventShare.event_id == event_id, EventShare.user_id.in_(payload.user_ids))
+        .returning(EventShare.user_id, EventShare.status)
+    )).all()
+    await record_event_users(session, event_id, ev.calendar_id, [r.user_id for r in removed], "unshared")
+    await session.commit()
+    return json_response([{"user_id": r.user_id, "status": r.status} for r in removed])
+
+
+@app.get("/events/{event_id}/attendees", response_model=List[AttendeeRead])
+async def list_attendees(
+    event_id: UUID,
+    session: AsyncSession = Depends(get_session),
+    current_user: UserRead = Depends(get_current_user),
+):
+    ev, perm = await resolve_event(session, event_id, current_user.id)
+    if not ev:
+        raise HTTPException(404, "Event not found")
+    if perm is None:
+        raise HTTPException(403, "Not allowed to view this event")
+    rows = (await session.execute(
+        select(EventShare.user_id, EventShare.status)
+        .where(EventShare.event_id == event_id)
+        .order_by(EventShare.status, EventShare.user_id)
+    )).all()
+    return json_response([{"user_id": r.user_id, "status": r.status} for r in rows])
+
+
+async def _answer_invitation(token: str, status: str, session: AsyncSession, user: UserRead) -> Event:
+    target = verify_invite_token(token)
+    if not target:
+        raise HTTPException(400, "Invalid or expired invitation")
+    event_id, invitee_id = target
+    if invitee_id != user.id:
+        raise HTTPException(403, "Invitation is for another user")
+
+    # status + the invitee's view (change log, live push) commit together
+    answered = (await session.execute(
+        update(EventShare)
+        .where(EventShare.event_id == event_id, EventShare.user_id == user.id)
+        .values(status=status, responded_at=func.now())
+        .returning(EventShare.event_id)
+    )).first()
+    if not answered:
+        raise HTTPException(404, "Invitation not found")
+    ev = (await session.execute(select(Event).where(Event.id == event_id))).scalar_one()
+    await record_event_users(session, event_id, ev.calendar_id, [user.id],
+                             "shared" if status == "accepted" else "unshared")
+    await session.commit()
+    return ev
+
+
+@app.post("/invitations/{token}/accept", response_model=EventRead)
+async def accept_invitation(
+    token: str,
+    session: AsyncSession = Depends(get_session),
+    current_user: UserRead = Depends(get_current_user),
+):
+    ev = await _answer_invitation(token, "accepted", session, current_user)
+    return json_response(event_dict((await sealing.open_events(session, [ev]))[0], current_user.id))
+
+
+@app.post("/invitations/{token}/decline", status_code=204)
+async def decline_invitation(
+    token: str,
+    session: AsyncSession = Depends(get_session),
+    current_user: UserRead = Depends(get_current_user),
+):
+    await _answer_invitation(token, "declined", session, current_user)
+    return None
+
+
 @app.post("/events/{event_id}/copy", status_code=201)
 async def copy_event(
     event_id: UUID,
     target_calendar_id: Optional[UUID] = None,
     session: AsyncSession = Depends(get_session),
     current_user: UserRead = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
 ):
-    src = (await session.execute(select(Event).where(Event.id == event_id))).scalar_one_or_none()
+    if idempotency_key:
+        replay = await idempotency.claim(
+            session, current_user.id, idempotency_key,
+            idempotency.fingerprint("copy_event", event_id, target_calendar_id),
+        )
+        if replay:
+            return replay
+    src, perm = await resolve_event(session, event_id, current_user.id)
     if not src:
         raise HTTPException(404, "Event not found")
+    if perm is None:
+        raise HTTPException(403, "Not allowed to view this event")
 
     # default target: any calendar the current user owns
     dest_cal = target_calendar_id
-    if not dest_cal:
+    if dest_cal:
+        target, target_perm = await resolve_calendar(session, dest_cal, current_user.id)
+        if not target:
+            raise HTTPException(404, "Calendar not found")
+        if target_perm != "owner":
+            raise HTTPException(403, "Only owner can add events")
+    else:
         owned_cal = (await session.execute(
             select(Calendar.id).where(Calendar.owner_user_id == current_user.id)
         )).scalars().first()
@@ -623,12 +1160,18 @@ async def copy_event(
             raise HTTPException(400, "You don't own a destination calendar")
         dest_cal = owned_cal
 
+    # only what the caller can see is copied (a "busy" event's slot, not its content);
+    # the content is resealed under the new owner's key
+    if redacted(src, current_user.id):
+        content = SimpleNamespace(**REDACTED)
+    else:
+        content = (await sealing.open_events(session, [src]))[0]
     new_ev = Event(
         calendar_id=dest_cal,
         owner_user_id=current_user.id,
-        title=src.title,
-        description=src.description,
-        location=src.location,
+        title=content.title,
+        description=content.description,
+        location=content.location,
         start_at=src.start_at,
         end_at=src.end_at,
         timezone=src.timezone,
@@ -636,15 +1179,209 @@ async def copy_event(
         visibility=src.visibility,
         rrule=src.rrule,
     )
+    await sealing.seal_event(session, new_ev)
     session.add(new_ev)
-    await session.commit()
-    await session.refresh(new_ev)
-    return {
+    await session.flush()
+    if event_span(new_ev):
+        await refresh_busy_days(session, new_ev.owner_user_id, *event_span(new_ev))
+    await record_events(session, [(new_ev.id, dest_cal)], op="created")
+    response = json_response({
         "source_event_id": str(event_id),
         "new_event_id": str(new_ev.id),
         "target_calendar_id": str(dest_cal),
         "status": "copied",
-    }
+    }, status_code=201)
+    if idempotency_key:
+        await idempotency.remember(session, current_user.id, idempotency_key, response)
+    await session.commit()
+    return response
+
+
+# -------------
+# Bulk delete / move / copy
+# The selection is read once (with the caller's permission on every row),
+# then changed with one set-based DELETE, UPDATE or INSERT ... SELECT.
+# -----------------
+MAX_BULK_EVENTS = 5000
+
+_COPY_COLUMNS = ("title", "description", "location", "start_at", "end_at", "timezone", "all_day", "visibility", "rrule")
+
+
+def _copy_columns(viewer_id: UUID) -> list:
+    """_COPY_COLUMNS + sealed as SQL expressions, redacted where the viewer only sees "busy"."""
+    hidden = and_(Event.visibility == "busy", Event.owner_user_id != viewer_id)
+    shown = {**REDACTED, "sealed": None}
+    return [
+        case((hidden, null() if shown[c] is None else literal(shown[c])), else_=getattr(Event, c))
+        if c in shown else getattr(Event, c)
+        for c in (*_COPY_COLUMNS, "sealed")
+    ]
+
+
+async def _select_events(session: AsyncSession, selection: EventSelection, user_id: UUID, need: str) -> list:
+    """Rows (EVENT_COLUMNS) of the selection, locked; 403/404 unless the caller may `need` every one.
+
+    need is "owner" for changes, or "view" for copying out of the selection.
+    """
+    ev_shared = EventShare.user_id.is_not(None).label("ev_shared")
+    stmt = (
+        select(*EVENT_COLUMNS, Calendar.owner_user_id.label("calendar_owner_id"),
+               Calendar.visibility.label("calendar_visibility"), ev_shared)
+        .join(Calendar, Calendar.id == Event.calendar_id)
+        .outerjoin(EventShare, and_(EventShare.event_id == Event.id, EventShare.user_id == user_id,
+                                    EventShare.status != "declined"))
+        .order_by(Event.start_at, Event.id)
+        .limit(MAX_BULK_EVENTS + 1)
+        .with_for_update(of=Event)
+    )
+    if selection.event_ids is not None:
+        wanted = set(selection.event_ids)
+        rows = (await session.execute(stmt.where(Event.id.in_(wanted)))).all()
+        if len(rows) < len(wanted):
+            raise HTTPException(404, "Event not found")
+    else:
+        # one calendar: its permission covers every event in it
+        cal, perm = await resolve_calendar(session, selection.calendar_id, user_id)
+        if not cal:
+            raise HTTPException(404, "Calendar not found")
+        if perm is None or (need == "owner" and perm != "owner"):
+            raise HTTPException(403, "Only owner can change these events" if perm else "Not allowed to view this calendar")
+        filters = [Event.calendar_id == selection.calendar_id]
+        windowed = bool(selection.start_from or selection.start_to)
+        if windowed:
+            filters.append(window_clause(selection.start_from, selection.start_to))
+        if selection.q:
+            filters.append(_text_filter(selection.q, user_id))
+        rows = (await session.execute(stmt.where(*filters))).all()
+        # checked before the recurrence filter below: past the LIMIT the candidates are
+        # already cut off, and the events that would match may be among the missing ones
+        if len(rows) > MAX_BULK_EVENTS:
+            raise HTTPException(400, f"Selection matches more than {MAX_BULK_EVENTS} events")
+        if windowed:
+            rows = [r for r in rows if not r.rrule or occurrences(r, selection.start_from, selection.start_to)]
+        return rows
+
+    shared = (await visible_calendars(session, user_id)).shared
+
+    def allowed(r) -> bool:
+        if user_id in (r.owner_user_id, r.calendar_owner_id):
+            return True
+        return need == "view" and (r.calendar_visibility == "public" or r.calendar_id in shared or r.ev_shared)
+
+    if not all(allowed(r) for r in rows):
+        raise HTTPException(403, "Only owner can change these events" if need == "owner" else "Not allowed to view these events")
+    return rows
+
+
+async def _owned_target(session: AsyncSession, calendar_id: UUID, user_id: UUID) -> None:
+    target, perm = await resolve_calendar(session, calendar_id, user_id)
+    if not target:
+        raise HTTPException(404, "Calendar not found")
+    if perm != "owner":
+        raise HTTPException(403, "Only owner can add events")
+
+
+async def _refresh_busy(session: AsyncSession, rows, owner_id: Optional[UUID] = None) -> None:
+    """Rebuild free/busy for the rows' owners (or owner_id) over the span the rows cover."""
+    spans: Dict[UUID, List[Tuple[datetime, datetime]]] = {}
+    for r in rows:
+        if event_span(r):
+            spans.setdefault(owner_id or r.owner_user_id, []).append(event_span(r))
+    for owner_id, owner_spans in spans.items():
+        await refresh_busy_days(session, owner_id, min(s for s, _ in owner_spans), max(e for _, e in owner_spans))
+
+
+@app.post("/events/bulk/delete")
+async def bulk_delete_events(
+    payload: EventSelection,
+    session: AsyncSession = Depends(get_session),
+    current_user: UserRead = Depends(get_current_user),
+):
+    rows = await _select_events(session, payload, current_user.id, "owner")
+    ids = [r.id for r in rows]
+    if ids:
+        # tombstones first: the sharee rows cascade away with the events
+        await record_events(session, [(r.id, r.calendar_id) for r in rows], op="deleted")
+        await record_event_sharees(session, ids)
+        await session.execute(delete(Event).where(Event.id.in_(ids)), execution_options={"synchronize_session": False})
+        await _refresh_busy(session, rows)
+        await session.commit()
+    return {"deleted": len(ids), "event_ids": [str(i) for i in ids]}
+
+
+@app.post("/events/bulk/move")
+async def bulk_move_events(
+    payload: EventTransfer,
+    session: AsyncSession = Depends(get_session),
+    current_user: UserRead = Depends(get_current_user),
+):
+    target = payload.target_calendar_id
+    await _owned_target(session, target, current_user.id)
+    rows = [r for r in await _select_events(session, payload, current_user.id, "owner") if r.calendar_id != target]
+    ids = [r.id for r in rows]
+    if ids:
+        # owners stay the same, so free/busy is unaffected
+        await session.execute(
+            update(Event).where(Event.id.in_(ids)).values(calendar_id=target, updated_at=func.now()),
+            execution_options={"synchronize_session": False},
+        )
+        # gone for the old calendars' audience, new for the target's
+        await record_events(session, [(r.id, r.calendar_id) for r in rows], op="deleted")
+        await record_events(session, [(i, target) for i in ids], op="created")
+        await session.commit()
+    return {"moved": len(ids), "target_calendar_id": str(target), "event_ids": [str(i) for i in ids]}
+
+
+@app.post("/events/bulk/copy", status_code=201)
+async def bulk_copy_events(
+    payload: EventTransfer,
+    session: AsyncSession = Depends(get_session),
+    current_user: UserRead = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    if idempotency_key:
+        replay = await idempotency.claim(
+            session, current_user.id, idempotency_key,
+            idempotency.fingerprint("bulk_copy_events", payload.model_dump_json()),
+        )
+        if replay:
+            return replay
+    target = payload.target_calendar_id
+    await _owned_target(session, target, current_user.id)
+    rows = await _select_events(session, payload, current_user.id, "view")
+
+    new_ids: List[UUID] = []
+    if rows and sealing.ENABLED:
+        # content has to be resealed under the new owner's key, so it goes through Python
+        copies = [
+            {"calendar_id": target, "owner_user_id": current_user.id, **{c: getattr(r, c) for c in _COPY_COLUMNS},
+             **(REDACTED if redacted(r, current_user.id) else {})}
+            for r in await sealing.open_events(session, rows)
+        ]
+        await sealing.seal_rows(session, current_user.id, copies)
+        new_ids = (await session.execute(
+            insert(Event).returning(Event.id, sort_by_parameter_order=True), copies
+        )).scalars().all()
+    elif rows:
+        new_ids = (await session.execute(insert(Event).from_select(
+            ["id", "calendar_id", "owner_user_id", *_COPY_COLUMNS, "sealed"],
+            select(func.gen_random_uuid(), literal(target), literal(current_user.id),
+                   *_copy_columns(current_user.id))
+            .where(Event.id.in_([r.id for r in rows]))
+            .order_by(Event.start_at, Event.id),
+        ).returning(Event.id))).scalars().all()
+    if rows:
+        await _refresh_busy(session, rows, owner_id=current_user.id)
+        await record_events(session, [(i, target) for i in new_ids], op="created")
+    response = json_response({
+        "copied": len(new_ids),
+        "target_calendar_id": str(target),
+        "event_ids": [str(i) for i in new_ids],
+    }, status_code=201)
+    if idempotency_key:
+        await idempotency.remember(session, current_user.id, idempotency_key, response)
+    await session.commit()
+    return response
 
 
 # -------------
@@ -656,24 +1393,269 @@ async def register_browser_push(
     session: AsyncSession = Depends(get_session),
     current_user: UserRead = Depends(get_current_user),
 ):
-    existing = (await session.execute(
-        select(PushSubscription).where(PushSubscription.endpoint == sub.endpoint)
-    )).scalar_one_or_none()
-
-    if existing:
-        existing.user_id = current_user.id
-        existing.p256dh = sub.keys.get("p256dh")
-        existing.auth   = sub.keys.get("auth")
-        await session.commit()
-        await session.refresh(existing)
-        return {"status": "updated", "endpoint": sub.endpoint}
-
-    row = PushSubscription(
-        user_id=current_user.id,
-        endpoint=sub.endpoint,
-        p256dh=sub.keys.get("p256dh"),
-        auth=sub.keys.get("auth"),
+    keys = sub.keys or {}
+    try:
+        await check_subscription(sub.endpoint, keys.get("p256dh"), keys.get("auth"))
+    except ValueError as exc:
+        raise HTTPException(400, f"Invalid push subscription: {exc}")
+    inserted = await upsert(
+        session, PushSubscription,
+        {"user_id": current_user.id, "endpoint": sub.endpoint, "p256dh": keys.get("p256dh"), "auth": keys.get("auth")},
+        conflict=["endpoint"], update=["user_id", "p256dh", "auth"],
     )
-    session.add(row)
     await session.commit()
-    return {"status": "registered", "endpoint": sub.endpoint}
+    return {"status": "registered" if inserted else "updated", "endpoint": sub.endpoint}
+
+
+# -------------
+# Live change notifications (Server-Sent Events)
+# -----------------
+async def _visible_ids(session: AsyncSession, user_id: UUID) -> Tuple[Set[UUID], Set[UUID]]:
+    calendar_ids = set((await visible_calendars(session, user_id)).agenda)
+    event_ids = set((await session.execute(shared_event_ids(user_id))).scalars())
+    return calendar_ids, event_ids
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+async def _notification_frames(request: Request, user_id: UUID, calendar_ids: Set[UUID], event_ids: Set[UUID]):
+    stream = realtime.hub.connect(user_id, calendar_ids, event_ids)
+    try:
+        yield "retry: 5000\n" + _sse("ready", {"user_id": str(stream.user_id)})
+        while True:
+            try:
+                message = await asyncio.wait_for(stream.queue.get(), realtime.PUSH_HEARTBEAT)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": ping\n\n"
+                continue
+            if message is None or stream.overflowed:
+                # fell behind (or missed messages): the client catches up via /sync and reconnects
+                yield _sse("resync", {})
+                break
+            if message["user_id"] and (message["type"] == "calendar" or message["op"] in ("shared", "unshared")):
+                # this user's access changed; re-read what the stream may see (short-lived session)
+                async with SessionLocal() as session:
+                    realtime.hub.update_access(stream, *await _visible_ids(session, stream.user_id))
+            yield _sse(message["type"], message)
+    finally:
+        realtime.hub.disconnect(stream)
+
+
+@app.get("/notifications/stream")
+async def notification_stream(request: Request, access_token: Optional[str] = None):
+    """Event/calendar change notifications for the caller, as text/event-stream.
+
+    EventSource cannot send headers, so the token may also come as ?access_token=.
+    Messages carry ids only; fetch the details with GET /sync.
+    """
+    header = request.headers.get("authorization", "")
+    token = header[7:] if header.lower().startswith("bearer ") else access_token
+    # no request-scoped session: an open stream must not hold a pooled connection
+    async with SessionLocal() as session:
+        user = await _authenticate(token, session)
+        calendar_ids, event_ids = await _visible_ids(session, user.id)
+    return StreamingResponse(
+        _notification_frames(request, user.id, calendar_ids, event_ids),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# -------------
+# Delta sync (change tokens instead of re-downloading every calendar)
+# -----------------
+@app.get("/sync")
+async def sync(
+    token: Optional[str] = None,
+    session: AsyncSession = Depends(get_session),
+    current_user: UserRead = Depends(get_current_user),
+):
+    """Changes since `token`; without a (valid) token the client must do a full fetch first.
+
+    Keep calling with the returned sync_token while has_more is true. A token
+    older than the retained change log gets a 410 and a fresh token to resync from.
+    """
+    cursor = read_sync_token(token, current_user.id) if token else None
+    if cursor is None:
+        return {
+            "sync_token": make_sync_token(current_user.id, await current_cursor(session)),
+            "full_sync_required": True,
+        }
+
+    changes = await changes_since(session, current_user.id, cursor)
+    if changes is None:
+        return json_response({
+            "detail": "Sync token has expired",
+            "sync_token": make_sync_token(current_user.id, await current_cursor(session)),
+            "full_sync_required": True,
+        }, status_code=410)
+    return json_response({
+        "sync_token": make_sync_token(current_user.id, changes["cursor"]),
+        "full_sync_required": False,
+        "has_more": changes["has_more"],
+        "events": event_dicts(await sealing.open_events(session, changes["events"]), current_user.id),
+        "deleted": changes["deleted"],
+        "calendars_added": changes["calendars_added"],
+        "calendars_removed": changes["calendars_removed"],
+    })
+
+
+# -------------
+# Batch reads (one round trip for a page load)
+# -----------------
+def _sub_request(path: str, query: Dict[str, object], if_none_match: Optional[str]) -> Request:
+    """Minimal Request for a handler called from /batch: its own query string and validators only."""
+    qs = urlencode({k: v.isoformat() if isinstance(v, datetime) else v for k, v in query.items() if v is not None})
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({
+        "type": "http", "method": "GET", "scheme": "http", "server": ("batch", 80),
+        "path": path, "query_string": qs.encode(), "headers": headers,
+    })
+
+
+async def _run_batch_item(item, session: AsyncSession, user: UserRead) -> Response:
+    if isinstance(item, BatchGetUser):
+        sub = _sub_request(f"/users/{item.user_id}", {}, item.if_none_match)
+        return await get_user(id=item.user_id, request=sub, session=session, current_user=user)
+    if isinstance(item, BatchGetCalendar):
+        sub = _sub_request(f"/calendars/{item.calendar_id}", {}, item.if_none_match)
+        return await get_calendar(calendar_id=item.calendar_id, request=sub, session=session, current_user=user)
+    if isinstance(item, BatchListEvents):
+        query = {"q": item.q, "start_from": item.start_from, "start_to": item.start_to,
+                 "expand": item.expand or None, "limit": item.limit, "cursor": item.cursor}
+        sub = _sub_request(f"/calendars/{item.calendar_id}/events", query, item.if_none_match)
+        return await list_events(
+            calendar_id=item.calendar_id, request=sub, q=item.q, start_from=item.start_from,
+            start_to=item.start_to, expand=item.expand, limit=item.limit, cursor=item.cursor,
+            stream=False, session=session, current_user=user,
+        )
+    if isinstance(item, BatchGetEvent):
+        sub = _sub_request(f"/events/{item.event_id}", {}, item.if_none_match)
+        return await get_event(event_id=item.event_id, request=sub, session=session, current_user=user)
+    if isinstance(item, BatchAgenda):
+        return await get_agenda(start_from=item.start_from, start_to=item.start_to, expand=item.expand,
+                                session=session, current_user=user)
+    raise HTTPException(400, "Unsupported batch operation")
+
+
+@app.post("/batch")
+async def batch(
+    payload: BatchRequest,
+    session: AsyncSession = Depends(get_read_session),
+    current_user: UserRead = Depends(get_current_user),
+):
+    """Run up to 50 read requests with one auth check, one connection and one snapshot.
+
+    Results come back in request order as {id, status, headers, body}; a failing
+    item gets its own error status without failing the rest.
+    """
+    # one AsyncSession cannot run statements concurrently, so items run in order on a
+    # single REPEATABLE READ snapshot, and calendar/event access is resolved once
+    await session.rollback()
+    await session.connection(execution_options={"isolation_level": "REPEATABLE READ", "postgresql_readonly": True})
+    memoize_access(session)
+
+    parts = []
+    for item in payload.requests:
+        try:
+            response = await _run_batch_item(item, session, current_user)
+            body = response.body if response.status_code != 304 else b"null"
+        except HTTPException as exc:
+            response, body = Response(status_code=exc.status_code), dumps({"detail": exc.detail})
+        headers = {k: response.headers[k] for k in ("etag", "x-next-cursor") if k in response.headers}
+        meta = dumps({"id": item.id, "status": response.status_code, "headers": headers})
+        # handler bodies are already JSON bytes; splice them in instead of re-encoding
+        parts.append(meta[:-1] + b',"body":' + body + b"}")
+    return Response(b'{"results":[' + b",".join(parts) + b"]}", media_type="application/json")
+
+
+# -------------
+# Free/busy (busy slots only, no event details)
+# -----------------
+async def _free_busy_users(session: AsyncSession, user_ids: List[UUID], current_user: UserRead) -> List[UUID]:
+    """user_ids without duplicates; 403 unless the caller may see every one's busy times."""
+    user_ids = list(dict.fromkeys(user_ids))
+    if set(user_ids) - await free_busy_audience(session, current_user.id, user_ids):
+        raise HTTPException(403, "Not allowed to see free/busy of these users")
+    return user_ids
+
+
+@app.post("/freebusy")
+async def query_free_busy(
+    payload: FreeBusyQuery,
+    session: AsyncSession = Depends(get_read_session),
+    current_user: UserRead = Depends(get_current_user),
+):
+    user_ids = await _free_busy_users(session, payload.user_ids, current_user)
+    busy = await free_busy(session, user_ids, payload.start_at, payload.end_at)
+    return {
+        str(user_id): [BusyInterval(start_at=s, end_at=e) for s, e in intervals]
+        for user_id, intervals in busy.items()
+    }
+
+
+@app.post("/freebusy/next-slot", response_model=BusyInterval)
+async def find_next_free_slot(
+    payload: FreeSlotQuery,
+    session: AsyncSession = Depends(get_read_session),
+    current_user: UserRead = Depends(get_current_user),
+):
+    """Earliest time in the window when every listed user is free for duration_minutes."""
+    user_ids = await _free_busy_users(session, payload.user_ids, current_user)
+    slot = await next_free_slot(session, user_ids,
+                                timedelta(minutes=payload.duration_minutes), payload.start_at, payload.end_at)
+    if slot is None:
+        raise HTTPException(404, "No free slot in the window")
+    return BusyInterval(start_at=slot[0], end_at=slot[1])
+
+
+@app.post("/conflicts", response_model=List[ConflictRead])
+async def list_conflicts(
+    payload: ConflictQuery,
+    session: AsyncSession = Depends(get_read_session),
+    current_user: UserRead = Depends(get_current_user),
+):
+    """The caller's own events overlapping a proposed time; a recurring one is checked CONFLICT_HORIZON_DAYS ahead."""
+    return json_response(await find_conflicts(
+        session, current_user.id, payload.start_at, payload.end_at,
+        payload.rrule, payload.timezone, payload.exclude_event_id,
+    ))
+
+
+# -------------
+# Ops (per-worker metrics; not part of the public API, admins only)
+# -----------------
+@app.get("/readyz")
+async def get_readiness():
+    """200 while this worker takes traffic and its pool can hand out a working connection, else 503."""
+    status_code, body = await readiness()
+    return json_response(body, status_code=status_code)
+
+
+@app.get("/internal/pool", dependencies=[Depends(get_admin_user)])
+async def get_pool_status():
+    return {**pool_status(), "replicas": replica_status()}
+
+
+@app.get("/internal/push", dependencies=[Depends(get_admin_user)])
+async def get_push_status():
+    return realtime.stats()
+
+
+@app.get("/internal/reminders", dependencies=[Depends(get_admin_user)])
+async def get_reminder_status():
+    return reminder_scheduler.stats()
+
+
+@app.get("/internal/crypto", dependencies=[Depends(get_admin_user)])
+async def get_crypto_status():
+    return sealing.status()
+
+
+@app.get("/internal/visibility", dependencies=[Depends(get_admin_user)])
+async def get_visibility_status():
+    return visible_cache_status()
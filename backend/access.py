@@ -0,0 +1,347 @@
+# backend/access.py
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Set, Tuple, Literal
+from uuid import UUID
+
+from sqlalchemy import select, and_, delete, event, false, func, insert, literal, union, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+
+from . import realtime
+from .cache import LRUCache
+from .db import SessionLocal
+from .models import Calendar, CalendarShare, CalendarSubscription, Event, EventShare, UserVisibleCalendar
+
+# --------------------------------------------------------------------
+# Access resolution
+# Whether a calendar is shared with the caller comes from their cached
+# visible-calendar sets (below), so resolving a calendar is one select of the
+# row, plus one query to build the caller's sets on a cache miss. Events are
+# read in one query joined to their calendar and the caller's event share.
+# Read-only multi-step requests (POST /batch) can memoize results on the
+# session so the same calendar or event is only resolved once.
+# --------------------------------------------------------------------
+
+Permission = Literal["owner", "public", "shared", "event_shared"]
+
+_MEMO = "access_memo"
+
+
+def memoize_access(session: AsyncSession) -> None:
+    """Cache resolve_* results for the rest of this session; only for sessions that do not write."""
+    session.info[_MEMO] = {}
+
+
+def _calendar_permission(owner_user_id: UUID, visibility: str, is_shared: bool,
+                         user_id: UUID) -> Optional[Permission]:
+    if owner_user_id == user_id:
+        return "owner"
+    if visibility == "public":
+        return "public"
+    if is_shared:
+        return "shared"
+    return None
+
+
+async def resolve_calendar(
+    session: AsyncSession, calendar_id: UUID, user_id: UUID
+) -> Tuple[Optional[Calendar], Optional[Permission]]:
+    """Return (calendar, permission); (None, None) when the calendar does not exist.
+
+    The row is selected on its own; "shared" comes from the caller's visible sets.
+    """
+    memo = session.info.get(_MEMO)
+    if memo is not None and ("calendar", calendar_id, user_id) in memo:
+        return memo["calendar", calendar_id, user_id]
+    visible = await visible_calendars(session, user_id)
+    cal = (await session.execute(select(Calendar).where(Calendar.id == calendar_id))).scalar_one_or_none()
+    result = (None, None)
+    if cal is not None:
+        is_shared = calendar_id in visible.shared
+        result = (cal, _calendar_permission(cal.owner_user_id, cal.visibility, is_shared, user_id))
+    if memo is not None:
+        memo["calendar", calendar_id, user_id] = result
+    return result
+
+
+async def resolve_event(
+    session: AsyncSession, event_id: UUID, user_id: UUID
+) -> Tuple[Optional[Event], Optional[Permission]]:
+    """Return (event, permission); (None, None) when the event does not exist.
+
+    "owner" means the caller owns the event or the calendar holding it. The
+    calendar's owner/visibility and the caller's event share come with the row;
+    calendar shares come from the caller's visible sets.
+    """
+    memo = session.info.get(_MEMO)
+    if memo is not None and ("event", event_id, user_id) in memo:
+        return memo["event", event_id, user_id]
+    visible = await visible_calendars(session, user_id)
+    stmt = (
+        select(
+            Event,
+            Calendar.owner_user_id,
+            Calendar.visibility,
+            EventShare.user_id.is_not(None),
+        )
+        .join(Calendar, Calendar.id == Event.calendar_id)
+        .outerjoin(
+            EventShare,
+            # invitees may look at the event before answering; declining drops access
+            and_(EventShare.event_id == Event.id, EventShare.user_id == user_id, EventShare.status != "declined"),
+        )
+        .where(Event.id == event_id)
+    )
+    row = (await session.execute(stmt)).first()
+    result = (None, None)
+    if row is not None:
+        ev, cal_owner_id, cal_visibility, ev_shared = row
+        if ev.owner_user_id == user_id:
+            perm = "owner"
+        else:
+            perm = _calendar_permission(cal_owner_id, cal_visibility, ev.calendar_id in visible.shared, user_id)
+            if perm is None and ev_shared:
+                perm = "event_shared"
+        result = (ev, perm)
+    if memo is not None:
+        memo["event", event_id, user_id] = result
+    return result
+
+
+def agenda_calendar_ids(user_id: UUID):
+    """Set-valued select of the calendars that feed a user's agenda (the SQL side of Visible.agenda)."""
+    return select(UserVisibleCalendar.calendar_id).where(
+        UserVisibleCalendar.user_id == user_id,
+        UserVisibleCalendar.is_hidden.is_(False),
+    )
+
+
+def shared_event_ids(user_id: UUID):
+    """Select of events shared with the user individually (and accepted, for invitations)."""
+    return select(EventShare.event_id).where(EventShare.user_id == user_id, EventShare.status == "accepted")
+
+
+async def free_busy_audience(session: AsyncSession, user_id: UUID, user_ids: Iterable[UUID]) -> Set[UUID]:
+    """Those of user_ids whose busy times user_id may see.
+
+    That is themselves, anyone on either side of a calendar share with them,
+    and the (not declined) attendees of events they own.
+    """
+    others = {u for u in user_ids if u != user_id}
+    if not others:
+        return {user_id}
+    shared_by_me = (
+        select(CalendarShare.user_id)
+        .join(Calendar, Calendar.id == CalendarShare.calendar_id)
+        .where(Calendar.owner_user_id == user_id, CalendarShare.user_id.in_(others))
+    )
+    shared_with_me = (
+        select(Calendar.owner_user_id)
+        .join(CalendarShare, CalendarShare.calendar_id == Calendar.id)
+        .where(CalendarShare.user_id == user_id, Calendar.owner_user_id.in_(others))
+    )
+    my_attendees = (
+        select(EventShare.user_id)
+        .join(Event, Event.id == EventShare.event_id)
+        .where(Event.owner_user_id == user_id, EventShare.user_id.in_(others), EventShare.status != "declined")
+    )
+    allowed = (await session.execute(union(shared_by_me, shared_with_me, my_attendees))).scalars().all()
+    return {user_id, *allowed}
+
+
+# --------------------------------------------------------------------
+# Visible-calendar sets
+# UserVisibleCalendar materializes, per user, the calendars they own, have
+# been shared, or subscribe to while public. Each worker caches a user's rows
+# as two frozensets, so "is this calendar shared with me" and "which
+# calendars feed my agenda" are set lookups instead of joins over shares and
+# subscriptions. Public calendars need no set: visibility is on the row.
+#
+# Writes that change a calendar's owner, shares, subscriptions or visibility
+# call refresh_visible() for that calendar inside their transaction. Cached
+# sets are dropped when such a change commits: in the writing worker at
+# once, in the others when the realtime "calendar" message for the user
+# arrives. That message only crosses workers with PUSH_BACKEND=postgres,
+# which serve.py requires whenever it runs several; a listener reconnect drops
+# every set. VISIBLE_CACHE_TTL is only a backstop on top of that.
+#
+# VISIBLE_CACHE_SIZE   users whose sets are kept per worker
+# VISIBLE_CACHE_TTL    seconds a cached set is trusted
+#
+# Fill the table once for existing data with: python -m backend.access
+# --------------------------------------------------------------------
+
+VISIBLE_CACHE_SIZE = int(os.getenv("VISIBLE_CACHE_SIZE", "10000"))
+VISIBLE_CACHE_TTL = float(os.getenv("VISIBLE_CACHE_TTL", "60"))
+
+_STALE = "visible_stale"
+
+
+@dataclass(frozen=True)
+class Visible:
+    shared: FrozenSet[UUID]  # shared with the user: grants "shared" permission
+    agenda: FrozenSet[UUID]  # owned, shared and subscribed public calendars, minus hidden ones
+
+
+_visible = LRUCache(maxsize=VISIBLE_CACHE_SIZE, ttl=VISIBLE_CACHE_TTL)
+_epoch = 0  # bumped on every drop; a load that overlapped one is not cached
+
+
+def _drop(user_ids: Optional[Iterable[UUID]]) -> None:
+    """Forget the cached sets of user_ids (None: everyone's)."""
+    global _epoch
+    _epoch += 1
+    if user_ids is None:
+        _visible.clear()
+        return
+    for uid in user_ids:
+        _visible.pop(uid)
+
+
+def _on_message(message: Optional[Dict[str, Any]]) -> None:
+    if message is None:
+        _drop(None)
+    elif message.get("type") == "calendar" and message.get("user_id"):
+        _drop([UUID(message["user_id"])])
+
+
+realtime.observe(_on_message)
+
+
+def forget_visible(session: AsyncSession, user_ids: Iterable[UUID]) -> None:
+    """Drop these users' cached sets in this worker once the session commits."""
+    session.info.setdefault(_STALE, set()).update(user_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_stale(session: Session) -> None:
+    stale = session.info.pop(_STALE, None)
+    if stale:
+        _drop(stale)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _keep_cached(session: Session, previous_transaction) -> None:
+    session.info.pop(_STALE, None)
+
+
+async def _load_visible(session: AsyncSession, user_id: UUID) -> Visible:
+    rows = (await session.execute(
+        select(UserVisibleCalendar.calendar_id, UserVisibleCalendar.via, UserVisibleCalendar.is_hidden)
+        .where(UserVisibleCalendar.user_id == user_id)
+    )).all()
+    return Visible(
+        shared=frozenset(r.calendar_id for r in rows if r.via == "shared"),
+        agenda=frozenset(r.calendar_id for r in rows if not r.is_hidden),
+    )
+
+
+async def visible_calendars(session: AsyncSession, user_id: UUID) -> Visible:
+    """The user's visible-calendar sets, from this worker's cache when it has them."""
+    found = _visible.get(user_id)
+    if found is not None:
+        return found
+    memo = session.info.get(_MEMO)
+    if memo is not None and ("visible", user_id) in memo:
+        return memo["visible", user_id]
+    epoch = _epoch
+    if session.info.get("replica"):
+        # a lagging replica could still show rows from before the last drop
+        async with SessionLocal() as primary:
+            found = await _load_visible(primary, user_id)
+    else:
+        found = await _load_visible(session, user_id)
+    if memo is not None:
+        # a batch reads one snapshot, which may predate a drop: keep it to this session
+        memo["visible", user_id] = found
+    elif epoch == _epoch and not session.info.get(_STALE):
+        # (rows written by this still-open transaction are not cached either)
+        _visible.set(user_id, found)
+    return found
+
+
+def _visible_rows(calendar_id: Optional[UUID] = None, user_ids: Optional[list] = None):
+    """Select of UserVisibleCalendar rows derived from calendars, shares and subscriptions."""
+    owned = select(
+        Calendar.owner_user_id.label("user_id"), Calendar.id.label("calendar_id"),
+        literal("owner").label("via"), literal(0).label("rank"),
+    )
+    shared = select(CalendarShare.user_id, CalendarShare.calendar_id, literal("shared"), literal(1))
+    subscribed = (
+        select(CalendarSubscription.subscriber_user_id, CalendarSubscription.calendar_id,
+               literal("subscribed"), literal(2))
+        .join(Calendar, Calendar.id == CalendarSubscription.calendar_id)
+        .where(Calendar.visibility == "public")
+    )
+    if calendar_id is not None:
+        owned = owned.where(Calendar.id == calendar_id)
+        shared = shared.where(CalendarShare.calendar_id == calendar_id)
+        subscribed = subscribed.where(CalendarSubscription.calendar_id == calendar_id)
+    if user_ids is not None:
+        owned = owned.where(Calendar.owner_user_id.in_(user_ids))
+        shared = shared.where(CalendarShare.user_id.in_(user_ids))
+        subscribed = subscribed.where(CalendarSubscription.subscriber_user_id.in_(user_ids))
+    src = union_all(owned, shared, subscribed).subquery()
+    sub = aliased(CalendarSubscription)
+    # one row per (user, calendar): owner beats shared beats subscribed
+    return (
+        select(src.c.user_id, src.c.calendar_id, src.c.via, func.coalesce(sub.is_hidden, false()))
+        .outerjoin(sub, and_(sub.subscriber_user_id == src.c.user_id, sub.calendar_id == src.c.calendar_id))
+        .distinct(src.c.user_id, src.c.calendar_id)
+        .order_by(src.c.user_id, src.c.calendar_id, src.c.rank)
+    )
+
+
+_VISIBLE_COLUMNS = ["user_id", "calendar_id", "via", "is_hidden"]
+
+
+async def refresh_visible(session: AsyncSession, calendar_id: UUID,
+                          user_ids: Optional[Iterable[UUID]] = None) -> None:
+    """Rebuild calendar_id's UserVisibleCalendar rows (only user_ids' when given).
+
+    Call after changing the calendar, its shares or its subscriptions, before
+    commit. Everyone whose rows changed has their cached sets dropped at commit.
+    """
+    await session.flush()
+    where = [UserVisibleCalendar.calendar_id == calendar_id]
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        where.append(UserVisibleCalendar.user_id.in_(user_ids))
+    gone = (await session.execute(
+        delete(UserVisibleCalendar).where(*where).returning(UserVisibleCalendar.user_id)
+        .execution_options(synchronize_session=False)
+    )).scalars().all()
+    added = (await session.execute(
+        insert(UserVisibleCalendar)
+        .from_select(_VISIBLE_COLUMNS, _visible_rows(calendar_id, user_ids))
+        .returning(UserVisibleCalendar.user_id)
+    )).scalars().all()
+    forget_visible(session, [*gone, *added])
+
+
+async def rebuild_visible(session: AsyncSession) -> int:
+    """Rebuild the whole table from scratch (first deploy or repair); returns the row count."""
+    await session.execute(delete(UserVisibleCalendar).execution_options(synchronize_session=False))
+    count = (await session.execute(
+        insert(UserVisibleCalendar).from_select(_VISIBLE_COLUMNS, _visible_rows())
+    )).rowcount
+    return count
+
+
+def visible_cache_status() -> Dict[str, Any]:
+    return {"size": len(_visible), "hits": _visible.hits, "misses": _visible.misses}
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    async def _main():
+        async with SessionLocal() as session:
+            count = await rebuild_visible(session)
+            await session.commit()
+        print(f"user_visible_calendars: {count} rows")
+
+    asyncio.run(_main())
@@ -0,0 +1,116 @@
+# backend/auth.py
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from .cache import LRUCache
+from .Api_Pydantic import UserRead
+
+# --------------------------------------------------------------------
+# Signed tokens
+# "<base64url(json payload)>.<base64url(hmac-sha256)>", verified locally
+# without a DB round trip. SECRET_KEY comes from .env (loaded by db.py);
+# without it every worker makes up its own key, so tokens only survive
+# until restart and are not accepted across workers.
+#
+# Passwords are not stored yet, so /login cannot check one. DEMO_LOGIN=1
+# lets it issue a token for any active user's email with any non-empty
+# password, for development and demos only; otherwise it refuses everyone.
+# --------------------------------------------------------------------
+
+SECRET_KEY = (os.getenv("SECRET_KEY") or secrets.token_urlsafe(32)).encode()
+ACCESS_TOKEN_TTL = int(os.getenv("ACCESS_TOKEN_TTL", str(12 * 3600)))  # seconds
+INVITE_TOKEN_TTL = int(os.getenv("INVITE_TOKEN_TTL", str(30 * 24 * 3600)))  # seconds
+DEMO_LOGIN = os.getenv("DEMO_LOGIN", "0") == "1"
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _unb64(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def sign(payload: Dict[str, Any]) -> str:
+    body = _b64(json.dumps(payload, separators=(",", ":"), sort_keys=True).encode())
+    mac = hmac.new(SECRET_KEY, body.encode(), hashlib.sha256).digest()
+    return f"{body}.{_b64(mac)}"
+
+
+def unsign(token: str) -> Optional[Dict[str, Any]]:
+    """Payload of a token produced by sign(), or None if tampered with or expired."""
+    try:
+        body, mac = token.split(".")
+        expected = hmac.new(SECRET_KEY, body.encode(), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _unb64(mac)):
+            return None
+        payload = json.loads(_unb64(body))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(payload, dict):
+        return None
+    if "exp" in payload and payload["exp"] < time.time():
+        return None
+    return payload
+
+
+def create_access_token(user_id: UUID) -> str:
+    return sign({"typ": "access", "sub": str(user_id), "exp": int(time.time()) + ACCESS_TOKEN_TTL})
+
+
+def verify_access_token(token: str) -> Optional[UUID]:
+    payload = unsign(token)
+    if not payload or payload.get("typ") != "access":
+        return None
+    try:
+        return UUID(payload["sub"])
+    except (KeyError, ValueError, TypeError):
+        return None
+
+
+def create_invite_token(event_id: UUID, user_id: UUID) -> str:
+    return sign({"typ": "invite", "eid": str(event_id), "sub": str(user_id),
+                 "exp": int(time.time()) + INVITE_TOKEN_TTL})
+
+
+def verify_invite_token(token: str) -> Optional[Tuple[UUID, UUID]]:
+    """(event_id, invitee user_id) from an invite link token, or None."""
+    payload = unsign(token)
+    if not payload or payload.get("typ") != "invite":
+        return None
+    try:
+        return UUID(payload["eid"]), UUID(payload["sub"])
+    except (KeyError, ValueError, TypeError):
+        return None
+
+
+# --------------------------------------------------------------------
+# Resolved-user cache
+# Writes that change a user call invalidate_user(); the TTL bounds how long
+# another worker can keep serving the old row.
+# --------------------------------------------------------------------
+
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+
+_users = LRUCache(maxsize=10_000, ttl=USER_CACHE_TTL)
+
+
+def cached_user(user_id: UUID) -> Optional[UserRead]:
+    return _users.get(user_id)
+
+
+def cache_user(user: UserRead) -> None:
+    _users.set(user.id, user)
+
+
+def invalidate_user(user_id: UUID) -> None:
+    _users.pop(user_id)
@@ -0,0 +1,105 @@
+# bench_crypto.py
+# Cost of event content encryption on the read path: a 10k-event calendar
+# read as plaintext vs sealed (query + open + serialize), plus seal/open of
+# the same rows in memory, inline vs chunked on the crypto thread pool.
+# EVENT_ENCRYPTION_KEY is set here before the backend is imported. Talks to
+# the database from .env directly; run from the project root:
+#   python -m backend.bench_crypto
+import asyncio
+import base64
+import os
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("EVENT_ENCRYPTION_KEY", base64.urlsafe_b64encode(os.urandom(32)).decode())
+
+from sqlalchemy import delete, insert, select  # noqa: E402
+
+from . import sealing  # noqa: E402
+from .db import SessionLocal  # noqa: E402
+from .models import Calendar, Event, User  # noqa: E402
+from .serializers import EVENT_COLUMNS, dumps, event_dicts  # noqa: E402
+
+EVENTS = 10_000
+RUNS = 20
+CHUNK = 5_000
+
+
+def rows_for(cal_id, owner_id, start):
+    rows = []
+    for i in range(EVENTS):
+        begin = start + timedelta(minutes=30 * i)
+        rows.append({
+            "id": uuid.uuid4(), "calendar_id": cal_id, "owner_user_id": owner_id,
+            "title": f"Meeting {i}", "description": "Agenda: " + "notes " * 40,
+            "location": f"Room {i % 50}", "start_at": begin, "end_at": begin + timedelta(minutes=30),
+        })
+    return rows
+
+
+async def seed(session, rows, seal):
+    if seal:
+        await sealing.seal_rows(session, rows[0]["owner_user_id"], rows)
+    for offset in range(0, len(rows), CHUNK):
+        await session.execute(insert(Event), rows[offset:offset + CHUNK])
+    await session.commit()
+
+
+def summary(timings):
+    timings.sort()
+    return f"p50={statistics.median(timings):.1f}ms p95={timings[int(len(timings) * 0.95) - 1]:.1f}ms"
+
+
+async def timed(fn):
+    timings = []
+    for _ in range(RUNS):
+        t0 = time.perf_counter()
+        await fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+    return summary(timings)
+
+
+async def main():
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    async with SessionLocal() as session:
+        user = User(email=f"bench+{uuid.uuid4().hex[:6]}@example.com", full_name="Bench")
+        session.add(user)
+        await session.flush()
+        plain_cal = Calendar(owner_user_id=user.id, name="bench plaintext")
+        sealed_cal = Calendar(owner_user_id=user.id, name="bench sealed")
+        session.add_all([plain_cal, sealed_cal])
+        await session.commit()
+
+        try:
+            await seed(session, rows_for(plain_cal.id, user.id, start), seal=False)
+            await seed(session, rows_for(sealed_cal.id, user.id, start), seal=True)
+
+            for label, cal in (("plaintext", plain_cal), ("sealed", sealed_cal)):
+                stmt = select(*EVENT_COLUMNS).where(Event.calendar_id == cal.id).order_by(Event.start_at, Event.id)
+
+                async def read():
+                    rows = (await session.execute(stmt)).all()
+                    rows = await sealing.open_events(session, rows)
+                    dumps(event_dicts(rows, user.id))
+
+                print(f"{label:<10} query+open+serialize {EVENTS} events  {await timed(read)}")
+
+            rows = (await session.execute(
+                select(*EVENT_COLUMNS).where(Event.calendar_id == sealed_cal.id)
+            )).all()
+            contents = [{name: f"{name} {i} " * 10 for name in sealing.SEALED_FIELDS} for i in range(EVENTS)]
+            for label, inline_rows in (("inline", EVENTS), ("pool", sealing.CRYPTO_INLINE_ROWS)):
+                sealing.CRYPTO_INLINE_ROWS = inline_rows
+                seal_t = await timed(lambda: sealing.seal_rows(session, user.id, [dict(c) for c in contents]))
+                open_t = await timed(lambda: sealing.open_events(session, rows))
+                print(f"{label:<6} seal {EVENTS}: {seal_t}   open {EVENTS}: {open_t}")
+            print("STATUS:", sealing.status())
+        finally:
+            await session.execute(delete(User).where(User.id == user.id))
+            await session.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+# bench_import.py
+# Bulk import/export throughput against a running server (uvicorn on :8000, DEMO_LOGIN=1).
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+BASE = "http://127.0.0.1:8000"
+SIZES = [10_000, 100_000]
+
+
+def make_events(n):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    out = []
+    for i in range(n):
+        begin = start + timedelta(minutes=37 * i)
+        out.append({
+            "title": f"Imported {i}",
+            "description": "bulk import benchmark",
+            "start_at": begin.isoformat(),
+            "end_at": (begin + timedelta(minutes=30)).isoformat(),
+        })
+    return out
+
+
+def make_ics(n):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0"]
+    for i in range(n):
+        begin = start + timedelta(minutes=37 * i)
+        lines += [
+            "BEGIN:VEVENT", f"UID:{uuid.uuid4()}", f"SUMMARY:Imported {i}",
+            f"DTSTART:{begin:%Y%m%dT%H%M%SZ}", "DURATION:PT30M", "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(lines) + "\r\n").encode()
+
+
+async def main():
+    email = f"bench+{uuid.uuid4().hex[:6]}@example.com"
+    async with httpx.AsyncClient(base_url=BASE, timeout=600) as client:
+        r = await client.post("/users", json={"email": email, "password": "BenchPass!234"})
+        r.raise_for_status()
+        r = await client.post("/login", json={"email": email, "password": "BenchPass!234"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        for size in SIZES:
+            for kind in ("json", "ics"):
+                r = await client.post("/calendars", json={"name": f"bench-{kind}-{size}"}, headers=headers)
+                cal_id = r.json()["id"]
+                if kind == "json":
+                    body = {"json": make_events(size)}
+                else:
+                    body = {"content": make_ics(size), "headers": {**headers, "Content-Type": "text/calendar"}}
+                t0 = time.perf_counter()
+                r = await client.post(f"/calendars/{cal_id}/events/import", **({"headers": headers} | body))
+                took = time.perf_counter() - t0
+                print(f"import {kind:>4} {size:>7}: {r.status_code} {took:.2f}s ({size / took:,.0f} events/s)")
+
+                t0 = time.perf_counter()
+                async with client.stream("GET", f"/calendars/{cal_id}/events/export", headers=headers) as resp:
+                    received = 0
+                    async for chunk in resp.aiter_bytes():
+                        received += len(chunk)
+                took = time.perf_counter() - t0
+                print(f"export  ics {size:>7}: {took:.2f}s ({size / took:,.0f} events/s, {received / 1e6:.1f} MB)")
+
+                await client.delete(f"/calendars/{cal_id}", headers=headers)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
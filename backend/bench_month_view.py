@@ -0,0 +1,76 @@
+# bench_month_view.py
+# Month-view latency of the list_events window query as one calendar grows.
+# Talks to the database from .env directly; run from the project root:
+#   python -m backend.bench_month_view
+import asyncio
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert, select
+
+from .db import SessionLocal
+from .models import Calendar, Event, User
+
+SIZES = [1_000, 10_000, 100_000]
+RUNS = 50
+CHUNK = 5_000
+SPAN_DAYS = 3650  # events are spread over ten years
+
+
+async def seed(session, cal_id, owner_id, start, count):
+    for offset in range(0, count, CHUNK):
+        rows = []
+        for _ in range(min(CHUNK, count - offset)):
+            begin = start + timedelta(minutes=random.randrange(SPAN_DAYS * 24 * 60))
+            rows.append({
+                "id": uuid.uuid4(), "calendar_id": cal_id, "owner_user_id": owner_id,
+                "title": "bench", "start_at": begin,
+                "end_at": begin + timedelta(minutes=random.choice([30, 60, 90, 24 * 60])),
+            })
+        await session.execute(insert(Event), rows)
+    await session.commit()
+
+
+async def month_view(session, cal_id, window_start):
+    stmt = (
+        select(Event)
+        .where(Event.calendar_id == cal_id, Event.overlaps(window_start, window_start + timedelta(days=31)))
+        .order_by(Event.start_at.asc())
+    )
+    return len((await session.execute(stmt)).scalars().all())
+
+
+async def main():
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    async with SessionLocal() as session:
+        user = User(email=f"bench+{uuid.uuid4().hex[:6]}@example.com", full_name="Bench")
+        session.add(user)
+        await session.flush()
+        cal = Calendar(owner_user_id=user.id, name="bench")
+        session.add(cal)
+        await session.commit()
+
+        seeded = 0
+        try:
+            for size in SIZES:
+                await seed(session, cal.id, user.id, start, size - seeded)
+                seeded = size
+                timings = []
+                for _ in range(RUNS):
+                    window = start + timedelta(days=random.randrange(SPAN_DAYS - 31))
+                    t0 = time.perf_counter()
+                    await month_view(session, cal.id, window)
+                    timings.append((time.perf_counter() - t0) * 1000)
+                timings.sort()
+                print(f"{size:>7} events: p50={statistics.median(timings):.2f}ms "
+                      f"p95={timings[int(len(timings) * 0.95) - 1]:.2f}ms")
+        finally:
+            await session.execute(delete(User).where(User.id == user.id))
+            await session.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+# bench_push.py
+# Thousands of idle SSE connections against a running server (uvicorn on :8000,
+# DEMO_LOGIN=1), then fan-out latency for a few writes. Raise `ulimit -n` on both ends first.
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+BASE = "http://127.0.0.1:8000"
+CONNECTIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+WRITES = 20
+IDLE_SECONDS = 30
+# /internal/* is admins only: pass an admin's token in ADMIN_TOKEN to see server stats
+ADMIN = {"Authorization": f"Bearer {os.environ['ADMIN_TOKEN']}"} if os.getenv("ADMIN_TOKEN") else {}
+
+
+async def listen(client, headers, ready, arrivals):
+    async with client.stream("GET", "/notifications/stream", headers=headers) as resp:
+        async for line in resp.aiter_lines():
+            if line.startswith("event: ready"):
+                ready.release()
+            elif line.startswith("event: event"):
+                arrivals.append(time.perf_counter())
+
+
+async def main():
+    email = f"bench+{uuid.uuid4().hex[:6]}@example.com"
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=BASE, timeout=None, limits=limits) as client:
+        r = await client.post("/users", json={"email": email, "password": "BenchPass!234"})
+        r.raise_for_status()
+        r = await client.post("/login", json={"email": email, "password": "BenchPass!234"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        cal_id = (await client.post("/calendars", json={"name": "bench-push"}, headers=headers)).json()["id"]
+
+        ready = asyncio.Semaphore(0)
+        arrivals = []
+        t0 = time.perf_counter()
+        tasks = [asyncio.create_task(listen(client, headers, ready, arrivals)) for _ in range(CONNECTIONS)]
+        for _ in range(CONNECTIONS):
+            await ready.acquire()
+        took = time.perf_counter() - t0
+        print(f"connected {CONNECTIONS} streams in {took:.2f}s ({CONNECTIONS / took:,.0f}/s)")
+        print("server:", (await client.get("/internal/push", headers=ADMIN)).json())
+
+        print(f"idling {IDLE_SECONDS}s ...")
+        await asyncio.sleep(IDLE_SECONDS)
+
+        latencies = []
+        start = datetime.now(timezone.utc)
+        for i in range(WRITES):
+            arrivals.clear()
+            sent = time.perf_counter()
+            await client.post(f"/calendars/{cal_id}/events", headers=headers, json={
+                "title": f"push {i}",
+                "start_at": (start + timedelta(hours=i)).isoformat(),
+                "end_at": (start + timedelta(hours=i, minutes=30)).isoformat(),
+            })
+            deadline = time.perf_counter() + 10
+            while len(arrivals) < CONNECTIONS and time.perf_counter() < deadline:
+                await asyncio.sleep(0.01)
+            latencies.extend((t - sent) * 1000 for t in arrivals)
+            print(f"write {i:>2}: {len(arrivals)}/{CONNECTIONS} delivered, last after {(max(arrivals, default=sent) - sent) * 1000:.1f}ms")
+
+        if latencies:
+            latencies.sort()
+            print(f"fan-out latency p50 {statistics.median(latencies):.1f}ms "
+                  f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.1f}ms max {latencies[-1]:.1f}ms")
+        print("server:", (await client.get("/internal/push", headers=ADMIN)).json())
+
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await client.delete(f"/calendars/{cal_id}", headers=headers)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+# bench_reminders.py
+# Reminder throughput against a running server (uvicorn on :8000, DEMO_LOGIN=1,
+# WEBPUSH_ALLOW_PRIVATE=1) using a local stand-in push endpoint on :8099 that
+# accepts every push with 201.
+# Imports REMINDERS events whose reminders fall due over SPREAD_SECONDS and
+# counts how many pushes arrive and how late.
+import asyncio
+import os
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+BASE = "http://127.0.0.1:8000"
+# /internal/* is admins only: pass an admin's token in ADMIN_TOKEN to see server stats
+ADMIN = {"Authorization": f"Bearer {os.environ['ADMIN_TOKEN']}"} if os.getenv("ADMIN_TOKEN") else {}
+PUSH_HOST, PUSH_PORT = "127.0.0.1", 8099
+REMINDERS = 5_000
+SUBSCRIPTIONS = 2
+LEAD_SECONDS = 90       # first reminder fires this long after the import
+SPREAD_SECONDS = 60     # ... and the last one this much later
+
+received = []  # (arrival time, path)
+
+
+async def handle(reader, writer):
+    # just enough HTTP/1.1 for keep-alive POSTs
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            lines = head.decode("latin-1").split("\r\n")
+            length = 0
+            for line in lines[1:]:
+                name, _, value = line.partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            if length:
+                await reader.readexactly(length)
+            received.append((time.time(), lines[0].split(" ")[1]))
+            writer.write(b"HTTP/1.1 201 Created\r\nContent-Length: 0\r\n\r\n")
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def main():
+    server = await asyncio.start_server(handle, PUSH_HOST, PUSH_PORT)
+    email = f"bench+{uuid.uuid4().hex[:6]}@example.com"
+    async with httpx.AsyncClient(base_url=BASE, timeout=600) as client:
+        r = await client.post("/users", json={"email": email, "password": "BenchPass!234"})
+        r.raise_for_status()
+        r = await client.post("/login", json={"email": email, "password": "BenchPass!234"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        for i in range(SUBSCRIPTIONS):
+            await client.post("/notifications/register", headers=headers, json={
+                "endpoint": f"http://{PUSH_HOST}:{PUSH_PORT}/push/{uuid.uuid4()}",
+            })
+        cal_id = (await client.post("/calendars", json={"name": "bench-reminders"}, headers=headers)).json()["id"]
+
+        # reminder fires 1 minute before start, so start = fire + 60s
+        first_fire = datetime.now(timezone.utc) + timedelta(seconds=LEAD_SECONDS)
+        fires = [first_fire + timedelta(seconds=SPREAD_SECONDS * i / REMINDERS) for i in range(REMINDERS)]
+        events = [{
+            "title": f"reminder {i}",
+            "start_at": (fire + timedelta(minutes=1)).isoformat(),
+            "end_at": (fire + timedelta(minutes=31)).isoformat(),
+            "reminders": [{"minutes_before_start": 1}],
+        } for i, fire in enumerate(fires)]
+        r = await client.post(f"/calendars/{cal_id}/events/import", headers=headers, json=events)
+        r.raise_for_status()
+        print(f"imported {REMINDERS} events with reminders, first due at {first_fire:%H:%M:%S}")
+
+        expected = REMINDERS * SUBSCRIPTIONS
+        deadline = time.time() + LEAD_SECONDS + SPREAD_SECONDS + 120
+        while len(received) < expected and time.time() < deadline:
+            await asyncio.sleep(1)
+
+        print(f"received {len(received)}/{expected} pushes")
+        if received:
+            # pushes arrive in fire order, so pair the k-th arrival with the k-th fire time
+            arrivals = sorted(t for t, _ in received)
+            due = sorted(f.timestamp() for f in fires for _ in range(SUBSCRIPTIONS))
+            lateness = sorted(max(a - d, 0.0) for a, d in zip(arrivals, due))
+            span = arrivals[-1] - arrivals[0]
+            print(f"delivery rate {len(arrivals) / max(span, 1e-9) * 60:,.0f}/min over {span:.1f}s")
+            print(f"lateness p50 {statistics.median(lateness):.2f}s "
+                  f"p99 {lateness[int(len(lateness) * 0.99) - 1]:.2f}s max {lateness[-1]:.2f}s")
+        print("server:", (await client.get("/internal/reminders", headers=ADMIN)).json())
+        await client.delete(f"/calendars/{cal_id}", headers=headers)
+    server.close()
+    await server.wait_closed()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
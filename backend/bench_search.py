@@ -0,0 +1,127 @@
+# bench_search.py
+# list_events ?q= latency: the old ILIKE '%q%' scan against the tsvector/GIN
+# match, plus the ranked cross-calendar /search query, as one calendar grows
+# to 1M events. Talks to the database from .env directly; run from the
+# project root:
+#   python -m backend.bench_search
+import asyncio
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, func, insert, or_, select, text
+
+from .Api_Structure import _search_query, _text_filter
+from .access import agenda_calendar_ids
+from .db import SessionLocal
+from .models import Calendar, Event, User
+from .serializers import EVENT_COLUMNS
+
+SIZES = [100_000, 1_000_000]
+RUNS = 20
+CHUNK = 5_000
+SPAN_DAYS = 3650
+
+# Zipf-ish vocabulary: a few words are everywhere, most are rare. Row counts of
+# the two paths differ: ILIKE 'word1' also matches word10, word123, ...
+VOCAB = [f"word{i}" for i in range(5_000)]
+WEIGHTS = [1 / (i + 1) for i in range(len(VOCAB))]
+QUERIES = {
+    "common": "word1",
+    "medium": "word200",
+    "rare": "word4000",
+    "two words": "word3 word50",
+}
+
+
+def words(n):
+    return " ".join(random.choices(VOCAB, WEIGHTS, k=n))
+
+
+async def seed(session, cal_id, owner_id, start, count):
+    for offset in range(0, count, CHUNK):
+        rows = []
+        for _ in range(min(CHUNK, count - offset)):
+            begin = start + timedelta(minutes=random.randrange(SPAN_DAYS * 24 * 60))
+            rows.append({
+                "id": uuid.uuid4(), "calendar_id": cal_id, "owner_user_id": owner_id,
+                "title": words(random.randint(2, 6)),
+                "description": words(random.randint(20, 120)),
+                "start_at": begin, "end_at": begin + timedelta(minutes=60),
+            })
+        await session.execute(insert(Event), rows)
+    await session.commit()
+    await session.execute(text("ANALYZE events"))
+
+
+def ilike_stmt(cal_id, q):
+    ilike = f"%{q}%"
+    return (
+        select(*EVENT_COLUMNS)
+        .where(Event.calendar_id == cal_id, or_(Event.title.ilike(ilike), Event.description.ilike(ilike)))
+        .order_by(Event.start_at, Event.id)
+    )
+
+
+def fts_stmt(cal_id, q, user_id):
+    return (
+        select(*EVENT_COLUMNS)
+        .where(Event.calendar_id == cal_id, _text_filter(q, user_id))
+        .order_by(Event.start_at, Event.id)
+    )
+
+
+def search_stmt(q, user_id):
+    return (
+        select(*EVENT_COLUMNS)
+        .where(Event.calendar_id.in_(agenda_calendar_ids(user_id)), _text_filter(q, user_id))
+        .order_by(func.ts_rank_cd(Event.search_vector, _search_query(q)).desc(), Event.start_at)
+        .limit(50)
+    )
+
+
+async def timed(session, stmt):
+    timings, rows = [], 0
+    for _ in range(RUNS):
+        t0 = time.perf_counter()
+        rows = len((await session.execute(stmt)).all())
+        timings.append((time.perf_counter() - t0) * 1000)
+    timings.sort()
+    return rows, statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+async def main():
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    async with SessionLocal() as session:
+        user = User(email=f"bench+{uuid.uuid4().hex[:6]}@example.com", full_name="Bench")
+        session.add(user)
+        await session.flush()
+        cal = Calendar(owner_user_id=user.id, name="bench")
+        session.add(cal)
+        await session.commit()
+
+        seeded = 0
+        try:
+            for size in SIZES:
+                t0 = time.perf_counter()
+                await seed(session, cal.id, user.id, start, size - seeded)
+                print(f"seeded {size - seeded} events in {time.perf_counter() - t0:.1f}s")
+                seeded = size
+                for label, q in QUERIES.items():
+                    for path, stmt in (
+                        ("ilike", ilike_stmt(cal.id, q)),
+                        ("tsvector", fts_stmt(cal.id, q, user.id)),
+                        ("/search top50", search_stmt(q, user.id)),
+                    ):
+                        rows, p50, p95 = await timed(session, stmt)
+                        print(f"{size:>8} events  {label:<10} {path:<14} rows={rows:<7} "
+                              f"p50={p50:.2f}ms p95={p95:.2f}ms")
+        finally:
+            await session.execute(delete(User).where(User.id == user.id))
+            await session.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
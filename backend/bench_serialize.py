@@ -0,0 +1,93 @@
+# bench_serialize.py
+# Serializing a 10k-event list response, no database needed: the rows are
+# column-projection Rows (what list_events selects) built in memory, a tenth
+# of them "busy" events of another owner. Compares the path the handlers
+# used before serializers.py (a dict literal per event, then FastAPI's
+# jsonable_encoder and json.dumps) with event_dicts() + dumps(), which uses
+# orjson when it is installed. Run from the project root:
+#   python -m backend.bench_serialize
+import json
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.engine.result import result_tuple
+
+from . import serializers
+from .serializers import EVENT_COLUMNS, dumps, event_dicts
+
+EVENTS = 10_000
+RUNS = 20
+
+
+def make_rows(viewer_id, other_id):
+    row = result_tuple([c.key for c in EVENT_COLUMNS])
+    cal_id, start = uuid.uuid4(), datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for i in range(EVENTS):
+        begin = start + timedelta(minutes=30 * i)
+        busy = i % 10 == 0
+        rows.append(row((
+            uuid.uuid4(), cal_id, other_id if busy else viewer_id,
+            f"Meeting {i}", "Agenda: " + "notes " * 40, f"Room {i % 50}",
+            begin, begin + timedelta(minutes=30), "America/New_York",
+            False, "busy" if busy else "private", None,
+            start, begin, None,
+        )))
+    return rows
+
+
+def legacy(rows, viewer_id):
+    # the per-handler code before serializers.py
+    def redact(ev):
+        if ev.visibility == "busy" and ev.owner_user_id != viewer_id:
+            return {
+                "id": ev.id, "calendar_id": ev.calendar_id, "owner_user_id": ev.owner_user_id,
+                "title": "Busy", "description": None, "location": None,
+                "start_at": ev.start_at, "end_at": ev.end_at, "timezone": ev.timezone,
+                "all_day": ev.all_day, "visibility": ev.visibility, "rrule": ev.rrule,
+                "created_at": ev.created_at, "updated_at": ev.updated_at,
+            }
+        return {
+            "id": ev.id, "calendar_id": ev.calendar_id, "owner_user_id": ev.owner_user_id,
+            "title": ev.title, "description": ev.description, "location": ev.location,
+            "start_at": ev.start_at, "end_at": ev.end_at, "timezone": ev.timezone,
+            "all_day": ev.all_day, "visibility": ev.visibility, "rrule": ev.rrule,
+            "created_at": ev.created_at, "updated_at": ev.updated_at,
+        }
+
+    return json.dumps(jsonable_encoder([redact(ev) for ev in rows])).encode()
+
+
+def current(rows, viewer_id):
+    return dumps(event_dicts(rows, viewer_id))
+
+
+def timed(fn, *args):
+    timings = []
+    for _ in range(RUNS):
+        t0 = time.perf_counter()
+        body = fn(*args)
+        timings.append((time.perf_counter() - t0) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1], len(body)
+
+
+def main():
+    viewer_id, other_id = uuid.uuid4(), uuid.uuid4()
+    rows = make_rows(viewer_id, other_id)
+    # same content either way (orjson writes "+00:00" offsets like isoformat)
+    assert json.loads(legacy(rows, viewer_id)) == json.loads(current(rows, viewer_id))
+
+    print(f"{EVENTS} events, {RUNS} runs, orjson {'on' if serializers.orjson else 'off'}")
+    base = None
+    for label, fn in (("dict literal + jsonable_encoder", legacy), ("event_dicts + dumps", current)):
+        p50, p95, size = timed(fn, rows, viewer_id)
+        base = base or p50
+        print(f"{label:<32} p50={p50:7.1f}ms p95={p95:7.1f}ms  x{base / p50:.1f}  {size / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
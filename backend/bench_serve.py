@@ -0,0 +1,147 @@
+# bench_serve.py
+# Requests per second through `python -m backend.serve` as the worker count
+# grows (1, 2, 4, ... up to the CPU count). Each round starts a fresh server,
+# waits for it to answer, then drives it from CLIENTS load-generator
+# processes for DURATION seconds per path:
+#   /openapi.json            CPU only, no database: how the workers scale
+#   /readyz                  one pooled SELECT 1 per request
+#   /calendars/{id}          token check + one query (a typical read)
+# The database paths are skipped when /readyz is not 200. Clients share the
+# machine with the server, so for clean numbers give them their own cores
+# (BENCH_CLIENTS) or run against a server elsewhere. Run from the project root:
+#   python -m backend.bench_serve
+import asyncio
+import multiprocessing
+import os
+import secrets
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+
+PORT = int(os.getenv("BENCH_PORT", "8799"))
+BASE = f"http://127.0.0.1:{PORT}"
+DURATION = float(os.getenv("BENCH_DURATION", "10"))
+CLIENTS = int(os.getenv("BENCH_CLIENTS", str(os.cpu_count() or 1)))
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "32"))  # open connections per client process
+SECRET_KEY = os.getenv("SECRET_KEY") or secrets.token_urlsafe(32)  # same across rounds: the seeded token stays valid
+
+
+def worker_counts():
+    counts, n = [], 1
+    while n < (os.cpu_count() or 1):
+        counts.append(n)
+        n *= 2
+    return counts + [os.cpu_count() or 1]
+
+
+async def _drive(path, headers, deadline):
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY)
+    async with httpx.AsyncClient(base_url=BASE, headers=headers, limits=limits, timeout=30) as client:
+        async def loop():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                try:
+                    r = await client.get(path)
+                    ok = r.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - t0)
+                else:
+                    errors += 1
+        await asyncio.gather(*(loop() for _ in range(CONCURRENCY)))
+    return latencies, errors
+
+
+def _client(args):
+    return asyncio.run(_drive(*args))
+
+
+def load(path, headers):
+    deadline = time.perf_counter() + DURATION
+    with multiprocessing.get_context("spawn").Pool(CLIENTS) as pool:
+        results = pool.map(_client, [(path, headers, deadline)] * CLIENTS)
+    latencies = sorted(l for lat, _ in results for l in lat)
+    errors = sum(e for _, e in results)
+    if not latencies:
+        return 0.0, 0.0, 0.0, errors
+    return (len(latencies) / DURATION, statistics.median(latencies) * 1000,
+            latencies[int(len(latencies) * 0.99) - 1] * 1000, errors)
+
+
+def start_server(workers):
+    # DEMO_LOGIN: seed() signs in through /login; one SECRET_KEY for all workers
+    env = {**os.environ, "WEB_CONCURRENCY": str(workers), "PORT": str(PORT), "LOG_LEVEL": "WARNING", "DEMO_LOGIN": "1",
+           "SECRET_KEY": SECRET_KEY}
+    proc = subprocess.Popen([sys.executable, "-m", "backend.serve"], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(300):
+        try:
+            return proc, httpx.get(f"{BASE}/readyz", timeout=5).status_code == 200
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("server did not come up")
+
+
+def stop_server(proc):
+    proc.terminate()
+    proc.wait(60)
+
+
+def seed():
+    """A user with one calendar; returns (headers, path, email) for the authenticated read."""
+    email = f"bench+{uuid.uuid4().hex[:6]}@example.com"
+    with httpx.Client(base_url=BASE, timeout=20) as client:
+        client.post("/users", json={"email": email, "password": "BenchPass!234"}).raise_for_status()
+        token = client.post("/login", json={"email": email, "password": "BenchPass!234"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        cal = client.post("/calendars", json={"name": "bench"}, headers=headers).json()
+    return headers, f"/calendars/{cal['id']}", email
+
+
+async def cleanup(email):
+    from sqlalchemy import delete
+
+    from .db import SessionLocal, engine
+    from .models import User
+
+    async with SessionLocal() as session:
+        await session.execute(delete(User).where(User.email == email))
+        await session.commit()
+    await engine.dispose()
+
+
+def main():
+    print(f"{os.cpu_count()} CPUs, {CLIENTS} client processes x {CONCURRENCY} connections, {DURATION:.0f}s per run")
+    baseline = {}
+    auth = None
+    for workers in worker_counts():
+        proc, db_ready = start_server(workers)
+        try:
+            paths = [("/openapi.json", {})]
+            if db_ready:
+                auth = auth or seed()
+                paths += [("/readyz", {}), (auth[1], auth[0])]
+            for path, headers in paths:
+                label = "/calendars/{id}" if path.startswith("/calendars/") else path
+                rps, p50, p99, errors = load(path, headers)
+                base = baseline.setdefault(label, rps)
+                print(f"workers={workers:<3} {label:<16} {rps:>9.0f} req/s  x{rps / base if base else 0:.2f}  "
+                      f"p50={p50:.1f}ms p99={p99:.1f}ms errors={errors}")
+        finally:
+            stop_server(proc)
+    if auth is not None:
+        asyncio.run(cleanup(auth[2]))
+    else:
+        print("database not reachable (/readyz != 200): only /openapi.json was measured")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+# backend/changes.py
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import select, insert, delete, exists, union, literal, or_, and_, cast, func, Text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .access import forget_visible, shared_event_ids, visible_calendars
+from .auth import sign, unsign
+from . import realtime
+from .models import (
+    Calendar, CalendarShare, CalendarSubscription, ChangeLog, ChangeLogHorizon, Event, EventShare, PgSnapshot,
+)
+from .serializers import EVENT_COLUMNS
+
+# --------------------------------------------------------------------
+# Change log writers (call inside the write's transaction, before commit)
+# Each writer also stages the matching push messages (realtime.py), so the
+# log and the live notifications cannot drift apart.
+# --------------------------------------------------------------------
+
+SYNC_PAGE = 1000
+
+
+async def record_events(session: AsyncSession, events: Iterable[Tuple[UUID, UUID]],
+                        user_id: Optional[UUID] = None, op: str = "updated") -> None:
+    """Log (event_id, calendar_id) pairs as changed, for everyone or only user_id."""
+    rows = [{"entity": "event", "event_id": e, "calendar_id": c, "user_id": user_id} for e, c in events]
+    if not rows:
+        return
+    await session.execute(insert(ChangeLog), rows)
+
+    by_calendar: Dict[UUID, List[UUID]] = {}
+    for r in rows:
+        by_calendar.setdefault(r["calendar_id"], []).append(r["event_id"])
+    await realtime.publish(session, [
+        m for cal, ids in by_calendar.items() for m in realtime.event_messages(op, cal, ids, user_id)
+    ])
+
+
+async def record_event_users(session: AsyncSession, event_id: UUID, calendar_id: UUID,
+                             user_ids: Iterable[UUID], op: str) -> None:
+    """Log one event as changed for each of user_ids only (invitations answered or revoked)."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    await session.execute(insert(ChangeLog), [
+        {"entity": "event", "event_id": event_id, "calendar_id": calendar_id, "user_id": u} for u in user_ids
+    ])
+    await realtime.publish(session, [
+        m for u in user_ids for m in realtime.event_messages(op, calendar_id, [event_id], u)
+    ])
+
+
+async def record_event_sharees(session: AsyncSession, event_ids: Iterable[UUID]) -> None:
+    """Per-user rows for everyone the events are shared with (before the shares cascade away)."""
+    rows = (await session.execute(insert(ChangeLog).from_select(
+        ["entity", "event_id", "calendar_id", "user_id"],
+        select(literal("event"), EventShare.event_id, Event.calendar_id, EventShare.user_id)
+        .join(Event, Event.id == EventShare.event_id)
+        .where(EventShare.event_id.in_(list(event_ids))),
+    ).returning(ChangeLog.event_id, ChangeLog.calendar_id, ChangeLog.user_id))).all()
+    await realtime.publish(session, [
+        m for r in rows for m in realtime.event_messages("deleted", r.calendar_id, [r.event_id], r.user_id)
+    ])
+
+
+async def record_calendar(session: AsyncSession, calendar_id: UUID, user_ids: Iterable[UUID]) -> None:
+    """Log that these users' access to / view of the calendar may have changed."""
+    rows = [{"entity": "calendar", "calendar_id": calendar_id, "user_id": u} for u in user_ids]
+    forget_visible(session, [r["user_id"] for r in rows])
+    if rows:
+        await session.execute(insert(ChangeLog), rows)
+        await realtime.publish(session, realtime.calendar_messages(calendar_id, [r["user_id"] for r in rows]))
+
+
+async def record_calendar_audience(session: AsyncSession, calendar_id: UUID) -> None:
+    """Log a calendar change for its owner, sharees and subscribers in one INSERT ... SELECT."""
+    audience = union(
+        select(Calendar.owner_user_id.label("user_id")).where(Calendar.id == calendar_id),
+        select(CalendarShare.user_id).where(CalendarShare.calendar_id == calendar_id),
+        select(CalendarSubscription.subscriber_user_id).where(CalendarSubscription.calendar_id == calendar_id),
+    ).subquery()
+    user_ids = (await session.execute(insert(ChangeLog).from_select(
+        ["entity", "calendar_id", "user_id"],
+        select(literal("calendar"), literal(calendar_id), audience.c.user_id),
+    ).returning(ChangeLog.user_id))).scalars().all()
+    forget_visible(session, user_ids)
+    await realtime.publish(session, realtime.calendar_messages(calendar_id, user_ids))
+
+
+# --------------------------------------------------------------------
+# Sync tokens / reader
+# seq is assigned at insert but becomes visible at commit, so seq order is
+# not commit order: a writer that stays open can commit a lower seq after a
+# reader has moved past it. A cursor therefore holds database snapshots
+# (pg_current_snapshot()) instead: a delta is exactly the rows written by
+# transactions visible in `until` but not yet in `since`, whenever they
+# began. The pages of one delta share both snapshots and continue after the
+# last seq returned.
+#
+# The log keeps CHANGE_LOG_RETENTION (days) of changes. The reminder
+# scheduler's loop (reminders.py) prunes it every CHANGE_LOG_PRUNE_SECONDS,
+# by txid: everything below a bound goes, everything from it on stays, and
+# the bound is kept in change_log_horizon. A cursor whose `since` had not
+# seen every transaction below the horizon may have lost changes, so
+# changes_since() refuses it and the client does a full sync.
+# --------------------------------------------------------------------
+
+CHANGE_LOG_RETENTION = timedelta(days=float(os.getenv("CHANGE_LOG_RETENTION", "30")))
+CHANGE_LOG_PRUNE_SECONDS = float(os.getenv("CHANGE_LOG_PRUNE_SECONDS", "3600"))
+
+@dataclass(frozen=True)
+class SyncCursor:
+    since: str                   # snapshot the client is up to date with
+    until: Optional[str] = None  # end of the delta being paged through
+    after: int = 0               # last seq returned from that delta
+
+
+def make_sync_token(user_id: UUID, cursor: SyncCursor) -> str:
+    return sign({"typ": "sync", "uid": str(user_id), "since": cursor.since, "until": cursor.until,
+                 "after": cursor.after})
+
+
+def read_sync_token(token: str, user_id: UUID) -> Optional[SyncCursor]:
+    payload = unsign(token)
+    if not payload or payload.get("typ") != "sync" or payload.get("uid") != str(user_id):
+        return None
+    since, until, after = payload.get("since"), payload.get("until"), payload.get("after")
+    if not isinstance(since, str) or not isinstance(until, (str, type(None))) or not isinstance(after, int):
+        return None  # includes tokens from before cursors held snapshots
+    return SyncCursor(since, until, after)
+
+
+async def _snapshot(session: AsyncSession) -> str:
+    return (await session.execute(select(cast(func.pg_current_snapshot(), Text)))).scalar_one()
+
+
+async def current_cursor(session: AsyncSession) -> SyncCursor:
+    return SyncCursor(await _snapshot(session))
+
+
+async def prune_change_log(session: AsyncSession) -> int:
+    """Drop change_log rows older than CHANGE_LOG_RETENTION and advance the horizon; returns rows deleted.
+
+    The bound is the oldest transaction that wrote inside the window, or that
+    is still running, so no row at or above it is lost. Commit afterwards.
+    """
+    running = func.pg_snapshot_xmin(func.pg_current_snapshot())
+    oldest_kept = (
+        select(ChangeLog.txid)
+        .where(ChangeLog.created_at >= func.now() - CHANGE_LOG_RETENTION)
+        .order_by(ChangeLog.txid)
+        .limit(1)
+        .scalar_subquery()
+    )
+    stmt = pg_insert(ChangeLogHorizon).from_select(
+        ["id", "txid"], select(literal(1), func.least(func.coalesce(oldest_kept, running), running))
+    )
+    await session.execute(stmt.on_conflict_do_update(
+        index_elements=[ChangeLogHorizon.id],
+        set_={"txid": func.greatest(ChangeLogHorizon.txid, stmt.excluded.txid), "pruned_at": func.now()},
+    ))
+    horizon = select(ChangeLogHorizon.txid).where(ChangeLogHorizon.id == 1).scalar_subquery()
+    return (await session.execute(delete(ChangeLog).where(ChangeLog.txid < horizon))).rowcount
+
+
+async def _pruned_past(session: AsyncSession, snapshot) -> bool:
+    """Whether rows the snapshot had not seen may have been pruned."""
+    return (await session.execute(select(exists().where(
+        ChangeLogHorizon.txid > func.pg_snapshot_xmin(snapshot)
+    )))).scalar_one()
+
+
+async def changes_since(session: AsyncSession, user_id: UUID, cursor: SyncCursor) -> Optional[Dict]:
+    """One page of changes after cursor, resolved against the current state.
+
+    Every changed id is looked up now: events the user can still see come back
+    in full, the rest as deletions; calendars are reported as added or removed
+    from the user's view. Work is O(changes), not O(events). None when the
+    cursor is older than the retained log: the client has to sync in full.
+    """
+    visible_cals = (await visible_calendars(session, user_id)).agenda
+    # taken before the query below, whose own snapshot is then at least as new
+    until = cursor.until or await _snapshot(session)
+    since_snap, until_snap = cast(literal(cursor.since), PgSnapshot), cast(literal(until), PgSnapshot)
+    log = (await session.execute(
+        select(ChangeLog.seq, ChangeLog.entity, ChangeLog.event_id, ChangeLog.calendar_id)
+        .where(
+            # anything below since's xmin had finished before it (index range on txid)
+            ChangeLog.txid >= func.pg_snapshot_xmin(since_snap),
+            ~func.pg_visible_in_snapshot(ChangeLog.txid, since_snap),
+            func.pg_visible_in_snapshot(ChangeLog.txid, until_snap),
+            ChangeLog.seq > cursor.after,
+            or_(
+                ChangeLog.user_id == user_id,
+                and_(
+                    ChangeLog.user_id.is_(None),
+                    or_(ChangeLog.calendar_id.in_(visible_cals), ChangeLog.event_id.in_(shared_event_ids(user_id))),
+                ),
+            ),
+        )
+        .order_by(ChangeLog.seq)
+        .limit(SYNC_PAGE + 1)
+    )).all()
+    # checked after the read: a prune that removed any of its rows has committed by now
+    if await _pruned_past(session, since_snap):
+        return None
+
+    has_more = len(log) > SYNC_PAGE
+    log = log[:SYNC_PAGE]
+    next_cursor = SyncCursor(cursor.since, until, log[-1].seq) if has_more else SyncCursor(until)
+
+    event_ids = list(dict.fromkeys(r.event_id for r in log if r.entity == "event"))
+    calendar_ids = list(dict.fromkeys(r.calendar_id for r in log if r.entity == "calendar"))
+
+    events: List = []
+    if event_ids:
+        events = (await session.execute(
+            select(*EVENT_COLUMNS).where(
+                Event.id.in_(event_ids),
+                or_(Event.calendar_id.in_(visible_cals), Event.id.in_(shared_event_ids(user_id))),
+            )
+        )).all()
+    live = {ev.id for ev in events}
+
+    return {
+        "cursor": next_cursor,
+        "has_more": has_more,
+        "events": events,
+        "deleted": [e for e in event_ids if e not in live],
+        "calendars_added": [c for c in calendar_ids if c in visible_cals],
+        "calendars_removed": [c for c in calendar_ids if c not in visible_cals],
+    }
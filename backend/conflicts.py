@@ -0,0 +1,80 @@
+# backend/conflicts.py
+from __future__ import annotations
+
+import os
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Event
+from .recurrence import occurrences, window_clause
+from .sealing import open_events
+
+# --------------------------------------------------------------------
+# Conflict detection
+# A candidate time (optionally a recurring series) is expanded into its
+# occurrences, then one overlap query on ix_events_owner_period fetches the
+# user's events that meet them, plus recurring series started before the
+# last one ends. Series are expanded through the recurrence cache and every
+# occurrence is checked against the candidate's by binary search.
+#
+# CONFLICT_HORIZON_DAYS  how far ahead a recurring candidate is checked
+# --------------------------------------------------------------------
+
+CONFLICT_HORIZON = timedelta(days=int(os.getenv("CONFLICT_HORIZON_DAYS", "90")))
+
+
+async def find_conflicts(
+    session: AsyncSession,
+    user_id: UUID,
+    start_at: datetime,
+    end_at: datetime,
+    rrule: Optional[str] = None,
+    timezone: Optional[str] = None,
+    exclude_event_id: Optional[UUID] = None,
+) -> List[Dict[str, Any]]:
+    """Occurrences of the user's own events that overlap the candidate, in start order."""
+    # offset-less input is UTC, as everywhere else in the API
+    start_at, end_at = (dt if dt.tzinfo else dt.replace(tzinfo=dt_timezone.utc) for dt in (start_at, end_at))
+    candidate = SimpleNamespace(id=None, updated_at=None, start_at=start_at, end_at=end_at,
+                                rrule=rrule, timezone=timezone)
+    spans = occurrences(candidate, start_at, start_at + CONFLICT_HORIZON if rrule else end_at)
+    if not spans:
+        return []
+    lo, hi = spans[0][0], spans[-1][1]
+
+    filters = [Event.owner_user_id == user_id, window_clause(lo, hi)]
+    if exclude_event_id is not None:
+        filters.append(Event.id != exclude_event_id)
+    rows = (await session.execute(
+        select(Event.id, Event.calendar_id, Event.title, Event.start_at, Event.end_at,
+               Event.timezone, Event.rrule, Event.updated_at, Event.owner_user_id,
+               Event.sealed).where(*filters)
+    )).all()
+
+    # candidate occurrences share one duration, so they are sorted by start and by end
+    starts = [s for s, _ in spans]
+    hits = []
+    for ev in rows:
+        overlapping = []
+        for s, e in occurrences(ev, lo, hi):
+            i = bisect_left(starts, e) - 1  # last candidate occurrence starting before e
+            if i >= 0 and spans[i][1] > s:
+                overlapping.append((s, e))
+        if overlapping:
+            hits.append((ev, overlapping))
+
+    # only the conflicting events need their titles opened
+    opened = await open_events(session, [ev for ev, _ in hits])
+    conflicts = [
+        {"event_id": ev.id, "calendar_id": ev.calendar_id, "title": ev.title, "start_at": s, "end_at": e}
+        for ev, (_, overlapping) in zip(opened, hits)
+        for s, e in overlapping
+    ]
+    conflicts.sort(key=lambda c: (c["start_at"], str(c["event_id"])))
+    return conflicts
@@ -1,16 +1,21 @@
 # backend/db.py
 from __future__ import annotations
+import logging
 import os
 import ssl
+import time
 from pathlib import Path
 from contextlib import asynccontextmanager   
 
 import certifi
 from dotenv import load_dotenv
+from sqlalchemy import event, exc as sa_exc
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import (
-    create_async_engine, async_sessionmaker, AsyncSession
+    create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
 )
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 #Import for the generator type that will handle the async sessios
 from typing import AsyncGenerator
@@ -23,11 +28,13 @@ ENV_PATH = BASE_DIR / ".env"
 load_dotenv(ENV_PATH)
 
 DATABASE_URL = os.getenv("DATABASE_URL")
-print("[DEBUG] DATABASE_URL =", DATABASE_URL)  # remove after it’s working
 
 if not DATABASE_URL:
     raise RuntimeError(f"DATABASE_URL not found. Checked: {ENV_PATH}")
 
+logger = logging.getLogger("backend.db")
+logger.debug("DATABASE_URL = %s", make_url(DATABASE_URL).render_as_string(hide_password=True))
+
 # --- Was getting an error in connecting to the database because of a firewall issue on my end.  ---
 # --- I had to relax the the cirtificate checks in order to test the connection to our db, I will fix update before we get to production. ---
 
@@ -35,11 +42,119 @@ ssl_ctx = ssl.create_default_context()
 ssl_ctx.check_hostname = False
 ssl_ctx.verify_mode = ssl.CERT_NONE
 
-engine = create_async_engine(
-    DATABASE_URL,
-    connect_args={"ssl": ssl_ctx},
-    pool_pre_ping=True,
-)
+# --- Engine / pool settings (all optional, read from .env) ---
+# DB_POOL_SIZE / DB_MAX_OVERFLOW: size these per worker (total = workers * (size + overflow))
+# DB_POOL_TIMEOUT: seconds to wait for a free connection before erroring
+# DB_POOL_RECYCLE: seconds before a connection is replaced (-1 = never)
+# DB_PRE_PING: "always" pings on every checkout (one extra round trip per request);
+#              "never" relies on DB_POOL_RECYCLE plus SQLAlchemy invalidating the pool
+#              when a disconnect error is seen
+# DB_STATEMENT_CACHE_SIZE: asyncpg prepared statement cache (set 0 behind pgbouncer
+#              in transaction mode)
+# DB_STATEMENT_TIMEOUT_MS: server-side statement_timeout for every connection (0 = off)
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+DB_POOL_SIZE = _env_int("DB_POOL_SIZE", 5)
+DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT = _env_int("DB_POOL_TIMEOUT", 30)
+DB_POOL_RECYCLE = _env_int("DB_POOL_RECYCLE", 1800)
+DB_PRE_PING = os.getenv("DB_PRE_PING", "never").lower()
+DB_STATEMENT_CACHE_SIZE = _env_int("DB_STATEMENT_CACHE_SIZE", 100)
+DB_STATEMENT_TIMEOUT_MS = _env_int("DB_STATEMENT_TIMEOUT_MS", 0)
+
+if DB_PRE_PING not in ("always", "never"):
+    raise RuntimeError(f"DB_PRE_PING must be 'always' or 'never', got {DB_PRE_PING!r}")
+
+
+class PoolMetrics:
+    """Counters for sizing the pool under real traffic (per worker process)."""
+
+    def __init__(self):
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidations = 0
+        self.waits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+    def record_wait(self, seconds: float) -> None:
+        self.waits += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+
+pool_metrics = PoolMetrics()
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except sa_exc.TimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        finally:
+            pool_metrics.record_wait(time.perf_counter() - start)
+
+
+def _connect_args() -> dict:
+    args = {"ssl": ssl_ctx, "statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+    if DB_STATEMENT_TIMEOUT_MS:
+        args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+    return args
+
+
+def build_engine(url: str) -> AsyncEngine:
+    db_url = make_url(url)
+    if db_url.get_backend_name() == "postgresql" and db_url.get_driver_name() == "asyncpg":
+        # SQLAlchemy keeps its own cache of asyncpg prepared statements
+        db_url = db_url.update_query_dict({"prepared_statement_cache_size": str(DB_STATEMENT_CACHE_SIZE)})
+    new_engine = create_async_engine(
+        db_url,
+        connect_args=_connect_args(),
+        poolclass=TimedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_PRE_PING == "always",
+    )
+    pool = new_engine.sync_engine.pool
+    event.listen(pool, "connect", lambda *_: setattr(pool_metrics, "connects", pool_metrics.connects + 1))
+    event.listen(pool, "checkout", lambda *_: setattr(pool_metrics, "checkouts", pool_metrics.checkouts + 1))
+    event.listen(pool, "invalidate", lambda *_: setattr(pool_metrics, "invalidations", pool_metrics.invalidations + 1))
+    return new_engine
+
+
+engine = build_engine(DATABASE_URL)
+
+
+def pool_status() -> dict:
+    """Snapshot of the primary pool plus cumulative wait statistics."""
+    pool = engine.sync_engine.pool
+    m = pool_metrics
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "connects": m.connects,
+        "checkouts": m.checkouts,
+        "invalidations": m.invalidations,
+        "timeouts": m.timeouts,
+        "wait_avg_ms": round(m.wait_total / m.waits * 1000, 3) if m.waits else 0.0,
+        "wait_max_ms": round(m.wait_max * 1000, 3),
+    }
 
 """
 ssl_ctx = ssl.create_default_context(cafile=certifi.where())
@@ -69,13 +184,28 @@ async def lifespan(app):
     from . import models  # noqa: F401  (needed to populate Base.metadata)
 
     # ----- RUN THESE TWO LINES ONCE to create tables -----
+    # (or: python -m backend.serve --create-tables, before the workers start)
     #async with engine.begin() as conn:
         #await conn.run_sync(Base.metadata.create_all)
     # ------------------------------------
 
+    from . import realtime, replicas
+    from .lifecycle import SHUTDOWN_TIMEOUT, install_signal_handlers, lifecycle
+    from .reminders import scheduler
+
+    await realtime.start()
+    await scheduler.start()
+    install_signal_handlers()
+    lifecycle.ready()
     try:
         yield
     finally:
+        # the server has stopped taking connections; let what is left finish first
+        lifecycle.drain()
+        await lifecycle.wait_idle(SHUTDOWN_TIMEOUT)
+        await scheduler.stop()
+        await realtime.stop()
+        await replicas.dispose()
         await engine.dispose()
 #Since Async yeilds it is technically a generator and gives the IDE some trouble
 # FastAPI dependency
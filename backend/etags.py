@@ -0,0 +1,43 @@
+# backend/etags.py
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+# --------------------------------------------------------------------
+# Conditional GET
+# Resources get a strong ETag from (kind, id, updated_at, anything else that
+# changes the body for this viewer). Collections get an aggregate validator
+# from (count, max(updated_at)) over the same filter plus the query
+# parameters, which costs one index-backed aggregate instead of a full fetch.
+# --------------------------------------------------------------------
+
+CACHE_CONTROL = "private, no-cache"  # always revalidate, never share between users
+
+
+def make_etag(*parts: Any) -> str:
+    raw = "|".join("" if p is None else p.isoformat() if isinstance(p, datetime) else str(p) for p in parts)
+    return '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+
+
+def matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match already names this ETag."""
+    header: Optional[str] = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so a W/ prefix still matches
+    candidates = (c.strip() for c in header.split(","))
+    return etag in (c[2:] if c.startswith("W/") else c for c in candidates)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def validator_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
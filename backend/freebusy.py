@@ -0,0 +1,193 @@
+# backend/freebusy.py
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import BusyDay, Event
+from .recurrence import occurrences
+
+# --------------------------------------------------------------------
+# Free/busy
+# Non-recurring events are folded into per-user, per-UTC-day bitmaps
+# (BusyDay) on every event write, so a query only reads a few 36-byte rows
+# per user. Recurring series are not materialized (they may be unbounded);
+# their occurrences are OR-ed in at query time through the recurrence cache.
+# --------------------------------------------------------------------
+
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES  # 288 -> 36 bytes
+_BYTES = SLOTS_PER_DAY // 8
+_SLOT = timedelta(minutes=SLOT_MINUTES)
+
+Interval = Tuple[datetime, datetime]
+
+
+def _utc(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time(), tzinfo=timezone.utc)
+
+
+def _days(start: datetime, end: datetime) -> List[date]:
+    first, last = _utc(start).date(), (_utc(end) - timedelta(microseconds=1)).date()
+    return [first + timedelta(days=i) for i in range((last - first).days + 1)]
+
+
+def _mark(bitmaps: Dict[date, int], start: datetime, end: datetime) -> None:
+    """OR the slots covered by [start, end) into per-day bitmaps (rounding outwards)."""
+    start, end = _utc(start), _utc(end)
+    for day in _days(start, end):
+        base = _day_start(day)
+        lo = max(0, int((start - base) // _SLOT))
+        hi = min(SLOTS_PER_DAY, -int(-(end - base) // _SLOT))  # ceil
+        if hi > lo:
+            bitmaps[day] = bitmaps.get(day, 0) | (((1 << (hi - lo)) - 1) << lo)
+
+
+def _runs(bits: int) -> Iterable[Tuple[int, int]]:
+    """(first_slot, slot_count) for each run of set bits."""
+    while bits:
+        low = (bits & -bits).bit_length() - 1
+        shifted = bits >> low
+        length = (~shifted & (shifted + 1)).bit_length() - 1
+        yield low, length
+        bits &= ~(((1 << length) - 1) << low)
+
+
+async def refresh_busy_days(session: AsyncSession, user_id: UUID, start: datetime, end: datetime) -> None:
+    """Rebuild the user's bitmaps for the UTC days touched by [start, end).
+
+    Call after adding/changing/deleting an event (before commit) with the old
+    and/or new span. Only those days are recomputed, from the events on them.
+    """
+    days = _days(start, end)
+    lo, hi = _day_start(days[0]), _day_start(days[-1]) + timedelta(days=1)
+    spans = (await session.execute(
+        select(Event.start_at, Event.end_at).where(
+            Event.owner_user_id == user_id,
+            Event.rrule.is_(None),
+            Event.overlaps(lo, hi),
+        )
+    )).all()
+
+    bitmaps: Dict[date, int] = {}
+    for ev_start, ev_end in spans:
+        _mark(bitmaps, max(_utc(ev_start), lo), min(_utc(ev_end), hi))
+
+    empty = [d for d in days if not bitmaps.get(d)]
+    if empty:
+        await session.execute(delete(BusyDay).where(BusyDay.user_id == user_id, BusyDay.day.in_(empty)))
+    rows = [
+        {"user_id": user_id, "day": d, "bits": bitmaps[d].to_bytes(_BYTES, "big")}
+        for d in days if bitmaps.get(d)
+    ]
+    if rows:
+        stmt = insert(BusyDay).values(rows)
+        await session.execute(stmt.on_conflict_do_update(
+            index_elements=[BusyDay.user_id, BusyDay.day],
+            set_={"bits": stmt.excluded.bits, "updated_at": func.now()},
+        ))
+
+
+async def busy_bitmaps(
+    session: AsyncSession, user_ids: List[UUID], start: datetime, end: datetime
+) -> Dict[UUID, Dict[date, int]]:
+    """Per-user, per-day busy bitmaps for the window: two queries for any number of users."""
+    days = _days(start, end)
+    result: Dict[UUID, Dict[date, int]] = defaultdict(dict)
+
+    stored = await session.execute(
+        select(BusyDay.user_id, BusyDay.day, BusyDay.bits).where(
+            BusyDay.user_id.in_(user_ids), BusyDay.day.between(days[0], days[-1])
+        )
+    )
+    for user_id, day, bits in stored:
+        result[user_id][day] = int.from_bytes(bits, "big")
+
+    # only what occurrences() reads, not whole ORM events
+    series = (await session.execute(
+        select(
+            Event.id, Event.owner_user_id, Event.start_at, Event.end_at, Event.timezone,
+            Event.rrule, Event.updated_at,
+        ).where(
+            Event.owner_user_id.in_(user_ids),
+            Event.rrule.is_not(None),
+            Event.start_at < end,
+        )
+    )).all()
+    for ev in series:
+        for occ_start, occ_end in occurrences(ev, start, end):
+            _mark(result[ev.owner_user_id], occ_start, occ_end)
+    return result
+
+
+def busy_intervals(bitmaps: Dict[date, int], start: datetime, end: datetime) -> List[Interval]:
+    """Merge one user's day bitmaps into busy intervals clipped to [start, end)."""
+    start, end = _utc(start), _utc(end)
+    out: List[Interval] = []
+    for day in _days(start, end):
+        base = _day_start(day)
+        for first, count in _runs(bitmaps.get(day, 0)):
+            s, e = max(base + first * _SLOT, start), min(base + (first + count) * _SLOT, end)
+            if e <= s:
+                continue
+            if out and out[-1][1] == s:  # runs across midnight
+                out[-1] = (out[-1][0], e)
+            else:
+                out.append((s, e))
+    return out
+
+
+async def free_busy(
+    session: AsyncSession, user_ids: List[UUID], start: datetime, end: datetime
+) -> Dict[UUID, List[Interval]]:
+    bitmaps = await busy_bitmaps(session, user_ids, start, end)
+    return {uid: busy_intervals(bitmaps.get(uid, {}), start, end) for uid in user_ids}
+
+
+async def next_free_slot(
+    session: AsyncSession, user_ids: List[UUID], duration: timedelta, start: datetime, end: datetime
+) -> Optional[Interval]:
+    """Earliest slot-aligned [s, s + duration) inside [start, end) when every user is free."""
+    start, end = _utc(start), _utc(end)
+    need = -int(-duration // _SLOT)  # ceil
+    bitmaps = await busy_bitmaps(session, user_ids, start, end)
+    days = _days(start, end)
+    origin = _day_start(days[0])
+
+    # the whole window as one integer, one bit per slot (bit 0 = first slot of the first day)
+    busy = 0
+    for i, day in enumerate(days):
+        for per_day in bitmaps.values():
+            busy |= per_day.get(day, 0) << (i * SLOTS_PER_DAY)
+    first = -int(-(start - origin) // _SLOT)
+    last = int((end - origin) // _SLOT)  # exclusive
+    if last - first < need:
+        return None
+    free = ~busy & (((1 << (last - first)) - 1) << first)
+
+    # bit i survives iff slots i .. i+need-1 are all free (log2(need) shift-and steps)
+    runs, length = free, 1
+    while length < need:
+        step = min(length, need - length)
+        runs &= runs >> step
+        length += step
+    if not runs:
+        return None
+    slot = (runs & -runs).bit_length() - 1
+    slot_start = origin + slot * _SLOT
+    return slot_start, slot_start + duration
+
+
+def event_span(ev: Event) -> Optional[Interval]:
+    """Span an event contributes to the bitmaps, or None for recurring events."""
+    return None if ev.rrule else (ev.start_at, ev.end_at)
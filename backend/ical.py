@@ -0,0 +1,207 @@
+# backend/ical.py
+from __future__ import annotations
+
+import codecs
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterable, AsyncIterator, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# --------------------------------------------------------------------
+# Minimal iCalendar (RFC 5545) support for bulk import/export.
+# Only VEVENT and the properties that map onto Event are handled:
+# SUMMARY, DESCRIPTION, LOCATION, DTSTART, DTEND, DURATION, RRULE, CLASS.
+# Everything else (VTIMEZONE, VALARM, ATTENDEE, ...) is skipped.
+# --------------------------------------------------------------------
+
+_CLASS_TO_VISIBILITY = {"PUBLIC": "public", "PRIVATE": "private", "CONFIDENTIAL": "busy"}
+_VISIBILITY_TO_CLASS = {v: k for k, v in _CLASS_TO_VISIBILITY.items()}
+
+
+def _unescape(value: str) -> str:
+    out, i = [], 0
+    while i < len(value):
+        ch = value[i]
+        if ch == "\\" and i + 1 < len(value):
+            nxt = value[i + 1]
+            out.append("\n" if nxt in "nN" else nxt)
+            i += 2
+            continue
+        out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def _escape(value: str) -> str:
+    return (value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def _split_property(line: str) -> Tuple[str, Dict[str, str], str]:
+    head, _, value = line.partition(":")
+    name, *params = head.split(";")
+    return name.upper(), dict(p.partition("=")[::2] for p in params), value
+
+
+def _parse_datetime(value: str, params: Dict[str, str]) -> Tuple[datetime, bool]:
+    """(aware datetime, is_all_day)."""
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        d = datetime.strptime(value, "%Y%m%d")
+        return d.replace(tzinfo=timezone.utc), True
+    if value.endswith("Z"):
+        return datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc), False
+    naive = datetime.strptime(value, "%Y%m%dT%H%M%S")
+    tz = timezone.utc
+    if "TZID" in params:
+        try:
+            tz = ZoneInfo(params["TZID"].strip('"'))
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return naive.replace(tzinfo=tz), False
+
+
+def _parse_duration(value: str) -> timedelta:
+    # P[n]W | P[n]DT[n]H[n]M[n]S, optionally signed
+    sign = -1 if value.startswith("-") else 1
+    value = value.lstrip("+-").lstrip("P")
+    total, num, in_time = timedelta(), "", False
+    units = {"W": timedelta(weeks=1), "D": timedelta(days=1)}
+    time_units = {"H": timedelta(hours=1), "M": timedelta(minutes=1), "S": timedelta(seconds=1)}
+    for ch in value:
+        if ch == "T":
+            in_time = True
+        elif ch.isdigit():
+            num += ch
+        else:
+            total += int(num or 0) * (time_units if in_time else units)[ch]
+            num = ""
+    return sign * total
+
+
+def _vevent_to_event(props: List[Tuple[str, Dict[str, str], str]]) -> Dict:
+    item: Dict = {}
+    duration: Optional[timedelta] = None
+    for name, params, value in props:
+        if name == "SUMMARY":
+            item["title"] = _unescape(value)
+        elif name == "DESCRIPTION":
+            item["description"] = _unescape(value)
+        elif name == "LOCATION":
+            item["location"] = _unescape(value)
+        elif name == "DTSTART":
+            item["start_at"], item["all_day"] = _parse_datetime(value, params)
+            if "TZID" in params:
+                item["timezone"] = params["TZID"].strip('"')
+        elif name == "DTEND":
+            item["end_at"], _ = _parse_datetime(value, params)
+        elif name == "DURATION":
+            duration = _parse_duration(value)
+        elif name == "RRULE":
+            item["rrule"] = value
+        elif name == "CLASS" and value.upper() in _CLASS_TO_VISIBILITY:
+            item["visibility"] = _CLASS_TO_VISIBILITY[value.upper()]
+    if "start_at" in item and "end_at" not in item:
+        # RFC 5545: no DTEND/DURATION means one day for dates, zero length otherwise;
+        # zero-length events are not allowed here, so those get a minute
+        default = timedelta(days=1) if item.get("all_day") else timedelta(minutes=1)
+        item["end_at"] = item["start_at"] + (duration or default)
+    return item
+
+
+async def _unfolded_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    # content lines are CRLF-terminated; a line starting with space/tab continues the previous one
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buf, current = "", None
+    done = False
+    chunk_iter = chunks.__aiter__()
+    while not done:
+        try:
+            buf += decoder.decode(await chunk_iter.__anext__())
+        except StopAsyncIteration:
+            buf += decoder.decode(b"", final=True) + "\n"
+            done = True
+        *complete, buf = buf.split("\n")
+        for raw in complete:
+            raw = raw.rstrip("\r")
+            if raw[:1] in (" ", "\t") and current is not None:
+                current += raw[1:]
+                continue
+            if current is not None:
+                yield current
+            current = raw
+    if current:
+        yield current
+
+
+async def iter_ics_events(chunks: AsyncIterable[bytes]) -> AsyncIterator[Dict]:
+    """Parse an .ics byte stream incrementally into EventCreate-shaped dicts."""
+    props: Optional[List[Tuple[str, Dict[str, str], str]]] = None
+    depth = 0  # nesting inside the current VEVENT (VALARM etc.)
+    async for line in _unfolded_lines(chunks):
+        upper = line.upper()
+        if upper.startswith("BEGIN:"):
+            if props is None and upper == "BEGIN:VEVENT":
+                props, depth = [], 0
+            elif props is not None:
+                depth += 1
+        elif upper.startswith("END:"):
+            if props is not None and depth:
+                depth -= 1
+            elif props is not None and upper == "END:VEVENT":
+                yield _vevent_to_event(props)
+                props = None
+        elif props is not None and not depth and line:
+            props.append(_split_property(line))
+
+
+# --------------------------------------------------------------------
+# Export
+# --------------------------------------------------------------------
+
+def _fold(line: str) -> str:
+    # fold at 75 octets without splitting a UTF-8 sequence
+    data = line.encode()
+    if len(data) <= 75:
+        return line + "\r\n"
+    parts, start, limit = [], 0, 75
+    while start < len(data):
+        end = min(start + limit, len(data))
+        while end < len(data) and (data[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(data[start:end].decode())
+        start, limit = end, 74
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _format_dt(value: datetime, all_day: bool, tzid: Optional[str]) -> Tuple[str, str]:
+    if all_day:
+        return ";VALUE=DATE", value.astimezone(timezone.utc).strftime("%Y%m%d")
+    if tzid:
+        # keep local wall time so RRULE expansion follows the zone's DST rules
+        try:
+            return f";TZID={tzid}", value.astimezone(ZoneInfo(tzid)).strftime("%Y%m%dT%H%M%S")
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return "", value.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+CALENDAR_HEADER = "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Hungry Bear//Calendar API//EN\r\n"
+CALENDAR_FOOTER = "END:VCALENDAR\r\n"
+
+
+def event_to_vevent(item: Dict) -> str:
+    """Serialize one event dict (as returned by the API) to a VEVENT block."""
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    lines = ["BEGIN:VEVENT", f"UID:{item['id']}", f"DTSTAMP:{stamp}"]
+    for name, key in (("DTSTART", "start_at"), ("DTEND", "end_at")):
+        param, value = _format_dt(item[key], item["all_day"], item.get("timezone"))
+        lines.append(f"{name}{param}:{value}")
+    lines.append(f"SUMMARY:{_escape(item['title'])}")
+    if item.get("description"):
+        lines.append(f"DESCRIPTION:{_escape(item['description'])}")
+    if item.get("location"):
+        lines.append(f"LOCATION:{_escape(item['location'])}")
+    if item.get("rrule"):
+        lines.append(f"RRULE:{item['rrule']}")
+    lines.append(f"CLASS:{_VISIBILITY_TO_CLASS.get(item['visibility'], 'PRIVATE')}")
+    lines.append("END:VEVENT")
+    return "".join(_fold(line) for line in lines)
@@ -0,0 +1,67 @@
+# backend/idempotency.py
+from __future__ import annotations
+
+import hashlib
+import os
+from datetime import timedelta
+from typing import Any, Optional
+from uuid import UUID
+
+from fastapi import HTTPException, Response
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import IdempotencyKey
+
+# --------------------------------------------------------------------
+# Idempotency-Key support for POSTs that create things
+# claim() inserts the key in the request's own transaction before any work;
+# remember() stores the response in that same transaction, just before
+# commit. A retry that races the original blocks on the key's unique index
+# until the original commits (then replays its response) or rolls back (then
+# runs normally), so a retried request can never create twice. Failed
+# requests are not stored. Keys older than IDEMPOTENCY_TTL_HOURS may be
+# reused; prune with DELETE ... WHERE created_at < now() - interval.
+# --------------------------------------------------------------------
+
+IDEMPOTENCY_TTL = timedelta(hours=float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24")))
+MAX_KEY_LENGTH = 255
+
+
+def fingerprint(*parts: Any) -> str:
+    """Hash of what identifies the request (route, path ids, body)."""
+    return hashlib.sha256("|".join(str(p) for p in parts).encode()).hexdigest()
+
+
+async def claim(session: AsyncSession, user_id: UUID, key: str, request_hash: str) -> Optional[Response]:
+    """None if this request owns the key and should run; otherwise the stored response to replay."""
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(400, f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+    stmt = pg_insert(IdempotencyKey).values(user_id=user_id, key=key, fingerprint=request_hash)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[IdempotencyKey.user_id, IdempotencyKey.key],
+        set_={"fingerprint": stmt.excluded.fingerprint, "status_code": None, "body": None, "created_at": func.now()},
+        where=IdempotencyKey.created_at < func.now() - IDEMPOTENCY_TTL,
+    ).returning(IdempotencyKey.key)
+    if (await session.execute(stmt)).first():
+        return None
+
+    stored = (await session.execute(
+        select(IdempotencyKey.fingerprint, IdempotencyKey.status_code, IdempotencyKey.body)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+    )).one()
+    if stored.fingerprint != request_hash:
+        raise HTTPException(422, "Idempotency-Key was already used for a different request")
+    if stored.status_code is None:
+        raise HTTPException(409, "A request with this Idempotency-Key is still in progress")
+    return Response(stored.body, status_code=stored.status_code, media_type="application/json",
+                    headers={"Idempotent-Replayed": "true"})
+
+
+async def remember(session: AsyncSession, user_id: UUID, key: str, response: Response) -> None:
+    await session.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        .values(status_code=response.status_code, body=response.body)
+    )
@@ -0,0 +1,108 @@
+# backend/instrumentation.py
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# --------------------------------------------------------------------
+# Request-level DB instrumentation
+# Cursor events count and time every statement against the RequestStats of
+# the request being served (a ContextVar set by the HTTP middleware), which
+# then reports them as a Server-Timing header and one structured log line.
+#
+# SLOW_QUERY_MS        statements slower than this are logged
+# SLOW_QUERY_PARAMS    "1" also logs their parameters (off by default: they carry
+#                      event titles, emails and tokens)
+# N_PLUS_ONE_THRESHOLD flag requests running the same statement more than K times (0 = off)
+# --------------------------------------------------------------------
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_PARAMS = os.getenv("SLOW_QUERY_PARAMS", "0") == "1"
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "0"))
+
+logger = logging.getLogger("backend.requests")
+slow_logger = logging.getLogger("backend.slow_queries")
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements: Counter = Counter()
+        self.slow: List[Dict[str, Any]] = []
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_db_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        stats.statements[statement] += 1
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        entry = {"duration_ms": round(elapsed * 1000, 2), "statement": statement}
+        if SLOW_QUERY_PARAMS:
+            entry["parameters"] = repr(parameters)[:2000]
+        if stats is not None:
+            stats.slow.append(entry)
+        slow_logger.warning(json.dumps(entry))
+
+
+def install(engine: Engine) -> None:
+    """Attach the cursor hooks to a (sync) engine; pass AsyncEngine.sync_engine."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+async def db_timing_middleware(request, call_next):
+    stats = RequestStats()
+    token = _current.set(stats)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        _current.reset(token)
+    total_ms = (time.perf_counter() - start) * 1000
+    db_ms = stats.db_seconds * 1000
+
+    response.headers["Server-Timing"] = (
+        f'db;dur={db_ms:.1f};desc="{stats.queries} queries", app;dur={total_ms:.1f}'
+    )
+    record = {
+        "method": request.method,
+        "path": request.url.path,
+        "status": response.status_code,
+        "duration_ms": round(total_ms, 2),
+        "db_queries": stats.queries,
+        "db_ms": round(db_ms, 2),
+    }
+    if stats.slow:
+        record["slow_queries"] = len(stats.slow)
+    if N_PLUS_ONE_THRESHOLD:
+        repeated = {stmt: n for stmt, n in stats.statements.items() if n > N_PLUS_ONE_THRESHOLD}
+        if repeated:
+            record["n_plus_one"] = [{"count": n, "statement": stmt[:500]} for stmt, n in repeated.items()]
+            logger.warning(json.dumps(record))
+            return response
+    logger.info(json.dumps(record))
+    return response
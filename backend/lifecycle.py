@@ -0,0 +1,141 @@
+# backend/lifecycle.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import signal
+from typing import Any, Dict, Tuple
+
+from sqlalchemy import exc as sa_exc, text
+
+from . import realtime
+
+# --------------------------------------------------------------------
+# Worker lifecycle (readiness, graceful drain)
+# A worker is "starting" until the lifespan startup has run, then "ready".
+# SIGTERM / SIGINT first flip it to "draining": /readyz answers 503 so the
+# load balancer stops sending traffic, and open notification streams are
+# told to resync (their clients reconnect to another worker). SHUTDOWN_DELAY
+# seconds later the signal reaches the server, which stops accepting
+# connections and waits for in-flight requests; the lifespan shutdown then
+# waits for anything still counted here before the engines are disposed.
+# A second signal skips the delay.
+#
+# SHUTDOWN_DELAY     seconds to keep serving after the signal while readiness
+#                    already fails (time for the load balancer to notice)
+# SHUTDOWN_TIMEOUT   longest wait for in-flight requests at shutdown
+# READY_TIMEOUT      seconds /readyz may wait for a pooled connection + SELECT 1
+# --------------------------------------------------------------------
+
+SHUTDOWN_DELAY = float(os.getenv("SHUTDOWN_DELAY", "0"))
+SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", "30"))
+READY_TIMEOUT = float(os.getenv("READY_TIMEOUT", "2"))
+
+logger = logging.getLogger("backend.lifecycle")
+
+
+class Lifecycle:
+    def __init__(self):
+        self.state = "starting"  # "starting" | "ready" | "draining"
+        self.inflight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def ready(self) -> None:
+        self.state = "ready"
+
+    def drain(self) -> None:
+        if self.state == "draining":
+            return
+        self.state = "draining"
+        logger.info("draining: %d request(s) in flight, %d stream(s) open", self.inflight, len(realtime.hub))
+        realtime.hub.resync_all()
+
+    def enter(self) -> None:
+        self.inflight += 1
+        self._idle.clear()
+
+    def leave(self) -> None:
+        self.inflight -= 1
+        if not self.inflight:
+            self._idle.set()
+
+    async def wait_idle(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("shutting down with %d request(s) still in flight", self.inflight)
+
+
+lifecycle = Lifecycle()
+
+
+class InflightMiddleware:
+    """Pure ASGI middleware: counts HTTP requests until their response (streamed bodies too) is done."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        lifecycle.enter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            lifecycle.leave()
+
+
+def install_signal_handlers() -> None:
+    """Run drain() ahead of the server's own SIGTERM/SIGINT handling.
+
+    Call from the lifespan startup, after the server has installed its handlers.
+    Only possible in the main thread (not under TestClient, for example).
+    """
+    loop = asyncio.get_running_loop()
+
+    def wrap(previous):
+        def handler(signum, frame):
+            again = lifecycle.state == "draining"
+            loop.call_soon_threadsafe(lifecycle.drain)
+            if again or SHUTDOWN_DELAY <= 0:
+                previous(signum, frame)
+            else:
+                loop.call_soon_threadsafe(loop.call_later, SHUTDOWN_DELAY, previous, signum, frame)
+        return handler
+
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        previous = signal.getsignal(sig)
+        if not callable(previous):
+            continue  # default / ignored: nothing to run after the drain
+        try:
+            signal.signal(sig, wrap(previous))
+        except ValueError:  # not the main thread
+            return
+
+
+async def readiness() -> Tuple[int, Dict[str, Any]]:
+    """(status code, body) for /readyz: 200 only when ready and a pooled connection answers in time."""
+    from .db import engine, pool_status
+    from .replicas import replica_status
+
+    body: Dict[str, Any] = {
+        "status": lifecycle.state,
+        "inflight": lifecycle.inflight,
+        "pool": pool_status(),
+        "replicas": replica_status(),
+    }
+    if lifecycle.state != "ready":
+        return 503, body
+
+    async def ping():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    try:
+        await asyncio.wait_for(ping(), READY_TIMEOUT)
+    except (asyncio.TimeoutError, OSError, sa_exc.DBAPIError, sa_exc.TimeoutError) as exc:
+        body.update(status="unavailable", error=type(exc).__name__)
+        return 503, body
+    return 200, body
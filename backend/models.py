@@ -3,18 +3,31 @@ from __future__ import annotations
 
 import uuid
 from typing import Optional
-from datetime import datetime
+from datetime import date, datetime
 
 from sqlalchemy import (
+    BigInteger,
+    DDL,
+    Column,
+    Computed,
+    Identity,
+    Date,
+    LargeBinary,
     String,
     Text,
     Boolean,
     DateTime,
     ForeignKey,
+    Index,
+    Integer,
     UniqueConstraint,
+    bindparam,
+    event,
     func,
+    literal_column,
 )
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
+from sqlalchemy.types import UserDefinedType
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .db import Base
@@ -132,9 +145,59 @@ class CalendarSubscription(Base):
     subscriber: Mapped["User"] = relationship()
 
 
+# --- Visible calendars (materialized) ---
+# One row per user per calendar they own, have been shared, or subscribe to
+# while it is public; is_hidden copies the subscription's hidden flag. Derived
+# from the three tables above and rebuilt per calendar by access.py whenever
+# one of them changes, so permission checks and agenda reads need no joins.
+class UserVisibleCalendar(Base):
+    __tablename__ = "user_visible_calendars"
+    __table_args__ = (
+        Index("ix_user_visible_calendars_calendar", "calendar_id"),
+    )
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    calendar_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("calendars.id", ondelete="CASCADE"), primary_key=True
+    )
+    via: Mapped[str] = mapped_column(String(10))  # "owner" | "shared" | "subscribed"
+    is_hidden: Mapped[bool] = mapped_column(Boolean, default=False, server_default="false")
+
+
 # --- Events ---
+# text search configuration baked into events.search_vector; queries must use the same one
+SEARCH_CONFIG = "english"
+
+
+def _period(start, end):
+    # half-open [start, end); a NULL bound means unbounded on that side
+    return func.tstzrange(start, end, literal_column("'[)'"))
+
+
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        # ordered scans of one calendar (list_events ORDER BY start_at)
+        Index("ix_events_calendar_start_end", "calendar_id", "start_at", "end_at"),
+        # overlap lookups: calendar_id = ? AND period && window (needs btree_gist)
+        Index(
+            "ix_events_calendar_period",
+            "calendar_id",
+            _period(Column("start_at"), Column("end_at")),
+            postgresql_using="gist",
+        ),
+        # per-user overlap lookups (free/busy rebuilds)
+        Index(
+            "ix_events_owner_period",
+            "owner_user_id",
+            _period(Column("start_at"), Column("end_at")),
+            postgresql_using="gist",
+        ),
+        # full-text search (list_events ?q=, /search)
+        Index("ix_events_search", "search_vector", postgresql_using="gin"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
@@ -159,6 +222,9 @@ class Event(Base):
         String(10), default="private", server_default="private"
     )
     rrule: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # title/description/location encrypted at rest (sealing.py); when set, those
+    # columns only hold placeholders ("" / NULL)
+    sealed: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
@@ -167,9 +233,40 @@ class Event(Base):
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
 
+    # maintained by Postgres on every insert/update; title ranks above location above description.
+    # Deferred: never loaded with the row, only matched against in SQL.
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A')"
+            f" || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(location, '')), 'B')"
+            f" || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'C')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
+
     calendar: Mapped["Calendar"] = relationship(back_populates="events")
     owner: Mapped["User"] = relationship(back_populates="events")
 
+    @classmethod
+    def overlaps(cls, start: Optional[datetime], end: Optional[datetime]):
+        """SQL clause: the event's [start_at, end_at) intersects the window [start, end).
+
+        Either bound may be None for an open-ended window. The expression matches
+        ix_events_calendar_period so Postgres can answer it from the GiST index.
+        """
+        ts = DateTime(timezone=True)
+        window = _period(bindparam(None, start, type_=ts), bindparam(None, end, type_=ts))
+        return _period(cls.start_at, cls.end_at).op("&&")(window)
+
+
+event.listen(
+    Event.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql"),
+)
+
 
 # --- Event shares ---
 class EventShare(Base):
@@ -188,6 +285,12 @@ class EventShare(Base):
         ForeignKey("users.id", ondelete="CASCADE"),
         primary_key=True,
     )
+    # attendee state: direct shares start "accepted", invitations "invited";
+    # only accepted rows put the event on the user's agenda
+    status: Mapped[str] = mapped_column(
+        String(12), default="accepted", server_default="accepted"
+    )
+    responded_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
 
     event: Mapped["Event"] = relationship()
     user: Mapped["User"] = relationship()
@@ -203,3 +306,145 @@ class PushSubscription(Base):
     auth: Mapped[str | None] = mapped_column(String)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), onupdate=func.now())
+
+
+# --- Free/busy bitmaps ---
+# One row per user per UTC day: 288 bits, one per 5-minute slot, set when any
+# non-recurring event the user owns covers that slot. Maintained by freebusy.py.
+class BusyDay(Base):
+    __tablename__ = "busy_days"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    bits: Mapped[bytes] = mapped_column(LargeBinary(36))
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+# --- Change log (delta sync) ---
+# Append-only feed of "something about this event/calendar changed". Rows keep
+# only ids (no FKs) so they outlive deletes and act as tombstones; the sync
+# endpoint resolves each id against the current state. user_id is set for
+# changes aimed at one user (a calendar/event shared with or revoked from them)
+# and NULL for changes every viewer of calendar_id should see. txid is the
+# writing transaction, which is what sync readers order by (see changes.py).
+# Rows older than CHANGE_LOG_RETENTION are pruned; ChangeLogHorizon records
+# how far, so sync tokens from before that can be turned away.
+class XID8(UserDefinedType):
+    """Postgres xid8: 64-bit transaction id, as returned by pg_current_xact_id()."""
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "xid8"
+
+
+class PgSnapshot(UserDefinedType):
+    """Postgres pg_snapshot ("xmin:xmax:xip,..."), as returned by pg_current_snapshot()."""
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "pg_snapshot"
+
+
+class ChangeLog(Base):
+    __tablename__ = "change_log"
+    __table_args__ = (
+        Index("ix_change_log_calendar_seq", "calendar_id", "seq"),
+        Index("ix_change_log_user_seq", "user_id", "seq"),
+        Index("ix_change_log_txid", "txid"),
+    )
+
+    seq: Mapped[int] = mapped_column(BigInteger, Identity(), primary_key=True)
+    entity: Mapped[str] = mapped_column(String(10))  # "event" | "calendar"
+    event_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), nullable=True)
+    calendar_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), nullable=True)
+    user_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), nullable=True)
+    txid: Mapped[int] = mapped_column(XID8(), server_default=func.pg_current_xact_id())
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.clock_timestamp()
+    )
+
+
+class ChangeLogHorizon(Base):
+    """Single row (id 1): every change_log row below txid has been pruned."""
+    __tablename__ = "change_log_horizon"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    txid: Mapped[int] = mapped_column(XID8())
+    pruned_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+# --- Per-user data keys (event content encryption) ---
+# The user's AES-256 key, itself encrypted ("wrapped") with the server's
+# master key, so the database alone never holds a usable key.
+class UserKey(Base):
+    __tablename__ = "user_keys"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    wrapped_key: Mapped[bytes] = mapped_column(LargeBinary)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
+# --- Reminders ---
+# One row per reminder on an event, delivered to the event owner's browser
+# push subscriptions. next_fire_at is the next time it is due (the next
+# occurrence for recurring events) and NULL once nothing is left to fire; the
+# partial index makes "what is due now" a short range scan for reminders.py.
+class EventReminder(Base):
+    __tablename__ = "event_reminders"
+    __table_args__ = (
+        Index(
+            "ix_event_reminders_next_fire",
+            "next_fire_at",
+            postgresql_where=Column("next_fire_at").is_not(None),
+        ),
+        Index("ix_event_reminders_event", "event_id"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+    )
+    event_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("events.id", ondelete="CASCADE")
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE")
+    )
+    minutes_before_start: Mapped[int] = mapped_column(Integer)
+    method: Mapped[str] = mapped_column(String(20), default="popup", server_default="popup")
+    next_fire_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_fired_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
+# --- Idempotency keys ---
+# Stored response of a POST made with an Idempotency-Key header, written in
+# the same transaction as the request's own changes (see idempotency.py).
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    fingerprint: Mapped[str] = mapped_column(String(64))
+    status_code: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    body: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), index=True
+    )
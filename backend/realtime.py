@@ -0,0 +1,283 @@
+# backend/realtime.py
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from uuid import UUID
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+# --------------------------------------------------------------------
+# Server push of calendar changes
+# Writers stage small id-only messages inside their transaction (changes.py
+# does this next to every change-log row); they are delivered only if the
+# transaction commits. Each worker's Hub routes a message to the open
+# streams allowed to see it: by calendar for calendar-wide changes, by
+# event for individually shared events, by user for per-user messages.
+# Clients react by calling GET /sync, so no event content (or busy
+# redaction) goes over this channel.
+#
+# PUSH_BACKEND      "memory" (single worker / tests) or "postgres"
+#                   (LISTEN/NOTIFY, required with several workers)
+# PUSH_QUEUE_SIZE   messages buffered per stream; a stream that falls
+#                   further behind is told to resync and closed
+# PUSH_HEARTBEAT    seconds between keep-alive comments
+# --------------------------------------------------------------------
+
+PUSH_BACKEND = os.getenv("PUSH_BACKEND", "memory").lower()
+PUSH_QUEUE_SIZE = int(os.getenv("PUSH_QUEUE_SIZE", "100"))
+PUSH_HEARTBEAT = float(os.getenv("PUSH_HEARTBEAT", "15"))
+PUSH_CHANNEL = "calendar_changes"
+MAX_IDS_PER_MESSAGE = 100  # keeps a NOTIFY payload well under Postgres' 8000 bytes
+
+if PUSH_BACKEND not in ("memory", "postgres"):
+    raise RuntimeError(f"PUSH_BACKEND must be 'memory' or 'postgres', got {PUSH_BACKEND!r}")
+
+logger = logging.getLogger("backend.realtime")
+
+_PENDING = "realtime_pending"
+
+
+class Stream:
+    """One connected client: what it may see, plus a bounded outbox."""
+
+    def __init__(self, user_id: UUID, calendar_ids: Set[UUID], event_ids: Set[UUID]):
+        self.user_id = user_id
+        self.calendar_ids = calendar_ids
+        self.event_ids = event_ids
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=PUSH_QUEUE_SIZE)
+        self.overflowed = False
+
+    def offer(self, message: Dict[str, Any]) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # slow consumer: stop buffering; the stream sends "resync" and closes
+            self.overflowed = True
+
+    def invalidate(self) -> None:
+        """Force a resync even if the client is idle (wakes a waiting reader)."""
+        self.overflowed = True
+        try:
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+
+class Hub:
+    def __init__(self):
+        self.by_user: Dict[UUID, Set[Stream]] = {}
+        self.by_calendar: Dict[UUID, Set[Stream]] = {}
+        self.by_event: Dict[UUID, Set[Stream]] = {}
+        self.delivered = 0
+        self.overflows = 0
+
+    def __len__(self) -> int:
+        return sum(len(s) for s in self.by_user.values())
+
+    @staticmethod
+    def _add(index: Dict[UUID, Set[Stream]], keys: Iterable[UUID], stream: Stream) -> None:
+        for key in keys:
+            index.setdefault(key, set()).add(stream)
+
+    @staticmethod
+    def _discard(index: Dict[UUID, Set[Stream]], keys: Iterable[UUID], stream: Stream) -> None:
+        for key in keys:
+            streams = index.get(key)
+            if streams is not None:
+                streams.discard(stream)
+                if not streams:
+                    del index[key]
+
+    def connect(self, user_id: UUID, calendar_ids: Set[UUID], event_ids: Set[UUID]) -> Stream:
+        stream = Stream(user_id, calendar_ids, event_ids)
+        self._add(self.by_user, [user_id], stream)
+        self._add(self.by_calendar, calendar_ids, stream)
+        self._add(self.by_event, event_ids, stream)
+        return stream
+
+    def disconnect(self, stream: Stream) -> None:
+        self._discard(self.by_user, [stream.user_id], stream)
+        self._discard(self.by_calendar, stream.calendar_ids, stream)
+        self._discard(self.by_event, stream.event_ids, stream)
+
+    def update_access(self, stream: Stream, calendar_ids: Set[UUID], event_ids: Set[UUID]) -> None:
+        self._discard(self.by_calendar, stream.calendar_ids - calendar_ids, stream)
+        self._add(self.by_calendar, calendar_ids - stream.calendar_ids, stream)
+        self._discard(self.by_event, stream.event_ids - event_ids, stream)
+        self._add(self.by_event, event_ids - stream.event_ids, stream)
+        stream.calendar_ids, stream.event_ids = calendar_ids, event_ids
+
+    def resync_all(self) -> None:
+        """Tell every open stream to resync and close (lost messages, or this worker is draining)."""
+        for streams in list(self.by_user.values()):
+            for stream in list(streams):
+                stream.invalidate()
+
+    def dispatch(self, message: Dict[str, Any]) -> None:
+        """Route one message to local streams. Synchronous: never awaits."""
+        if message.get("user_id"):
+            targets = set(self.by_user.get(UUID(message["user_id"]), ()))
+        else:
+            targets = set(self.by_calendar.get(UUID(message["calendar_id"]), ()))
+            for event_id in message.get("event_ids") or ():
+                targets.update(self.by_event.get(UUID(event_id), ()))
+        for stream in targets:
+            was_overflowed = stream.overflowed
+            stream.offer(message)
+            if stream.overflowed and not was_overflowed:
+                self.overflows += 1
+        self.delivered += len(targets)
+
+
+hub = Hub()
+
+# other per-worker state derived from access (e.g. access.py's cached
+# visible-calendar sets) sees every message before the streams do;
+# None means messages may have been lost
+_observers: List[Callable[[Optional[Dict[str, Any]]], None]] = []
+
+
+def observe(fn: Callable[[Optional[Dict[str, Any]]], None]) -> None:
+    _observers.append(fn)
+
+
+def _deliver(message: Optional[Dict[str, Any]]) -> None:
+    for fn in _observers:
+        fn(message)
+    if message is not None:
+        hub.dispatch(message)
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        "backend": PUSH_BACKEND,
+        "streams": len(hub),
+        "calendars": len(hub.by_calendar),
+        "delivered": hub.delivered,
+        "overflows": hub.overflows,
+    }
+
+
+# --------------------------------------------------------------------
+# Publishing (inside the writer's transaction)
+# --------------------------------------------------------------------
+
+def event_messages(op: str, calendar_id: UUID, event_ids: List[UUID],
+                   user_id: Optional[UUID] = None) -> List[Dict[str, Any]]:
+    """Messages for a batch of events in one calendar; big batches collapse to one id-less message."""
+    base = {"type": "event", "op": op, "calendar_id": str(calendar_id),
+            "user_id": str(user_id) if user_id else None}
+    if len(event_ids) > 10 * MAX_IDS_PER_MESSAGE:
+        return [{**base, "event_ids": None}]
+    return [
+        {**base, "event_ids": [str(e) for e in event_ids[i:i + MAX_IDS_PER_MESSAGE]]}
+        for i in range(0, len(event_ids), MAX_IDS_PER_MESSAGE)
+    ]
+
+
+def calendar_messages(calendar_id: UUID, user_ids: Iterable[UUID]) -> List[Dict[str, Any]]:
+    return [{"type": "calendar", "op": "access", "calendar_id": str(calendar_id), "user_id": str(u)}
+            for u in user_ids]
+
+
+async def publish(session: AsyncSession, messages: List[Dict[str, Any]]) -> None:
+    """Stage messages on the session's transaction; they go out on commit, never on rollback."""
+    if not messages:
+        return
+    if PUSH_BACKEND == "postgres":
+        # NOTIFY is transactional: Postgres delivers to every listening worker at commit
+        await session.execute(
+            text("SELECT pg_notify(:channel, p) FROM unnest(CAST(:payloads AS text[])) AS p"),
+            {"channel": PUSH_CHANNEL, "payloads": [json.dumps(m, separators=(",", ":")) for m in messages]},
+        )
+    else:
+        session.sync_session.info.setdefault(_PENDING, []).extend(messages)
+
+
+@event.listens_for(Session, "after_commit")
+def _deliver_pending(session: Session) -> None:
+    for message in session.info.pop(_PENDING, ()):
+        _deliver(message)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_pending(session: Session, previous_transaction) -> None:
+    session.info.pop(_PENDING, None)
+
+
+# --------------------------------------------------------------------
+# Postgres LISTEN (one dedicated connection per worker, outside the pool)
+# --------------------------------------------------------------------
+
+class _Listener:
+    def __init__(self):
+        self.conn = None
+        self.task: Optional[asyncio.Task] = None
+
+    def _on_notify(self, conn, pid, channel, payload) -> None:
+        try:
+            _deliver(json.loads(payload))
+        except (ValueError, KeyError, TypeError):
+            logger.warning("dropping malformed push payload: %.200s", payload)
+
+    async def _run(self) -> None:
+        import asyncpg
+
+        from .db import DATABASE_URL, ssl_ctx
+
+        dsn = make_url(DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+        backoff = 1.0
+        while True:
+            try:
+                self.conn = await asyncpg.connect(dsn, ssl=ssl_ctx)
+                await self.conn.add_listener(PUSH_CHANNEL, self._on_notify)
+                backoff = 1.0
+                while not self.conn.is_closed():
+                    await asyncio.sleep(PUSH_HEARTBEAT)
+                    await self.conn.execute("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("push listener lost its connection; retrying in %.0fs", backoff)
+            finally:
+                if self.conn is not None and not self.conn.is_closed():
+                    await self.conn.close()
+                self.conn = None
+            # messages sent while disconnected are lost; tell every stream to resync
+            _deliver(None)
+            hub.resync_all()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    async def start(self) -> None:
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+
+_listener = _Listener()
+
+
+async def start() -> None:
+    if PUSH_BACKEND == "postgres":
+        await _listener.start()
+
+
+async def stop() -> None:
+    await _listener.stop()
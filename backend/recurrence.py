@@ -0,0 +1,169 @@
+# backend/recurrence.py
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from dateutil.rrule import DAILY, HOURLY, MINUTELY, SECONDLY, WEEKLY, rrule, rruleset, rrulestr
+from sqlalchemy import and_, or_
+
+from .cache import LRUCache
+from .models import Event
+
+# --------------------------------------------------------------------
+# RRULE expansion
+# Occurrences are expanded in the event's own timezone (so a 9:00 standup
+# stays at 9:00 across DST) and cached per (event id, updated_at, window).
+# Editing an event bumps updated_at, so stale entries are never read again
+# and simply age out of the LRU.
+#
+# A series is not walked from its DTSTART: rules with a fixed period (and no
+# COUNT) start again a whole number of periods before the window, which
+# yields the same occurrences from there on. Whatever is left to walk is
+# capped at MAX_EXPANSION_STEPS.
+# --------------------------------------------------------------------
+
+MAX_OCCURRENCES = 1000  # per event per window
+MAX_EXPANSION_STEPS = 20000  # rule occurrences looked at per event per window
+OCCURRENCE_CACHE_SIZE = 4096
+
+Occurrence = Tuple[datetime, datetime]
+
+_occurrences = LRUCache(maxsize=OCCURRENCE_CACHE_SIZE)
+
+
+def _local_start(ev: Event) -> datetime:
+    if ev.timezone:
+        try:
+            return ev.start_at.astimezone(ZoneInfo(ev.timezone))
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return ev.start_at
+
+
+_PERIODS = {
+    WEEKLY: timedelta(weeks=1), DAILY: timedelta(days=1), HOURLY: timedelta(hours=1),
+    MINUTELY: timedelta(minutes=1), SECONDLY: timedelta(seconds=1),
+}
+
+
+def _fast_forward(rule: rrule, before: datetime) -> rrule:
+    """rule with DTSTART moved forward by whole periods to shortly before `before`.
+
+    Occurrences from `before` on are unchanged. Monthly/yearly rules (at most
+    a dozen steps a year) and COUNT rules (counted from the original start)
+    are returned as they are.
+    """
+    period = _PERIODS.get(rule._freq)
+    dtstart = rule._dtstart
+    if period is None or rule._count or before <= dtstart:
+        return rule
+    # wall-clock arithmetic, as dateutil does; one step of slack for DST shifts
+    step = period * rule._interval
+    wall = dtstart.replace(tzinfo=None)
+    steps = (before.astimezone(dtstart.tzinfo).replace(tzinfo=None) - wall) // step - 1
+    if steps <= 0:
+        return rule
+    return rule.replace(dtstart=(wall + steps * step).replace(tzinfo=dtstart.tzinfo))
+
+
+def _rule(ev: Event, near: Optional[datetime]) -> Optional[rruleset]:
+    """ev's recurrence set, started close to `near` when possible; None if the rule is unparsable."""
+    try:
+        rules = rrulestr(ev.rrule, dtstart=_local_start(ev), forceset=True)
+    except (ValueError, TypeError):
+        # unparsable rule (or naive UNTIL against an aware DTSTART): treat as a single event
+        return None
+    if near is None:
+        return rules
+    moved = rruleset()
+    for r in rules._rrule:
+        moved.rrule(_fast_forward(r, near))
+    for r in rules._exrule:
+        moved.exrule(_fast_forward(r, near))
+    for d in rules._rdate:
+        moved.rdate(d)
+    for d in rules._exdate:
+        moved.exdate(d)
+    return moved
+
+
+def _expand(ev: Event, window_start: Optional[datetime], window_end: Optional[datetime]) -> List[Occurrence]:
+    duration = ev.end_at - ev.start_at
+    # an occurrence overlaps [window_start, window_end) iff
+    # window_start - duration < start < window_end
+    after = window_start - duration if window_start else None
+    rule = _rule(ev, after)
+
+    if rule is None:
+        starts = [ev.start_at]
+    else:
+        starts = []
+        for start in islice(rule, MAX_EXPANSION_STEPS):
+            if window_end and start >= window_end:
+                break
+            if after and start <= after:
+                continue
+            starts.append(start)
+            if len(starts) >= MAX_OCCURRENCES:
+                break
+    return [
+        (s, s + duration) for s in starts
+        if (window_end is None or s < window_end) and (window_start is None or s + duration > window_start)
+    ]
+
+
+def window_clause(window_start: Optional[datetime], window_end: Optional[datetime]):
+    """SQL pre-filter for events that may occur in the window.
+
+    Plain events must overlap it; recurring series only need to have started
+    before its end. occurrences() then settles which series really occur.
+    """
+    series = Event.rrule.is_not(None)
+    if window_end:
+        series = and_(series, Event.start_at < window_end)
+    return or_(Event.overlaps(window_start, window_end), series)
+
+
+def aware(dt: Optional[datetime]) -> Optional[datetime]:
+    # query strings without an offset parse as naive datetimes; treat them as UTC
+    if dt is not None and dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def next_start_after(ev: Event, after: datetime) -> Optional[datetime]:
+    """Start of the first occurrence strictly after `after`, or None if the series has ended."""
+    after = aware(after)
+    if ev.rrule:
+        rule = _rule(ev, after)
+        if rule is not None:
+            try:
+                return next(start for start in islice(rule, MAX_EXPANSION_STEPS) if start > after)
+            except StopIteration:
+                return None
+        # unparsable rule: a single event, same as _expand()
+    return ev.start_at if ev.start_at > after else None
+
+
+def occurrences(ev: Event, window_start: Optional[datetime], window_end: Optional[datetime]) -> List[Occurrence]:
+    """Concrete (start, end) pairs of ev that overlap the window, in start order.
+
+    Non-recurring events yield their single span when it overlaps.
+    """
+    window_start, window_end = aware(window_start), aware(window_end)
+    if not ev.rrule:
+        if (window_end is None or ev.start_at < window_end) and (window_start is None or ev.end_at > window_start):
+            return [(ev.start_at, ev.end_at)]
+        return []
+    if ev.id is None:
+        # not saved yet (conflict checks): nothing stable to cache it under
+        return _expand(ev, window_start, window_end)
+    key = (ev.id, ev.updated_at, window_start, window_end)
+    cached = _occurrences.get(key)
+    if cached is None:
+        cached = _expand(ev, window_start, window_end)
+        _occurrences.set(key, cached)
+    return cached
@@ -0,0 +1,260 @@
+# backend/reminders.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import delete, event, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .changes import CHANGE_LOG_PRUNE_SECONDS, prune_change_log
+from .db import SessionLocal
+from .models import Event, EventReminder, PushSubscription
+from .recurrence import next_start_after
+from .sealing import open_events
+from .webpush import WebPushSender
+
+# --------------------------------------------------------------------
+# Reminders
+# Each reminder row stores its next fire time; the partial index on
+# next_fire_at is the priority queue. The scheduler claims due rows in
+# batches (FOR UPDATE SKIP LOCKED, so several workers never fire the same
+# row), advances them to the next occurrence, commits, and only then sends:
+# delivery is at most once. Between batches it sleeps until the earliest
+# pending fire time, capped at REMINDER_POLL_SECONDS; a commit that adds
+# reminders wakes this worker's scheduler early. The same loop prunes the
+# sync change log (changes.py) every CHANGE_LOG_PRUNE_SECONDS.
+#
+# REMINDERS_ENABLED       "0" turns the scheduler off in this process
+# REMINDER_BATCH          rows claimed per transaction
+# REMINDER_POLL_SECONDS   longest sleep between checks
+# REMINDER_MAX_LATENESS   reminders overdue by more than this (seconds) are
+#                         skipped rather than sent, e.g. after downtime
+# --------------------------------------------------------------------
+
+REMINDERS_ENABLED = os.getenv("REMINDERS_ENABLED", "1") != "0"
+REMINDER_BATCH = int(os.getenv("REMINDER_BATCH", "500"))
+REMINDER_POLL_SECONDS = float(os.getenv("REMINDER_POLL_SECONDS", "30"))
+REMINDER_MAX_LATENESS = timedelta(seconds=float(os.getenv("REMINDER_MAX_LATENESS", "3600")))
+
+logger = logging.getLogger("backend.reminders")
+
+_WAKE = "reminders_wake"
+
+
+def next_fire_at(ev, minutes_before: int, after: datetime) -> Optional[datetime]:
+    """First fire time strictly after `after` (the occurrence must start after after + lead)."""
+    lead = timedelta(minutes=minutes_before)
+    start = next_start_after(ev, after + lead)
+    return start - lead if start else None
+
+
+# --------------------------------------------------------------------
+# Writers (inside the event write's transaction)
+# --------------------------------------------------------------------
+
+def reminder_dicts(specs: Iterable[Any]) -> List[Dict[str, Any]]:
+    """Reminder models as plain dicts, duplicates dropped, ordered by minutes_before_start."""
+    return [
+        {"minutes_before_start": minutes, "method": method}
+        for minutes, method in sorted({(r.minutes_before_start, r.method) for r in specs})
+    ]
+
+
+async def add_reminders(session: AsyncSession, user_id: UUID,
+                        events: Iterable[Tuple[UUID, Any, Iterable[Any]]]) -> None:
+    """Insert reminders for (event_id, event-like, [Reminder]) triples in one statement."""
+    now = datetime.now(timezone.utc)
+    rows = [
+        {"event_id": event_id, "user_id": user_id, **spec,
+         "next_fire_at": next_fire_at(ev, spec["minutes_before_start"], now)}
+        for event_id, ev, specs in events
+        for spec in reminder_dicts(specs)
+    ]
+    if rows:
+        await session.execute(insert(EventReminder), rows)
+        session.sync_session.info[_WAKE] = True
+
+
+async def replace_reminders(session: AsyncSession, ev: Event, specs: Iterable[Any]) -> None:
+    await session.execute(delete(EventReminder).where(EventReminder.event_id == ev.id))
+    await add_reminders(session, ev.owner_user_id, [(ev.id, ev, specs)])
+
+
+async def reschedule(session: AsyncSession, ev: Event) -> None:
+    """Recompute next_fire_at after the event's start, timezone or rrule changed."""
+    rows = (await session.execute(
+        select(EventReminder.id, EventReminder.minutes_before_start).where(EventReminder.event_id == ev.id)
+    )).all()
+    if rows:
+        now = datetime.now(timezone.utc)
+        await session.execute(update(EventReminder), [
+            {"id": r.id, "next_fire_at": next_fire_at(ev, r.minutes_before_start, now)} for r in rows
+        ])
+        session.sync_session.info[_WAKE] = True
+
+
+async def event_reminders(session: AsyncSession, event_id: UUID) -> List[Dict[str, Any]]:
+    rows = (await session.execute(
+        select(EventReminder.minutes_before_start, EventReminder.method)
+        .where(EventReminder.event_id == event_id)
+        .order_by(EventReminder.minutes_before_start)
+    )).all()
+    return [{"minutes_before_start": r.minutes_before_start, "method": r.method} for r in rows]
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_after_commit(session: Session) -> None:
+    if session.info.pop(_WAKE, False):
+        scheduler.wake()
+
+
+# --------------------------------------------------------------------
+# Scheduler
+# --------------------------------------------------------------------
+
+def _message(row) -> Dict[str, Any]:
+    return {
+        "type": "reminder",
+        "event_id": str(row.event_id),
+        "title": row.title,
+        "start_at": (row.next_fire_at + timedelta(minutes=row.minutes_before_start)).isoformat(),
+        "minutes_before_start": row.minutes_before_start,
+    }
+
+
+class ReminderScheduler:
+    def __init__(self, sender: WebPushSender):
+        self.sender = sender
+        self.task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self.fired = 0
+        self.skipped_late = 0
+        self._next_prune = 0.0
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    async def run_once(self) -> int:
+        """Claim, advance and send one batch of due reminders; returns rows claimed."""
+        now = datetime.now(timezone.utc)
+        async with SessionLocal() as session:
+            rows = (await session.execute(
+                select(
+                    EventReminder.id.label("reminder_id"), EventReminder.user_id,
+                    EventReminder.minutes_before_start, EventReminder.next_fire_at,
+                    Event.id, Event.id.label("event_id"), Event.owner_user_id, Event.title,
+                    Event.start_at, Event.timezone, Event.rrule, Event.sealed,
+                )
+                .join(Event, Event.id == EventReminder.event_id)
+                .where(EventReminder.next_fire_at <= now)
+                .order_by(EventReminder.next_fire_at)
+                .limit(REMINDER_BATCH)
+                .with_for_update(of=EventReminder, skip_locked=True)
+            )).all()
+            if not rows:
+                return 0
+            # occurrences missed while nothing was running are skipped, not replayed
+            await session.execute(update(EventReminder), [
+                {"id": r.reminder_id, "last_fired_at": now,
+                 "next_fire_at": next_fire_at(r, r.minutes_before_start, max(r.next_fire_at, now))}
+                for r in rows
+            ])
+            due = [r for r in rows if now - r.next_fire_at <= REMINDER_MAX_LATENESS]
+            subs = []
+            if due:
+                due = await open_events(session, due)  # titles for the push payload
+                subs = (await session.execute(
+                    select(PushSubscription).where(PushSubscription.user_id.in_({r.user_id for r in due}))
+                )).scalars().all()
+            await session.commit()
+
+        self.skipped_late += len(rows) - len(due)
+        by_user: Dict[UUID, List[PushSubscription]] = {}
+        for sub in subs:
+            by_user.setdefault(sub.user_id, []).append(sub)
+        gone = await self.sender.send_many(
+            (sub, _message(r)) for r in due for sub in by_user.get(r.user_id, ())
+        )
+        self.fired += len(due)
+        if gone:
+            async with SessionLocal() as session:
+                await session.execute(delete(PushSubscription).where(PushSubscription.endpoint.in_(gone)))
+                await session.commit()
+        return len(rows)
+
+    async def _seconds_until_next(self) -> float:
+        async with SessionLocal() as session:
+            earliest = (await session.execute(
+                select(func.min(EventReminder.next_fire_at)).where(EventReminder.next_fire_at.is_not(None))
+            )).scalar_one_or_none()
+        if earliest is None:
+            return REMINDER_POLL_SECONDS
+        delay = (earliest - datetime.now(timezone.utc)).total_seconds()
+        return min(max(delay, 0.0), REMINDER_POLL_SECONDS)
+
+    async def _prune_change_log(self) -> None:
+        # any worker may do it: the horizon only moves forward
+        if time.monotonic() < self._next_prune:
+            return
+        self._next_prune = time.monotonic() + CHANGE_LOG_PRUNE_SECONDS
+        async with SessionLocal() as session:
+            pruned = await prune_change_log(session)
+            await session.commit()
+        if pruned:
+            logger.info("pruned %d change log rows", pruned)
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                await self._prune_change_log()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("change log pruning failed")
+            try:
+                if await self.run_once() >= REMINDER_BATCH:
+                    continue  # backlog: keep draining without sleeping
+                delay = await self._seconds_until_next()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("reminder batch failed")
+                delay = REMINDER_POLL_SECONDS
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self) -> None:
+        if REMINDERS_ENABLED and self.task is None:
+            await self.sender.start()
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.sender.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": REMINDERS_ENABLED,
+            "fired": self.fired,
+            "skipped_late": self.skipped_late,
+            **self.sender.stats(),
+        }
+
+
+scheduler = ReminderScheduler(WebPushSender())
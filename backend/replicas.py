@@ -0,0 +1,179 @@
+# backend/replicas.py
+from __future__ import annotations
+
+import itertools
+import logging
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import AsyncGenerator, List, Optional
+
+from fastapi import Request
+from sqlalchemy import event, exc as sa_exc, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from .db import SessionLocal, build_engine, engine
+
+# --------------------------------------------------------------------
+# Read replicas
+# Endpoints that only read (GETs, and query POSTs such as /freebusy and
+# /conflicts) take get_read_session, which hands out a session on one of the
+# replicas (round robin) instead of the primary.
+#
+# Read-your-writes: a request that commits on the primary gets a cookie with
+# the primary's WAL position after the commit. Reads carrying that cookie
+# only go to a replica whose replay position has reached it (cached per
+# replica, re-checked with one query when the cache is behind); otherwise
+# they fall back to the primary. Without replicas configured, everything
+# runs on the primary and no cookie is set.
+#
+# READ_REPLICA_URLS         comma-separated database URLs of the replicas
+# REPLICA_STICKY_SECONDS    lifetime of the read-your-writes cookie
+# REPLICA_RETRY_SECONDS     how long a replica that failed to connect is skipped
+#
+# A stand-in for local testing: point READ_REPLICA_URLS at the primary
+# itself. pg_last_wal_replay_lsn() is NULL there, which counts as caught up.
+# --------------------------------------------------------------------
+
+READ_REPLICA_URLS = [u.strip() for u in os.getenv("READ_REPLICA_URLS", "").split(",") if u.strip()]
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "30"))
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "10"))
+
+LSN_COOKIE = "rlsn"
+
+logger = logging.getLogger("backend.replicas")
+
+
+def parse_lsn(value: Optional[str]) -> Optional[int]:
+    """'16/B374D848' -> int; None for a missing or malformed value."""
+    try:
+        hi, lo = value.split("/")
+        return (int(hi, 16) << 32) | int(lo, 16)
+    except (AttributeError, ValueError):
+        return None
+
+
+class Replica:
+    def __init__(self, index: int, url: str):
+        self.name = f"replica-{index}"
+        self.engine: AsyncEngine = build_engine(url)
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False, class_=AsyncSession)
+        self.replayed = 0          # highest replay LSN seen; it only moves forward
+        self.down_until = 0.0
+        self.reads = 0
+        self.lagging = 0
+        self.errors = 0
+
+    async def replay_lsn(self, session: AsyncSession) -> int:
+        value = (await session.execute(text("SELECT pg_last_wal_replay_lsn()::text"))).scalar()
+        # NULL: not a standby (e.g. the primary standing in), so always current
+        self.replayed = max(self.replayed, parse_lsn(value) or (1 << 64))
+        return self.replayed
+
+
+replicas: List[Replica] = [Replica(i, url) for i, url in enumerate(READ_REPLICA_URLS)]
+_round_robin = itertools.cycle(replicas) if replicas else None
+
+
+# --------------------------------------------------------------------
+# Per-request routing state (set by the middleware, filled by sessions)
+# --------------------------------------------------------------------
+
+@dataclass
+class Route:
+    min_lsn: Optional[int] = None
+    source: str = "primary"
+    wrote: bool = False
+
+
+_route: ContextVar[Optional[Route]] = ContextVar("replica_route", default=None)
+
+
+@event.listens_for(Session, "after_commit")
+def _note_commit(session: Session) -> None:
+    route = _route.get()
+    if route is not None and not session.info.get("replica"):
+        route.wrote = True
+
+
+async def read_your_writes_middleware(request, call_next):
+    if not replicas:
+        return await call_next(request)
+    route = Route(min_lsn=parse_lsn(request.cookies.get(LSN_COOKIE)))
+    token = _route.set(route)
+    try:
+        response = await call_next(request)
+    finally:
+        _route.reset(token)
+    if route.wrote:
+        # position after our commit; a replica that has replayed this far has the write
+        async with engine.connect() as conn:
+            lsn = (await conn.execute(text("SELECT pg_current_wal_lsn()::text"))).scalar()
+        response.set_cookie(LSN_COOKIE, lsn, max_age=REPLICA_STICKY_SECONDS, httponly=True, samesite="lax")
+    response.headers["X-Read-Source"] = route.source
+    return response
+
+
+# --------------------------------------------------------------------
+# FastAPI dependency
+# --------------------------------------------------------------------
+
+async def _replica_session(min_lsn: Optional[int]) -> Optional[AsyncSession]:
+    """A session on the next usable replica, or None when the primary must serve the read."""
+    now = time.monotonic()
+    for _ in range(len(replicas)):
+        replica = next(_round_robin)
+        if replica.down_until > now:
+            continue
+        session = replica.sessions(info={"replica": replica.name})
+        try:
+            if min_lsn is not None and replica.replayed < min_lsn and await replica.replay_lsn(session) < min_lsn:
+                replica.lagging += 1
+                await session.close()
+                continue
+            await session.connection()
+        except (OSError, sa_exc.DBAPIError) as exc:
+            replica.errors += 1
+            replica.down_until = now + REPLICA_RETRY_SECONDS
+            logger.warning("%s unavailable, skipping for %ss: %s", replica.name, REPLICA_RETRY_SECONDS, exc)
+            await session.close()
+            continue
+        replica.reads += 1
+        return session
+    return None
+
+
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Session for read-only handlers: a replica when one is current enough, else the primary."""
+    session = None
+    if replicas:
+        route = _route.get()
+        min_lsn = route.min_lsn if route else parse_lsn(request.cookies.get(LSN_COOKIE))
+        session = await _replica_session(min_lsn)
+        if session is not None and route is not None:
+            route.source = session.info["replica"]
+    if session is None:
+        session = SessionLocal()
+    async with session:
+        yield session
+
+
+def replica_status() -> List[dict]:
+    return [
+        {
+            "name": r.name,
+            "reads": r.reads,
+            "lagging": r.lagging,
+            "errors": r.errors,
+            "down": r.down_until > time.monotonic(),
+            "pool_checked_out": r.engine.sync_engine.pool.checkedout(),
+        }
+        for r in replicas
+    ]
+
+
+async def dispose() -> None:
+    for r in replicas:
+        await r.engine.dispose()
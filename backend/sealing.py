@@ -0,0 +1,304 @@
+# backend/sealing.py
+from __future__ import annotations
+
+import asyncio
+import base64
+import logging
+import os
+import struct
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .cache import LRUCache
+from .models import UserKey
+from .serializers import EVENT_COLUMNS
+from .upsert import upsert
+
+try:  # optional: only needed when EVENT_ENCRYPTION_KEY is set
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:  # pragma: no cover - depends on the environment
+    AESGCM = None
+    InvalidTag = ValueError
+
+# --------------------------------------------------------------------
+# Event content encryption (envelope)
+# Each user has a random AES-256-GCM data key, stored wrapped by the master
+# key (UserKey). An event's title/description/location are sealed together
+# under its owner's data key into Event.sealed; the plaintext columns keep
+# only placeholders. Rows are opened on the read path, a whole result set
+# at a time: data keys come from an LRU cache (one query for all misses),
+# and batches above CRYPTO_INLINE_ROWS are split into chunks that run on a
+# thread pool so the event loop is not held up.
+#
+# Sealed content is invisible to the database, so it cannot match
+# list_events ?q= or /search (their tsvector only sees the placeholders).
+# Events written before the key was set stay plaintext and are read as is.
+#
+# A blob is bound to its event: the GCM associated data is the owner and
+# event ids, and the owner named in the header must be the row's owner, so
+# a blob copied onto another event (anyone's) does not open. A row that
+# cannot be opened (tampered, or its owner's UserKey is gone) is logged and
+# returned with the placeholders instead of failing the whole response.
+#
+# EVENT_ENCRYPTION_KEY  base64url 32-byte master key; unset = store plaintext
+# KEY_CACHE_SIZE        unwrapped data keys kept per worker
+# KEY_CACHE_TTL         seconds an unwrapped data key stays cached
+# CRYPTO_WORKERS        threads for sealing/opening large batches
+# CRYPTO_INLINE_ROWS    batches up to this size run inline (a thread hop costs more)
+# CRYPTO_CHUNK_ROWS     rows per thread pool task
+# --------------------------------------------------------------------
+
+EVENT_ENCRYPTION_KEY = os.getenv("EVENT_ENCRYPTION_KEY")
+KEY_CACHE_SIZE = int(os.getenv("KEY_CACHE_SIZE", "10000"))
+KEY_CACHE_TTL = float(os.getenv("KEY_CACHE_TTL", "600"))
+CRYPTO_WORKERS = int(os.getenv("CRYPTO_WORKERS", "4"))
+CRYPTO_INLINE_ROWS = int(os.getenv("CRYPTO_INLINE_ROWS", "200"))
+CRYPTO_CHUNK_ROWS = int(os.getenv("CRYPTO_CHUNK_ROWS", "2000"))
+
+SEALED_FIELDS = ("title", "description", "location")
+PLACEHOLDERS = {"title": "", "description": None, "location": None}
+
+_VERSION = b"\x02"  # 1: owner-only associated data, still read until the row is next written
+_HEADER = struct.Struct("!c16s12s")  # version, key owner (user id), nonce
+_LEN = struct.Struct("!I")
+_NONE_LEN = 0xFFFFFFFF
+
+logger = logging.getLogger("backend.sealing")
+
+_master = None
+if EVENT_ENCRYPTION_KEY:
+    if AESGCM is None:
+        raise RuntimeError("EVENT_ENCRYPTION_KEY is set but the 'cryptography' package is not installed")
+    _master = AESGCM(base64.urlsafe_b64decode(EVENT_ENCRYPTION_KEY + "=" * (-len(EVENT_ENCRYPTION_KEY) % 4)))
+
+ENABLED = _master is not None
+
+_keys = LRUCache(maxsize=KEY_CACHE_SIZE, ttl=KEY_CACHE_TTL)
+_pool = ThreadPoolExecutor(max_workers=CRYPTO_WORKERS, thread_name_prefix="sealing")
+_EVENT_FIELDS = [c.key for c in EVENT_COLUMNS]
+
+
+class Stats:
+    def __init__(self):
+        self.sealed = 0
+        self.opened = 0
+        self.offloaded_batches = 0
+
+
+stats = Stats()
+
+
+# --------------------------------------------------------------------
+# Data keys
+# --------------------------------------------------------------------
+
+def _wrap_aad(user_id: UUID) -> bytes:
+    return b"user-key:" + user_id.bytes
+
+
+def _unwrap(user_id: UUID, wrapped: bytes):
+    return AESGCM(_master.decrypt(wrapped[:12], wrapped[12:], _wrap_aad(user_id)))
+
+
+def _require_master() -> None:
+    if _master is None:
+        raise RuntimeError("Encrypted events found but EVENT_ENCRYPTION_KEY is not set")
+
+
+async def _data_keys(session: AsyncSession, user_ids: Iterable[UUID]) -> Dict[UUID, Any]:
+    """Unwrapped data keys for user_ids: cache first, one query for the rest."""
+    found, missing = {}, []
+    for uid in set(user_ids):
+        key = _keys.get(uid)
+        if key is None:
+            missing.append(uid)
+        else:
+            found[uid] = key
+    if missing:
+        _require_master()
+        rows = await session.execute(select(UserKey.user_id, UserKey.wrapped_key).where(UserKey.user_id.in_(missing)))
+        for uid, wrapped in rows:
+            found[uid] = _unwrap(uid, wrapped)
+            _keys.set(uid, found[uid])
+    return found
+
+
+async def _write_key(session: AsyncSession, user_id: UUID):
+    """The user's data key, created on first use (racing writers agree on one row)."""
+    key = (await _data_keys(session, [user_id])).get(user_id)
+    if key is None:
+        raw, nonce = AESGCM.generate_key(bit_length=256), os.urandom(12)
+        wrapped = nonce + _master.encrypt(nonce, raw, _wrap_aad(user_id))
+        if await upsert(session, UserKey, {"user_id": user_id, "wrapped_key": wrapped}, conflict=["user_id"]):
+            key = AESGCM(raw)
+            _keys.set(user_id, key)
+        else:
+            key = (await _data_keys(session, [user_id]))[user_id]
+    return key
+
+
+# --------------------------------------------------------------------
+# Batched seal / open
+# --------------------------------------------------------------------
+
+def _encode(content: Dict[str, Optional[str]]) -> bytes:
+    # length-prefixed UTF-8 per field (NONE_LEN for None): several times cheaper to parse than JSON
+    out = bytearray()
+    for name in SEALED_FIELDS:
+        value = content.get(name)
+        if value is None:
+            out += _LEN.pack(_NONE_LEN)
+        else:
+            data = value.encode()
+            out += _LEN.pack(len(data)) + data
+    return bytes(out)
+
+
+def _decode(data: bytes) -> Dict[str, Optional[str]]:
+    fields, pos = {}, 0
+    for name in SEALED_FIELDS:
+        (length,) = _LEN.unpack_from(data, pos)
+        pos += _LEN.size
+        if length == _NONE_LEN:
+            fields[name] = None
+        else:
+            fields[name] = data[pos:pos + length].decode()
+            pos += length
+    return fields
+
+
+def _seal_one(key, owner: UUID, event_id: UUID, content: Dict[str, Optional[str]]) -> bytes:
+    nonce = os.urandom(12)
+    return _HEADER.pack(_VERSION, owner.bytes, nonce) + key.encrypt(nonce, _encode(content), owner.bytes + event_id.bytes)
+
+
+def _open_one(key, blob: bytes, event_id: UUID, owner: UUID) -> Dict[str, Optional[str]]:
+    version, key_owner, nonce = _HEADER.unpack_from(blob)
+    if key_owner != owner.bytes:
+        raise ValueError("sealed under another user's key")
+    aad = owner.bytes if version == b"\x01" else owner.bytes + event_id.bytes
+    return _decode(key.decrypt(nonce, blob[_HEADER.size:], aad))
+
+
+async def _batched(fn: Callable[[Sequence], List], items: Sequence) -> List:
+    """fn over items; inline when small, else in CRYPTO_CHUNK_ROWS chunks on the pool."""
+    if len(items) <= CRYPTO_INLINE_ROWS:
+        return fn(items)
+    loop = asyncio.get_running_loop()
+    chunks = [items[i:i + CRYPTO_CHUNK_ROWS] for i in range(0, len(items), CRYPTO_CHUNK_ROWS)]
+    stats.offloaded_batches += 1
+    results = await asyncio.gather(*(loop.run_in_executor(_pool, fn, chunk) for chunk in chunks))
+    return [item for chunk in results for item in chunk]
+
+
+async def seal_rows(session: AsyncSession, owner: UUID, rows: List[Dict[str, Any]]) -> None:
+    """Replace the content fields of insert/update dicts with a sealed blob, in place (no-op when disabled)."""
+    if not ENABLED or not rows:
+        return
+    key = await _write_key(session, owner)
+    for row in rows:
+        if row.get("id") is None:
+            row["id"] = uuid.uuid4()  # the blob is bound to it
+    blobs = await _batched(lambda chunk: [_seal_one(key, owner, r["id"], r) for r in chunk], rows)
+    for row, blob in zip(rows, blobs):
+        row.update(PLACEHOLDERS, sealed=blob)
+    stats.sealed += len(rows)
+
+
+async def seal_event(session: AsyncSession, ev) -> None:
+    """Seal the content of a new ORM Event in place before it is added (assigns its id)."""
+    if ev.id is None:
+        ev.id = uuid.uuid4()
+    row = {"id": ev.id, **{name: getattr(ev, name) for name in SEALED_FIELDS}}
+    await seal_rows(session, ev.owner_user_id, [row])
+    if ENABLED:
+        for name, value in row.items():
+            setattr(ev, name, value)
+
+
+def _fields(ev) -> Dict[str, Any]:
+    if hasattr(ev, "_asdict"):  # column-projection Row
+        return ev._asdict()
+    if isinstance(ev, SimpleNamespace):
+        return vars(ev)
+    return {name: getattr(ev, name) for name in _EVENT_FIELDS}
+
+
+def _try_open(keys: Dict[UUID, Any], ev) -> Optional[Dict[str, Optional[str]]]:
+    key = keys.get(ev.owner_user_id)
+    if key is None:
+        logger.warning("event %s: no data key for owner %s, content not opened", ev.id, ev.owner_user_id)
+        return None
+    try:
+        return _open_one(key, ev.sealed, ev.id, ev.owner_user_id)
+    except (InvalidTag, ValueError) as exc:
+        logger.warning("event %s: sealed content does not open (%s)", ev.id, type(exc).__name__)
+        return None
+
+
+async def open_events(session: AsyncSession, rows: Iterable) -> List:
+    """Rows with their content fields restored; rows that are not sealed come back unchanged.
+
+    Rows need id, owner_user_id and sealed. Opened rows are plain namespaces
+    with the same attributes, so event_dict, occurrences() and friends accept
+    them like any other row.
+    """
+    rows = list(rows)
+    sealed = [i for i, ev in enumerate(rows) if getattr(ev, "sealed", None)]
+    if not sealed:
+        return rows
+    keys = await _data_keys(session, {rows[i].owner_user_id for i in sealed})
+    contents = await _batched(lambda chunk: [_try_open(keys, rows[i]) for i in chunk], sealed)
+    for i, content in zip(sealed, contents):
+        rows[i] = SimpleNamespace(**{**_fields(rows[i]), **(content or PLACEHOLDERS)})
+    stats.opened += len(sealed)
+    return rows
+
+
+async def open_stream(session: AsyncSession, rows, chunk: int = 500):
+    """open_events over an async row iterator, a chunk at a time."""
+    buffer = []
+    async for ev in rows:
+        buffer.append(ev)
+        if len(buffer) >= chunk:
+            for opened in await open_events(session, buffer):
+                yield opened
+            buffer = []
+    for opened in await open_events(session, buffer):
+        yield opened
+
+
+async def update_content(session: AsyncSession, ev, changes: Dict[str, Optional[str]]) -> None:
+    """Apply title/description/location changes to an ORM Event, resealing when encryption is on."""
+    if not changes:
+        return
+    if not ENABLED:
+        if ev.sealed:
+            _require_master()
+        for name, value in changes.items():
+            setattr(ev, name, value)
+        return
+    current = {name: getattr(ev, name) for name in SEALED_FIELDS}
+    if ev.sealed:
+        current = _try_open(await _data_keys(session, [ev.owner_user_id]), ev) or dict(PLACEHOLDERS)
+    row = {"id": ev.id, **current, **changes}
+    await seal_rows(session, ev.owner_user_id, [row])
+    for name, value in row.items():
+        setattr(ev, name, value)
+
+
+def status() -> Dict[str, Any]:
+    return {
+        "enabled": ENABLED,
+        "sealed": stats.sealed,
+        "opened": stats.opened,
+        "offloaded_batches": stats.offloaded_batches,
+        "key_cache": {"size": len(_keys), "hits": _keys.hits, "misses": _keys.misses},
+    }
@@ -0,0 +1,97 @@
+# backend/serializers.py
+from __future__ import annotations
+
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List
+from uuid import UUID
+
+from fastapi import Response
+
+from .models import Calendar, Event, User
+
+try:  # optional fast JSON backend
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+# --------------------------------------------------------------------
+# Response serialization
+# Rows (ORM entities or column-projection Rows; both expose attributes) go
+# straight to plain dicts and then to JSON bytes, skipping FastAPI's
+# jsonable_encoder pass. Busy redaction lives here so every endpoint that
+# returns events applies it the same way.
+# --------------------------------------------------------------------
+
+EVENT_COLUMNS = (
+    Event.id, Event.calendar_id, Event.owner_user_id,
+    Event.title, Event.description, Event.location,
+    Event.start_at, Event.end_at, Event.timezone,
+    Event.all_day, Event.visibility, Event.rrule,
+    Event.created_at, Event.updated_at, Event.sealed,
+)
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode()
+
+
+class JSONBytesResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return content if isinstance(content, bytes) else dumps(content)
+
+
+def json_response(content: Any, status_code: int = 200, headers: Dict[str, str] = None) -> JSONBytesResponse:
+    return JSONBytesResponse(dumps(content), status_code=status_code, headers=headers)
+
+
+# what a "busy" event shows in place of its content to anyone but the owner
+REDACTED = {"title": "Busy", "description": None, "location": None}
+
+
+def redacted(ev, viewer_id: UUID) -> bool:
+    return ev.visibility == "busy" and ev.owner_user_id != viewer_id
+
+
+def event_dict(ev, viewer_id: UUID) -> Dict[str, Any]:
+    # "busy" events only reveal their time slot to anyone but the owner
+    hidden = redacted(ev, viewer_id)
+    return {
+        "id": ev.id, "calendar_id": ev.calendar_id, "owner_user_id": ev.owner_user_id,
+        "title": REDACTED["title"] if hidden else ev.title,
+        "description": None if hidden else ev.description,
+        "location": None if hidden else ev.location,
+        "start_at": ev.start_at, "end_at": ev.end_at, "timezone": ev.timezone,
+        "all_day": ev.all_day, "visibility": ev.visibility, "rrule": ev.rrule,
+        "created_at": ev.created_at, "updated_at": ev.updated_at,
+    }
+
+
+def event_dicts(rows: Iterable, viewer_id: UUID) -> List[Dict[str, Any]]:
+    return [event_dict(ev, viewer_id) for ev in rows]
+
+
+def calendar_dict(cal: Calendar) -> Dict[str, Any]:
+    return {
+        "id": cal.id, "owner_user_id": cal.owner_user_id, "name": cal.name, "visibility": cal.visibility,
+        "created_at": cal.created_at, "updated_at": cal.updated_at,
+    }
+
+
+def user_dict(user: User) -> Dict[str, Any]:
+    return {
+        "id": user.id, "email": user.email, "full_name": user.full_name, "avatar_url": user.avatar_url,
+        "is_active": user.is_active, "role": user.role, "created_at": user.created_at, "updated_at": user.updated_at,
+    }
@@ -0,0 +1,136 @@
+# backend/serve.py
+from __future__ import annotations
+
+import argparse
+import asyncio
+import copy
+import importlib.util
+import logging
+import logging.config
+import os
+
+import uvicorn
+
+from . import db  # noqa: F401  (loads .env before the settings below are read, as in the workers)
+from .lifecycle import SHUTDOWN_TIMEOUT
+
+# --------------------------------------------------------------------
+# Production entry point
+#   python -m backend.serve [--workers N] [--host H] [--port P] [--create-tables]
+# Runs backend.Api_Structure:app under uvicorn with N worker processes. The
+# app goes in as an import string, so each worker is a fresh (spawned, not
+# forked) interpreter that builds its own engines and pools: DB_POOL_SIZE /
+# DB_MAX_OVERFLOW are per worker. uvloop and httptools are used when they are
+# installed. Shutdown drains first, see lifecycle.py.
+#
+# With more than one worker, push notifications and the per-worker caches
+# (including the visible-calendar sets behind permission checks) only hear
+# about other workers' writes with PUSH_BACKEND=postgres, so that is the
+# default then and any other backend stops the server. SECRET_KEY must be
+# set too: otherwise every worker signs tokens with its own random key and
+# rejects the others'. A malformed EVENT_ENCRYPTION_KEY stops the server
+# here instead of in each worker.
+#
+# WEB_CONCURRENCY     worker processes (default: one per CPU)
+# HOST / PORT         listen address
+# SERVER_LOOP         "auto" (uvloop when installed), "uvloop" or "asyncio"
+# SERVER_HTTP         "auto" (httptools when installed), "httptools" or "h11"
+# KEEPALIVE_SECONDS   idle keep-alive timeout
+# FORWARDED_ALLOW_IPS proxies trusted for X-Forwarded-For / -Proto
+# LOG_LEVEL           level of the backend.* loggers, in every worker
+# --------------------------------------------------------------------
+
+APP = "backend.Api_Structure:app"
+
+logger = logging.getLogger("backend.serve")
+
+
+def _log_config() -> dict:
+    # spawned workers do not inherit logging setup; uvicorn applies this dict in each
+    config = copy.deepcopy(uvicorn.config.LOGGING_CONFIG)
+    config["loggers"]["backend"] = {"handlers": ["default"], "level": os.getenv("LOG_LEVEL", "INFO")}
+    return config
+
+
+def check_secrets(workers: int) -> None:
+    """Refuse to start workers that would not agree on their keys."""
+    if not os.getenv("SECRET_KEY"):
+        if workers > 1:
+            raise SystemExit(f"SECRET_KEY is not set: each of the {workers} workers would sign "
+                             "tokens with its own random key; set it or run one worker")
+        logger.warning("SECRET_KEY is not set: tokens will not survive a restart")
+    if os.getenv("EVENT_ENCRYPTION_KEY"):
+        try:
+            from . import sealing  # noqa: F401  (checks the key at import)
+        except (RuntimeError, ValueError) as exc:
+            raise SystemExit(f"EVENT_ENCRYPTION_KEY: {exc}")
+
+
+def check_push_backend(workers: int) -> None:
+    """Several workers must share writes over Postgres: default to it, refuse anything else."""
+    if workers <= 1:
+        return
+    backend = os.getenv("PUSH_BACKEND")
+    if not backend:
+        # the spawned workers read it from this environment
+        os.environ["PUSH_BACKEND"] = "postgres"
+        logger.info("%d workers: PUSH_BACKEND=postgres", workers)
+    elif backend.lower() != "postgres":
+        raise SystemExit(f"PUSH_BACKEND={backend} with {workers} workers: cache invalidation (and with it "
+                         "permission checks) would not reach other workers; set PUSH_BACKEND=postgres "
+                         "or run one worker")
+
+
+def _pick(setting: str, module: str, fallback: str) -> str:
+    if setting != "auto":
+        return setting
+    return module if importlib.util.find_spec(module) else fallback
+
+
+async def create_tables() -> None:
+    from . import models  # noqa: F401  (populates Base.metadata)
+    from .db import Base, engine
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    # nothing of this engine may outlive the call: workers build their own
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the Calendar API")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--create-tables", action="store_true", help="create missing tables, then serve")
+    args = parser.parse_args()
+    log_config = _log_config()
+    logging.config.dictConfig(log_config)
+
+    loop = _pick(os.getenv("SERVER_LOOP", "auto"), "uvloop", "asyncio")
+    http = _pick(os.getenv("SERVER_HTTP", "auto"), "httptools", "h11")
+    logger.info("%d worker(s), loop=%s, http=%s", args.workers, loop, http)
+    check_secrets(args.workers)
+    check_push_backend(args.workers)
+
+    if args.create_tables:
+        asyncio.run(create_tables())
+
+    uvicorn.run(
+        APP,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop=loop,
+        http=http,
+        lifespan="on",
+        timeout_keep_alive=int(os.getenv("KEEPALIVE_SECONDS", "5")),
+        timeout_graceful_shutdown=int(SHUTDOWN_TIMEOUT),
+        forwarded_allow_ips=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+        log_config=log_config,
+        access_log=False,  # instrumentation.py already logs one line per request
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 # test_auth_flow.py
+# Against a running server (uvicorn on :8000) started with DEMO_LOGIN=1.
 import asyncio
 import httpx
 import uuid
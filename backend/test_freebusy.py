@@ -0,0 +1,132 @@
+# test_freebusy.py
+# Busy bitmap arithmetic, no database needed (queries are answered by a stub session):
+#   python -m pytest backend/test_freebusy.py
+import asyncio
+import random
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import UUID
+
+import pytest
+
+from backend import freebusy
+from backend.freebusy import SLOTS_PER_DAY, _mark, busy_bitmaps, busy_intervals, next_free_slot
+
+UTC = timezone.utc
+DAY = date(2026, 3, 2)
+MIDNIGHT = datetime(2026, 3, 3, tzinfo=UTC)
+ALICE, BOB = UUID(int=1), UUID(int=2)
+
+
+def _at(hour, minute=0, day=DAY):
+    return datetime(day.year, day.month, day.day, hour, minute, tzinfo=UTC)
+
+
+def _slots(first, count):
+    return ((1 << count) - 1) << first
+
+
+class _Result(list):
+    def all(self):
+        return list(self)
+
+
+class _Session:
+    """Answers each execute() with the next canned list of rows."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+
+    async def execute(self, stmt):
+        return _Result(self.results.pop(0))
+
+
+def test_mark_splits_an_event_across_midnight():
+    bitmaps = {}
+    _mark(bitmaps, _at(23, 50), MIDNIGHT + timedelta(minutes=20))
+    assert bitmaps == {DAY: _slots(SLOTS_PER_DAY - 2, 2), DAY + timedelta(days=1): _slots(0, 4)}
+    assert busy_intervals(bitmaps, _at(0), MIDNIGHT + timedelta(days=1)) == [
+        (_at(23, 50), MIDNIGHT + timedelta(minutes=20)),  # one interval, not two
+    ]
+
+
+def test_mark_rounds_partial_slots_outwards():
+    bitmaps = {}
+    _mark(bitmaps, _at(10, 2), _at(10, 8))
+    assert bitmaps == {DAY: _slots(120, 2)}  # 10:00-10:10
+
+
+def test_intervals_are_clipped_to_the_window_edges():
+    bitmaps = {DAY: _slots(120, 2) | _slots(144, 6)}  # 10:00-10:10, 12:00-12:30
+    assert busy_intervals(bitmaps, _at(10, 3), _at(12, 17)) == [
+        (_at(10, 3), _at(10, 10)), (_at(12), _at(12, 17)),
+    ]
+
+
+def test_event_ending_at_midnight_stays_on_its_day():
+    bitmaps = {}
+    _mark(bitmaps, _at(23, 55), MIDNIGHT)
+    assert bitmaps == {DAY: _slots(SLOTS_PER_DAY - 1, 1)}
+    assert busy_intervals(bitmaps, _at(12), MIDNIGHT) == [(_at(23, 55), MIDNIGHT)]
+
+
+def test_series_is_ored_over_stored_busy_days():
+    stored = [(ALICE, DAY, _slots(108, 12).to_bytes(36, "big"))]  # 09:00-10:00
+    standup = SimpleNamespace(
+        id=UUID(int=10), updated_at=_at(0), owner_user_id=ALICE, timezone="UTC",
+        start_at=datetime(2026, 1, 5, 9, 30, tzinfo=UTC), end_at=datetime(2026, 1, 5, 10, 15, tzinfo=UTC),
+        rrule="FREQ=DAILY",
+    )
+    session = _Session(stored, [standup])
+    bitmaps = asyncio.run(busy_bitmaps(session, [ALICE, BOB], _at(0), MIDNIGHT + timedelta(days=1)))
+    assert bitmaps[ALICE] == {
+        DAY: _slots(108, 15),  # 09:00-10:00 stored | 09:30-10:15 series
+        DAY + timedelta(days=1): _slots(114, 9),  # the series alone
+    }
+    assert BOB not in bitmaps
+
+
+def _brute_force(bitmaps, need, start, end):
+    origin = _at(0)
+    first, last = -int(-(start - origin) // freebusy._SLOT), int((end - origin) // freebusy._SLOT)
+    busy = set()
+    for per_user in bitmaps.values():
+        for day, bits in per_user.items():
+            offset = (day - DAY).days * SLOTS_PER_DAY
+            busy.update(offset + i for i in range(SLOTS_PER_DAY) if bits >> i & 1)
+    for slot in range(first, last - need + 1):
+        if not busy.intersection(range(slot, slot + need)):
+            return origin + slot * freebusy._SLOT
+    return None
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_next_free_slot_matches_a_slot_by_slot_scan(monkeypatch, seed):
+    rng = random.Random(seed)
+    bitmaps = {uid: {} for uid in (ALICE, BOB)}
+    for per_user in bitmaps.values():
+        for _ in range(rng.randrange(5, 40)):
+            s = _at(0) + timedelta(minutes=rng.randrange(0, 2 * 24 * 60))
+            _mark(per_user, s, s + timedelta(minutes=rng.randrange(5, 240)))
+
+    async def fake_bitmaps(session, user_ids, start, end):
+        return bitmaps
+
+    monkeypatch.setattr(freebusy, "busy_bitmaps", fake_bitmaps)
+    duration = timedelta(minutes=rng.randrange(5, 180))
+    start = _at(0) + timedelta(minutes=rng.randrange(0, 600))
+    end = start + timedelta(hours=rng.randrange(2, 40))
+    got = asyncio.run(next_free_slot(None, [ALICE, BOB], duration, start, end))
+    need = -int(-duration // freebusy._SLOT)
+    expected = _brute_force(bitmaps, need, start, end)
+    assert got == (None if expected is None else (expected, expected + duration))
+
+
+def test_next_free_slot_may_end_exactly_at_the_window_end(monkeypatch):
+    async def fake_bitmaps(session, user_ids, start, end):
+        return {ALICE: {DAY: _slots(0, SLOTS_PER_DAY - 12)}}  # busy until 23:00
+
+    monkeypatch.setattr(freebusy, "busy_bitmaps", fake_bitmaps)
+    hour = timedelta(hours=1)
+    assert asyncio.run(next_free_slot(None, [ALICE], hour, _at(8), MIDNIGHT)) == (_at(23), MIDNIGHT)
+    assert asyncio.run(next_free_slot(None, [ALICE], hour + freebusy._SLOT, _at(8), MIDNIGHT)) is None
@@ -0,0 +1,51 @@
+# test_read_your_writes.py
+# Run the server with DEMO_LOGIN=1 and READ_REPLICA_URLS set (a real standby, or the primary's
+# own URL as a stand-in), then run this. Every read straight after a write must
+# see that write; X-Read-Source shows whether a replica or the primary served it.
+import asyncio
+import os
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+BASE = "http://127.0.0.1:8000"
+ROUNDS = 50
+# /internal/* is admins only: pass an admin's token in ADMIN_TOKEN to see server stats
+ADMIN = {"Authorization": f"Bearer {os.environ['ADMIN_TOKEN']}"} if os.getenv("ADMIN_TOKEN") else {}
+
+
+async def main():
+    email = f"ryw+{uuid.uuid4().hex[:6]}@example.com"
+    async with httpx.AsyncClient(base_url=BASE, timeout=20) as client:
+        r = await client.post("/users", json={"email": email, "password": "TestPass!234"})
+        r.raise_for_status()
+        r = await client.post("/login", json={"email": email, "password": "TestPass!234"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        cal_id = (await client.post("/calendars", json={"name": "ryw"}, headers=headers)).json()["id"]
+
+        sources = Counter()
+        start = datetime.now(timezone.utc)
+        for i in range(ROUNDS):
+            r = await client.post(f"/calendars/{cal_id}/events", headers=headers, json={
+                "title": f"ryw {i}",
+                "start_at": (start + timedelta(hours=i)).isoformat(),
+                "end_at": (start + timedelta(hours=i, minutes=30)).isoformat(),
+            })
+            r.raise_for_status()
+            print("WRITE:", r.status_code, "cookie rlsn =", client.cookies.get("rlsn"))
+            event_id = r.json()["id"]
+
+            # the client sends the rlsn cookie back, so this read must see the new event
+            r = await client.get(f"/events/{event_id}", headers=headers)
+            sources[r.headers.get("X-Read-Source")] += 1
+            assert r.status_code == 200, f"read after write missed the event: {r.status_code}"
+
+        print("READ SOURCES:", dict(sources))
+        print("POOL:", (await client.get("/internal/pool", headers=ADMIN)).json())
+        await client.delete(f"/calendars/{cal_id}", headers=headers)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
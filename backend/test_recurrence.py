@@ -0,0 +1,127 @@
+# test_recurrence.py
+# RRULE expansion checked against plain dateutil, no database needed:
+#   python -m pytest backend/test_recurrence.py
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+from zoneinfo import ZoneInfo
+
+import pytest
+from dateutil.rrule import rrulestr
+
+from backend import recurrence
+from backend.cache import LRUCache
+from backend.recurrence import _fast_forward, next_start_after, occurrences
+
+NY = ZoneInfo("America/New_York")
+UTC = timezone.utc
+
+
+def _event(rrule, start=datetime(2001, 1, 3, 9, 0, tzinfo=NY), minutes=30, tz="America/New_York"):
+    start = start.astimezone(UTC)
+    return SimpleNamespace(
+        id=uuid4(), updated_at=start, rrule=rrule, timezone=tz,
+        start_at=start, end_at=start + timedelta(minutes=minutes),
+    )
+
+
+def _reference(ev, lo, hi):
+    # every occurrence walked from DTSTART, as dateutil alone would
+    duration = ev.end_at - ev.start_at
+    rule = rrulestr(ev.rrule, dtstart=ev.start_at.astimezone(ZoneInfo(ev.timezone)), forceset=True)
+    return [(s, s + duration) for s in rule.between(lo - duration, hi, inc=False)]
+
+
+# the window spans the 2026-03-08 spring-forward in New York
+DST_WINDOW = (datetime(2026, 3, 1, tzinfo=UTC), datetime(2026, 3, 22, tzinfo=UTC))
+
+
+@pytest.mark.parametrize("rrule", [
+    "FREQ=DAILY",
+    "FREQ=DAILY;INTERVAL=3",
+    "FREQ=WEEKLY;BYDAY=MO,WE,FR",
+    "FREQ=WEEKLY;INTERVAL=2;BYDAY=TU",
+    "FREQ=MONTHLY;BYMONTHDAY=15",
+    "FREQ=MONTHLY;BYDAY=1SU",
+    "FREQ=HOURLY;INTERVAL=7",
+    "FREQ=DAILY;COUNT=9500",
+    "FREQ=DAILY;UNTIL=20260310T000000Z",
+    "FREQ=WEEKLY;BYDAY=TH;UNTIL=20260312T235959Z",
+])
+def test_occurrences_match_dateutil(rrule):
+    ev = _event(rrule)
+    assert occurrences(ev, *DST_WINDOW) == _reference(ev, *DST_WINDOW)
+
+
+def test_daily_series_keeps_local_time_across_dst():
+    ev = _event("FREQ=DAILY")
+    starts = [s for s, _ in occurrences(ev, *DST_WINDOW)]
+    assert len(starts) == 21
+    assert {s.astimezone(NY).hour for s in starts} == {9}
+    assert {s.astimezone(UTC).hour for s in starts} == {13, 14}
+
+
+def test_window_edges_catch_overlapping_occurrences():
+    # a 2h occurrence starting before the window still overlaps it
+    ev = _event("FREQ=DAILY", minutes=120)
+    lo = datetime(2026, 3, 2, 15, 0, tzinfo=UTC)  # 10:00 New York, mid-occurrence
+    hi = datetime(2026, 3, 3, 14, 0, tzinfo=UTC)  # 09:00 New York, the next one starts here
+    got = occurrences(ev, lo, hi)
+    assert got == _reference(ev, lo, hi)
+    assert [s.astimezone(NY).day for s, _ in got] == [2]
+
+
+@pytest.mark.parametrize("rrule", ["FREQ=DAILY", "FREQ=WEEKLY;INTERVAL=2;BYDAY=TU", "FREQ=HOURLY;INTERVAL=5"])
+def test_fast_forward_starts_near_the_window(rrule):
+    ev = _event(rrule)
+    rule = rrulestr(rrule, dtstart=ev.start_at.astimezone(NY))
+    before = datetime(2026, 3, 9, tzinfo=UTC)
+    moved = _fast_forward(rule, before)
+    assert ev.start_at < moved._dtstart <= before
+    assert before - moved._dtstart < timedelta(weeks=5)
+    assert moved.after(before) == rule.after(before)
+    assert list(moved.xafter(before, count=50)) == list(rule.xafter(before, count=50))
+
+
+@pytest.mark.parametrize("rrule", ["FREQ=DAILY;COUNT=10000", "FREQ=MONTHLY;BYMONTHDAY=15"])
+def test_fast_forward_leaves_count_and_monthly_rules(rrule):
+    rule = rrulestr(rrule, dtstart=datetime(2001, 1, 3, 9, 0, tzinfo=NY))
+    assert _fast_forward(rule, datetime(2026, 3, 9, tzinfo=UTC)) is rule
+
+
+def test_expansion_is_capped(monkeypatch):
+    # a COUNT rule is walked from DTSTART: past the cap the window comes back empty
+    monkeypatch.setattr(recurrence, "MAX_EXPANSION_STEPS", 100)
+    ev = _event("FREQ=DAILY;COUNT=1000", start=datetime(2026, 1, 1, 9, 0, tzinfo=NY))
+    inside = (datetime(2026, 3, 1, tzinfo=UTC), datetime(2026, 3, 8, tzinfo=UTC))
+    beyond = (datetime(2026, 6, 1, tzinfo=UTC), datetime(2026, 6, 8, tzinfo=UTC))
+    assert occurrences(ev, *inside) == _reference(ev, *inside) != []
+    assert occurrences(ev, *beyond) == []
+    assert _reference(ev, *beyond) != []
+    assert next_start_after(ev, beyond[0]) is None
+
+
+def test_next_start_after_matches_dateutil():
+    ev = _event("FREQ=WEEKLY;BYDAY=MO,WE,FR")
+    after = datetime(2026, 3, 7, 12, 0, tzinfo=UTC)
+    rule = rrulestr(ev.rrule, dtstart=ev.start_at.astimezone(NY))
+    assert next_start_after(ev, after) == rule.after(after)
+    assert next_start_after(_event("FREQ=DAILY;UNTIL=20260101T000000Z"), after) is None
+
+
+def test_occurrence_cache_is_keyed_by_updated_at(monkeypatch):
+    monkeypatch.setattr(recurrence, "_occurrences", LRUCache(maxsize=2))
+    ev = _event("FREQ=DAILY")
+    old_key = (ev.id, ev.updated_at, *DST_WINDOW)
+    first = occurrences(ev, *DST_WINDOW)
+    assert occurrences(ev, *DST_WINDOW) is first  # served from the cache
+
+    # an edit bumps updated_at: the old entry is never read again
+    ev.rrule, ev.updated_at = "FREQ=DAILY;INTERVAL=2", ev.updated_at + timedelta(seconds=1)
+    second = occurrences(ev, *DST_WINDOW)
+    assert second == _reference(ev, *DST_WINDOW) != first
+
+    # and ages out of the LRU
+    occurrences(_event("FREQ=DAILY"), *DST_WINDOW)
+    assert old_key not in recurrence._occurrences and len(recurrence._occurrences) == 2
+    assert occurrences(ev, *DST_WINDOW) is second
@@ -0,0 +1,196 @@
+# test_routes.py
+# Route table and request validation checks that need no database:
+#   python -m pytest backend/test_routes.py
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import UUID
+
+import pytest
+from fastapi import HTTPException
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine.result import result_tuple
+
+from backend.Api_Pydantic import EventCreate, EventUpdate
+from backend import Api_Structure
+from backend.Api_Structure import _check_window, _copy_columns, _decode_cursor, _encode_cursor, app, list_events, sync
+from backend.auth import sign
+from backend.changes import SyncCursor, make_sync_token, read_sync_token
+from backend.sealing import AESGCM, _open_one, _seal_one
+from backend.serializers import EVENT_COLUMNS
+from backend.webpush import check_subscription
+
+client = TestClient(app)
+
+
+def _routes():
+    return {(method, r.path): r.endpoint for r in app.routes if isinstance(r, APIRoute) for method in r.methods}
+
+
+def test_list_events_route_is_list_events():
+    assert _routes()["GET", "/calendars/{calendar_id}/events"] is list_events
+
+
+def test_every_route_is_a_public_handler():
+    # a helper slipped between a decorator and its handler becomes the route
+    for (method, path), endpoint in _routes().items():
+        assert not endpoint.__name__.startswith("_"), f"{method} {path} -> {endpoint.__name__}"
+
+
+def test_list_events_requires_auth_not_q():
+    r = client.get("/calendars/00000000-0000-0000-0000-000000000000/events")
+    assert r.status_code == 401
+
+
+def test_bulk_copy_redacts_busy_content():
+    # title/description/location/sealed of other people's "busy" events are not copied
+    sql = str(select(*_copy_columns(UUID(int=1))).compile(dialect=postgresql.dialect()))
+    for column in ("title", "description", "location", "sealed"):
+        assert f"ELSE events.{column} END" in sql
+
+
+@pytest.mark.parametrize("rrule", ["FREQ=SECONDLY", "FREQ=MINUTELY;INTERVAL=5", "FREQ=BOGUS", "garbage"])
+def test_rrule_is_validated(rrule):
+    start = datetime(2026, 1, 1, 9, tzinfo=timezone.utc)
+    with pytest.raises(ValidationError):
+        EventCreate(title="x", start_at=start, end_at=start.replace(hour=10), rrule=rrule)
+    with pytest.raises(ValidationError):
+        EventUpdate(rrule=rrule)
+    assert EventUpdate(rrule="FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20261231T000000Z").rrule
+
+
+def test_inverted_window_is_400():
+    start = datetime(2026, 1, 2, tzinfo=timezone.utc)
+    _check_window(start, None)
+    _check_window(start.replace(tzinfo=None), start.replace(day=3))  # naive means UTC
+    with pytest.raises(HTTPException) as exc:
+        _check_window(start, start.replace(day=1))
+    assert exc.value.status_code == 400
+
+
+def test_login_is_disabled_outside_demo_mode():
+    r = client.post("/login", json={"email": "someone@example.com", "password": "anything"})
+    assert r.status_code == 403
+
+
+def test_internal_and_admin_routes_need_an_admin():
+    for (method, path), endpoint in _routes().items():
+        if path.startswith(("/internal/", "/admin/")):
+            assert client.request(method, path.replace("{id}", str(UUID(int=1)))).status_code == 401, path
+
+
+@pytest.mark.parametrize("endpoint", [
+    "http://8.8.8.8/push/1", "https://127.0.0.1/push/1", "https://10.0.0.7/push/1",
+    "https://[::1]/push/1", "https://169.254.169.254/latest", "not a url",
+])
+def test_push_endpoint_must_be_public_https(endpoint):
+    with pytest.raises(ValueError):
+        asyncio.run(check_subscription(endpoint, None, None))
+
+
+def test_push_keys_are_checked():
+    ok = asyncio.run(check_subscription("https://8.8.8.8/push/1", None, None))
+    assert ok is None
+    with pytest.raises(ValueError):
+        asyncio.run(check_subscription("https://8.8.8.8/push/1", "BAAA", "AAAAAAAAAAAAAAAAAAAAAA"))
+
+
+def test_sync_token_holds_snapshots():
+    user_id = UUID(int=1)
+    cursor = SyncCursor("100:104:101,103", "100:110:", 42)
+    assert read_sync_token(make_sync_token(user_id, cursor), user_id) == cursor
+    assert read_sync_token(make_sync_token(user_id, cursor), UUID(int=2)) is None
+    # tokens from before cursors held snapshots mean a full sync
+    assert read_sync_token(sign({"typ": "sync", "uid": str(user_id), "seq": 42}), user_id) is None
+
+
+def test_sync_token_past_the_retained_log_is_410(monkeypatch):
+    user = SimpleNamespace(id=UUID(int=1))
+
+    async def pruned(session, user_id, cursor):
+        return None
+
+    async def now(session):
+        return SyncCursor("200:200:")
+
+    monkeypatch.setattr(Api_Structure, "changes_since", pruned)
+    monkeypatch.setattr(Api_Structure, "current_cursor", now)
+    token = make_sync_token(user.id, SyncCursor("100:104:"))
+    response = asyncio.run(sync(token=token, session=None, current_user=user))
+    body = json.loads(response.body)
+    assert response.status_code == 410 and body["full_sync_required"]
+    assert read_sync_token(body["sync_token"], user.id) == SyncCursor("200:200:")
+
+
+def test_cursor_round_trips_and_breaks_ties_on_id():
+    start = datetime(2026, 3, 1, 9, 0, 0, 123456, tzinfo=timezone(timedelta(hours=-5)))
+    assert _decode_cursor(_encode_cursor(start, UUID(int=7))) == (start, UUID(int=7))
+    with pytest.raises(HTTPException) as exc:
+        _decode_cursor("not a cursor")
+    assert exc.value.status_code == 400
+
+    # keyset paging over rows sharing a start_at visits every row exactly once
+    rows = sorted((start + timedelta(minutes=30 * (i // 4)), UUID(int=i * 7919 % 101)) for i in range(20))
+    seen, after = [], None
+    while True:
+        page = [r for r in rows if after is None or r > after][:3]
+        if not page:
+            break
+        seen += page
+        after = _decode_cursor(_encode_cursor(*page[-1]))
+    assert seen == rows
+
+
+def _event_rows(n):
+    row = result_tuple([c.key for c in EVENT_COLUMNS])
+    start, owner = datetime(2026, 3, 1, tzinfo=timezone.utc), UUID(int=1)
+    return [
+        row((UUID(int=100 + i), UUID(int=50), owner, f"e{i}", None, None, start, start + timedelta(hours=1),
+             "UTC", False, "private", None, start, start, None))
+        for i in range(n)
+    ]
+
+
+async def _ndjson(limit, n, monkeypatch):
+    async def calendar(session, calendar_id, user_id):
+        return SimpleNamespace(id=calendar_id), "owner"
+
+    async def events(stmt):
+        for ev in _event_rows(n):
+            yield ev
+
+    monkeypatch.setattr(Api_Structure, "resolve_calendar", calendar)
+    monkeypatch.setattr(Api_Structure, "_stream_events", events)
+    response = await list_events(
+        calendar_id=UUID(int=50), request=None, q=None, start_from=None, start_to=None, expand=False,
+        limit=limit, cursor=None, stream=True, session=None, current_user=SimpleNamespace(id=UUID(int=1)),
+    )
+    return [json.loads(line) async for line in response.body_iterator]
+
+
+def test_streamed_page_ends_with_its_cursor(monkeypatch):
+    lines = asyncio.run(_ndjson(3, 5, monkeypatch))
+    assert [line["title"] for line in lines[:3]] == ["e0", "e1", "e2"]
+    assert _decode_cursor(lines[3]["next_cursor"]) == (datetime(2026, 3, 1, tzinfo=timezone.utc), UUID(int=102))
+    assert len(lines) == 4
+    # the last page (or no limit at all) has no cursor line
+    assert all("next_cursor" not in line for line in asyncio.run(_ndjson(5, 5, monkeypatch)))
+    assert len(asyncio.run(_ndjson(None, 5, monkeypatch))) == 5
+
+
+@pytest.mark.skipif(AESGCM is None, reason="cryptography not installed")
+def test_sealed_blob_is_bound_to_its_event_and_owner():
+    key = AESGCM(AESGCM.generate_key(bit_length=256))
+    owner, event_id = UUID(int=1), UUID(int=10)
+    content = {"title": "Board meeting", "description": None, "location": "Room 1"}
+    blob = _seal_one(key, owner, event_id, content)
+    assert _open_one(key, blob, event_id, owner) == content
+    with pytest.raises(Exception):  # copied onto another event
+        _open_one(key, blob, UUID(int=11), owner)
+    with pytest.raises(ValueError):  # header names someone else
+        _open_one(key, blob, event_id, UUID(int=2))
@@ -0,0 +1,45 @@
+# backend/upsert.py
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Sequence
+
+from sqlalchemy import Boolean, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# --------------------------------------------------------------------
+# Atomic upsert
+# One INSERT ... ON CONFLICT ... RETURNING instead of SELECT-then-INSERT,
+# which races against the unique constraints when two requests write the
+# same row. RETURNING (xmax = 0) tells a fresh insert from an update.
+# --------------------------------------------------------------------
+
+_INSERTED = literal_column("(xmax = 0)", type_=Boolean).label("inserted")
+
+
+async def upsert(
+    session: AsyncSession,
+    model,
+    values: Dict[str, Any],
+    conflict: Sequence[str],
+    update: Sequence[str] = (),
+    where=None,
+) -> Optional[bool]:
+    """Insert `values`, or on a `conflict` overwrite the `update` columns.
+
+    Returns True when a row was inserted, False when an existing row was
+    updated, and None when nothing was written (no `update` columns, or the
+    `where` guard on the existing row was false). Columns with an ORM
+    onupdate (updated_at) are bumped on update, as a flush would.
+    """
+    stmt = pg_insert(model).values(**values)
+    if update:
+        set_ = {name: stmt.excluded[name] for name in update}
+        for column in model.__table__.columns:
+            if column.onupdate is not None and column.name not in set_:
+                set_[column.name] = column.onupdate.arg
+        stmt = stmt.on_conflict_do_update(index_elements=list(conflict), set_=set_, where=where)
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=list(conflict))
+    row = (await session.execute(stmt.returning(_INSERTED))).first()
+    return None if row is None else row.inserted
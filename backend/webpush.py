@@ -0,0 +1,248 @@
+# backend/webpush.py
+from __future__ import annotations
+
+import asyncio
+import base64
+import ipaddress
+import json
+import logging
+import os
+import secrets
+import socket
+import struct
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from .cache import LRUCache
+
+try:  # optional: VAPID signing and payload encryption
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+except ImportError:  # pragma: no cover - depends on the environment
+    ec = None
+
+# --------------------------------------------------------------------
+# Web Push sender
+# One shared httpx client (keep-alive connections per push service), a
+# semaphore bounding requests in flight and a token bucket bounding the
+# overall send rate. With `cryptography` installed and VAPID_PRIVATE_KEY set,
+# requests carry a VAPID JWT (RFC 8292) and an aes128gcm-encrypted payload
+# (RFC 8291); without them they go out as empty "tickle" pushes, which a
+# local stand-in endpoint accepts and which real push services reject.
+#
+# Subscriptions are checked when they are registered: the endpoint must be
+# https on a host that resolves to public addresses only (the server POSTs
+# to it), and the keys must be usable for encryption. A push that still
+# cannot be encrypted counts as gone, so its subscription is dropped.
+#
+# VAPID_PRIVATE_KEY    base64url raw P-256 private key (web-push generate-vapid-keys)
+# VAPID_SUBJECT        mailto: or https: contact sent to push services
+# WEBPUSH_CONCURRENCY  requests in flight
+# WEBPUSH_RATE         requests per second across all push services (0 = unlimited)
+# WEBPUSH_TTL          seconds a push service may hold an undelivered message
+# WEBPUSH_ALLOW_PRIVATE 1 = also accept http and private/loopback endpoints
+#                      (local stand-in push services; never in production)
+# --------------------------------------------------------------------
+
+VAPID_PRIVATE_KEY = os.getenv("VAPID_PRIVATE_KEY")
+VAPID_SUBJECT = os.getenv("VAPID_SUBJECT", "mailto:admin@example.com")
+WEBPUSH_CONCURRENCY = int(os.getenv("WEBPUSH_CONCURRENCY", "50"))
+WEBPUSH_RATE = float(os.getenv("WEBPUSH_RATE", "200"))
+WEBPUSH_TTL = int(os.getenv("WEBPUSH_TTL", "3600"))
+WEBPUSH_TIMEOUT = float(os.getenv("WEBPUSH_TIMEOUT", "10"))
+WEBPUSH_ALLOW_PRIVATE = os.getenv("WEBPUSH_ALLOW_PRIVATE", "0") == "1"
+
+VAPID_TOKEN_TTL = 12 * 3600
+RECORD_SIZE = 4096
+
+logger = logging.getLogger("backend.webpush")
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _unb64(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _public_bytes(key) -> bytes:
+    return key.public_bytes(serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint)
+
+
+_vapid_key = None
+if ec is not None and VAPID_PRIVATE_KEY:
+    _vapid_key = ec.derive_private_key(int.from_bytes(_unb64(VAPID_PRIVATE_KEY), "big"), ec.SECP256R1())
+
+# one JWT per push service origin, reused until shortly before it expires
+_vapid_tokens = LRUCache(maxsize=256, ttl=VAPID_TOKEN_TTL - 600)
+
+
+def vapid_headers(endpoint: str) -> Dict[str, str]:
+    if _vapid_key is None:
+        return {}
+    parts = urlsplit(endpoint)
+    audience = f"{parts.scheme}://{parts.netloc}"
+    header = _vapid_tokens.get(audience)
+    if header is None:
+        claims = {"aud": audience, "exp": int(time.time()) + VAPID_TOKEN_TTL, "sub": VAPID_SUBJECT}
+        signing_input = _b64(b'{"typ":"JWT","alg":"ES256"}') + "." + _b64(json.dumps(claims).encode())
+        r, s = decode_dss_signature(_vapid_key.sign(signing_input.encode(), ec.ECDSA(hashes.SHA256())))
+        jwt = signing_input + "." + _b64(r.to_bytes(32, "big") + s.to_bytes(32, "big"))
+        header = f"vapid t={jwt}, k={_b64(_public_bytes(_vapid_key.public_key()))}"
+        _vapid_tokens.set(audience, header)
+    return {"Authorization": header}
+
+
+def encrypt(payload: bytes, p256dh: str, auth: str) -> bytes:
+    """aes128gcm body for one subscription (RFC 8291), single record."""
+    ua_public = _unb64(p256dh)
+    server_key = ec.generate_private_key(ec.SECP256R1())
+    server_public = _public_bytes(server_key.public_key())
+    shared = server_key.exchange(ec.ECDH(), ec.EllipticCurvePublicKey.from_encoded_point(ec.SECP256R1(), ua_public))
+
+    ikm = HKDF(hashes.SHA256(), 32, salt=_unb64(auth),
+               info=b"WebPush: info\x00" + ua_public + server_public).derive(shared)
+    salt = secrets.token_bytes(16)
+    cek = HKDF(hashes.SHA256(), 16, salt=salt, info=b"Content-Encoding: aes128gcm\x00").derive(ikm)
+    nonce = HKDF(hashes.SHA256(), 12, salt=salt, info=b"Content-Encoding: nonce\x00").derive(ikm)
+
+    ciphertext = AESGCM(cek).encrypt(nonce, payload + b"\x02", None)  # \x02: last record
+    return salt + struct.pack("!IB", RECORD_SIZE, len(server_public)) + server_public + ciphertext
+
+
+async def check_subscription(endpoint: str, p256dh: Optional[str], auth: Optional[str]) -> None:
+    """Raise ValueError unless pushes to this subscription can be sent (see the header)."""
+    parts = urlsplit(endpoint)
+    if parts.scheme not in (("https", "http") if WEBPUSH_ALLOW_PRIVATE else ("https",)) or not parts.hostname:
+        raise ValueError("endpoint must be an https URL")
+    if not WEBPUSH_ALLOW_PRIVATE:
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(
+                parts.hostname, parts.port or 443, type=socket.SOCK_STREAM
+            )
+        except OSError:
+            raise ValueError("endpoint host does not resolve")
+        for *_, sockaddr in infos:
+            if not ipaddress.ip_address(sockaddr[0].split("%")[0]).is_global:
+                raise ValueError("endpoint host is not public")
+    if (p256dh is None) != (auth is None):
+        raise ValueError("keys need both p256dh and auth")
+    if p256dh is None:
+        return
+    try:
+        ua_public, secret = _unb64(p256dh), _unb64(auth)
+    except ValueError:
+        raise ValueError("keys must be base64url")
+    if len(secret) != 16:
+        raise ValueError("keys.auth must be 16 bytes")
+    try:
+        if ec is not None:
+            ec.EllipticCurvePublicKey.from_encoded_point(ec.SECP256R1(), ua_public)
+        elif len(ua_public) != 65 or ua_public[0] != 4:
+            raise ValueError
+    except ValueError:
+        raise ValueError("keys.p256dh must be an uncompressed P-256 public key")
+
+
+class TokenBucket:
+    """Async rate limiter: `rate` acquisitions per second, bursts up to `rate`."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class WebPushSender:
+    def __init__(self, concurrency: int = WEBPUSH_CONCURRENCY, rate: float = WEBPUSH_RATE):
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate)
+        self.client: Optional[httpx.AsyncClient] = None
+        self.sent = 0
+        self.failed = 0
+        self.gone = 0
+
+    async def start(self) -> None:
+        if self.client is None:
+            limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+            self.client = httpx.AsyncClient(timeout=WEBPUSH_TIMEOUT, limits=limits)
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def send(self, endpoint: str, p256dh: Optional[str], auth: Optional[str],
+                   message: Dict[str, Any]) -> Optional[int]:
+        """POST one push; returns the HTTP status, or None if the request failed."""
+        await self.bucket.acquire()
+        async with self.semaphore:
+            headers = {"TTL": str(WEBPUSH_TTL), "Urgency": "high", **vapid_headers(endpoint)}
+            body = b""
+            if _vapid_key is not None and p256dh and auth:
+                try:
+                    body = encrypt(json.dumps(message, separators=(",", ":")).encode(), p256dh, auth)
+                except ValueError as exc:
+                    # keys that cannot work (registered before they were checked): as good as gone
+                    self.gone += 1
+                    logger.warning("web push to %s has unusable keys: %s", urlsplit(endpoint).netloc, exc)
+                    return 410
+                headers["Content-Encoding"] = "aes128gcm"
+                headers["Content-Type"] = "application/octet-stream"
+            try:
+                resp = await self.client.post(endpoint, content=body, headers=headers)
+            except httpx.HTTPError as exc:
+                self.failed += 1
+                logger.warning("web push to %s failed: %s", urlsplit(endpoint).netloc, exc)
+                return None
+        if resp.status_code in (404, 410):
+            self.gone += 1
+        elif resp.status_code >= 400:
+            self.failed += 1
+            logger.warning("web push to %s rejected: %s", urlsplit(endpoint).netloc, resp.status_code)
+        else:
+            self.sent += 1
+        return resp.status_code
+
+    async def send_many(self, items: Iterable[Tuple[Any, Dict[str, Any]]]) -> List[str]:
+        """Send (subscription, message) pairs concurrently; returns endpoints that no longer exist."""
+        items = list(items)
+        # one failing send must not take the others down with it
+        statuses = await asyncio.gather(*(
+            self.send(sub.endpoint, sub.p256dh, sub.auth, message) for sub, message in items
+        ), return_exceptions=True)
+        for (sub, _), status in zip(items, statuses):
+            if isinstance(status, Exception):
+                self.failed += 1
+                logger.error("web push to %s raised", urlsplit(sub.endpoint).netloc, exc_info=status)
+        return list({sub.endpoint for (sub, _), status in zip(items, statuses) if status in (404, 410)})
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "signed": _vapid_key is not None,
+            "sent": self.sent,
+            "failed": self.failed,
+            "gone": self.gone,
+        }